@@ -2,7 +2,7 @@ import os
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, decode_token
-from flask_socketio import SocketIO, join_room, leave_room, disconnect
+from flask_socketio import SocketIO, join_room, leave_room, disconnect, emit
 from dotenv import load_dotenv
 import logging
 
@@ -30,10 +30,24 @@ def create_app(config_name=None):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Encode every jsonify() response with the configured serializer
+    from utils.serialization import get_json_provider_class
+    app.json = get_json_provider_class(app.config.get('JSON_SERIALIZER', 'auto'))(app)
+    
+    # Compress JSON responses (registered first so it runs after every other after_request hook)
+    from middleware.compression import init_compression
+    init_compression(app)
+    
     # Initialize extensions
     jwt = JWTManager(app)
     
     # Initialize SocketIO with CORS support
+    # A message queue lets every worker deliver events to sockets held by the others
+    from utils.socketio_queue import get_socketio_queue_options
+    queue_options = get_socketio_queue_options(
+        app.config.get('SOCKETIO_MESSAGE_QUEUE'),
+        app.config.get('SOCKETIO_CHANNEL')
+    )
     socketio = SocketIO(
         app,
         cors_allowed_origins="*",
@@ -41,16 +55,19 @@ def create_app(config_name=None):
         logger=True,
         engineio_logger=True,
         ping_timeout=60,
-        ping_interval=25
+        ping_interval=25,
+        **queue_options
     )
     
     # Set socketio instance for sync_events
-    from utils.sync_events import set_socketio
+    from utils.sync_events import set_socketio, set_event_policies
     set_socketio(socketio)
+    set_event_policies(app.config.get('SYNC_EVENT_POLICIES'))
     
-    # Initialize data cleaner jobs
-    from jobs.data_cleaner import init_data_cleaner
-    init_data_cleaner()
+    # Initialize data cleaner jobs (leader election keeps them to one process)
+    if app.config.get('RUN_SCHEDULER_IN_WEB', True):
+        from jobs.data_cleaner import init_data_cleaner
+        init_data_cleaner()
     
     # Initialize database connection
     initialize_database()
@@ -172,7 +189,11 @@ def create_app(config_name=None):
     # WebSocket Event Handlers
     @socketio.on('connect')
     def handle_connect(auth):
-        """Handle WebSocket connection with JWT authentication"""
+        """
+        Handle WebSocket connection with JWT authentication
+        Clients resuming a session may send last_seq / last_event_id in the auth
+        payload; missed events are replayed to this socket before live delivery
+        """
         try:
             # Extract token from auth dict
             token = None
@@ -194,11 +215,14 @@ def create_app(config_name=None):
                     disconnect()
                     return False
                 
-                # Join user's personal room
+                # Join user's personal room first so nothing emitted during the replay is lost;
+                # clients de-duplicate by event_id
                 room = f'user:{user_id}'
                 join_room(room)
                 logger.info(f"User {user_id} connected to WebSocket and joined room {room}")
                 
+                replay_missed_events(int(user_id), auth)
+                
                 return True
                 
             except Exception as e:
@@ -211,6 +235,40 @@ def create_app(config_name=None):
             disconnect()
             return False
     
+    def replay_missed_events(user_id, auth):
+        """Replay events stored after the client's last seen event to this socket only"""
+        from utils.sync_events import get_sync_events_after
+        from database import utcnow
+        
+        last_seq = auth.get('last_seq')
+        last_event_id = auth.get('last_event_id')
+        if last_seq is None and not last_event_id:
+            return
+        
+        try:
+            last_seq = int(last_seq) if last_seq is not None else None
+        except (TypeError, ValueError):
+            last_seq = None
+            if not last_event_id:
+                return
+        
+        events, resync_reason = get_sync_events_after(user_id, last_event_id=last_event_id, last_seq=last_seq)
+        if resync_reason:
+            logger.info(f"User {user_id} must resync: {resync_reason}")
+            emit('resync_required', {
+                'reason': resync_reason,
+                'server_time': utcnow().isoformat()
+            })
+            return
+        
+        for event in events:
+            emit('sync_event', event)
+        emit('replay_complete', {
+            'count': len(events),
+            'last_seq': events[-1]['seq'] if events else last_seq
+        })
+        logger.info(f"Replayed {len(events)} missed events to user {user_id}")
+    
     @socketio.on('disconnect')
     def handle_disconnect():
         """Handle WebSocket disconnection"""
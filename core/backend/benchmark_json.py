@@ -0,0 +1,104 @@
+"""
+Benchmark JSON Serialization - time and peak memory of encoding a large listing
+Builds a /api/files/list style response from synthetic rows and encodes it
+with each available JSON provider (see utils/serialization.py).
+
+Usage:
+    python benchmark_json.py                    # 10,000 files, 5 rounds
+    python benchmark_json.py --files 50000 --rounds 3
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from flask import Flask
+
+from utils.serialization import OrjsonProvider, StdlibJSONProvider, format_timestamp, orjson
+
+def build_rows(count):
+    """Rows shaped like File.find_by_owner results"""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'id': uuid.uuid4(),
+            'original_filename': f"document_{i:06d}_quarterly_report.pdf",
+            'content_type': 'application/pdf',
+            'size_bytes': 1024 * (i % 5000 + 1),
+            'algo': 'AES-256-GCM',
+            'created_at': start + timedelta(minutes=i),
+            'updated_at': start + timedelta(minutes=i, seconds=30),
+        }
+        for i in range(count)
+    ]
+
+def build_listing(rows):
+    """Format rows the way list_user_files does"""
+    files = [
+        {
+            'id': str(row['id']),
+            'original_filename': row['original_filename'],
+            'content_type': row['content_type'],
+            'size_bytes': row['size_bytes'],
+            'algo': row['algo'],
+            'created_at': format_timestamp(row['created_at']),
+            'updated_at': format_timestamp(row['updated_at']),
+            'access_type': 'owner'
+        }
+        for row in rows
+    ]
+    return {'files': files, 'owned_files': files, 'shared_files': [], 'total': len(files)}
+
+def measure(app, provider, listing, rounds):
+    """Best wall time and peak traced memory of provider.response(listing)"""
+    best = None
+    with app.app_context():
+        for _ in range(rounds):
+            started = time.perf_counter()
+            response = provider.response(listing)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        size = len(response.get_data())
+
+        tracemalloc.start()
+        provider.response(listing)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak, size
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization of a large file listing')
+    parser.add_argument('--files', type=int, default=10000, help='Files in the listing')
+    parser.add_argument('--rounds', type=int, default=5, help='Timed rounds per provider (best is reported)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rows = build_rows(args.files)
+
+    started = time.perf_counter()
+    listing = build_listing(rows)
+    print(f"Formatting {args.files} rows: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    providers = [('stdlib', StdlibJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+    else:
+        print("orjson is not installed - only the stdlib provider is measured")
+
+    results = {}
+    for name, provider in providers:
+        elapsed, peak, size = measure(app, provider, listing, args.rounds)
+        results[name] = elapsed
+        print(f"{name:>7}: {elapsed * 1000:8.1f} ms   peak {peak / 1024 / 1024:7.2f} MiB   body {size / 1024 / 1024:.2f} MiB")
+
+    if 'orjson' in results:
+        print(f"orjson is {results['stdlib'] / results['orjson']:.1f}x faster")
+
+if __name__ == '__main__':
+    main()
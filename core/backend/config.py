@@ -1,4 +1,5 @@
 import os
+import json
 from datetime import timedelta
 
 class Config:
@@ -24,6 +25,31 @@ class Config:
     SEND_FILE_MAX_AGE_DEFAULT = 0  # Disable caching for security
     MAX_CONTENT_PATH = None  # No path length limit
     
+    # Socket.IO message queue - required when running more than one worker
+    # Accepts redis://host:6379/0 or a postgresql:// URL (LISTEN/NOTIFY)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'cryptovault-sync')
+    
+    # Sync event coalescing overrides, e.g. {"file_downloaded": {"window": 10, "max_ids": 50}}
+    # Defaults live in utils/sync_events.py; omitted keys keep their default, a window of 0 disables coalescing for that type
+    SYNC_EVENT_POLICIES = json.loads(os.environ.get('SYNC_EVENT_POLICIES') or '{}')
+    
+    # Start the maintenance scheduler inside web workers. Only one process in the
+    # cluster runs jobs either way; set to false when using `python -m jobs.worker`
+    RUN_SCHEDULER_IN_WEB = os.environ.get('RUN_SCHEDULER_IN_WEB', 'true').lower() == 'true'
+    
+    # Bearer token for GET /metrics; without one it only answers requests from localhost
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # JSON encoder for API responses: auto (orjson when installed), orjson or stdlib
+    JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'auto').lower()
+    
+    # Response compression (brotli needs the optional brotli package; 0 disables)
+    COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    COMPRESSION_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'text/csv')
+    
     # CORS Configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5173,http://localhost:3001,http://localhost:5174').split(',')
 
@@ -4,12 +4,15 @@ Replaces SQLAlchemy with direct psycopg2 connections
 """
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 from psycopg2.pool import SimpleConnectionPool
 import os
 from datetime import datetime, timezone
 import bcrypt
 import json
+import threading
+import uuid
 from contextlib import contextmanager
 import logging
 
@@ -31,6 +34,8 @@ class DatabaseManager:
             'password': 'sql123'
         }
         self.pool = None
+        # Connection pinned to the current thread by request_connection()
+        self._local = threading.local()
         self.init_connection_pool()
     
     def init_connection_pool(self):
@@ -46,9 +51,44 @@ class DatabaseManager:
             logger.error(f"Failed to initialize database connection pool: {e}")
             raise
     
+    @contextmanager
+    def request_connection(self):
+        """
+        Serve every get_connection() in this thread from one pooled connection
+        until exit (used to run a batch of sub-requests on a single checkout)
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self._local.conn
+            return
+        conn = self.pool.getconn()
+        self._local.conn = conn
+        self._local.in_use = False
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self.pool.putconn(conn)
+    
     @contextmanager
     def get_connection(self):
         """Get a connection from the pool"""
+        pinned = getattr(self._local, 'conn', None)
+        # Nested uses (e.g. a query while a snapshot is open) get their own connection
+        if pinned is not None and not self._local.in_use:
+            self._local.in_use = True
+            try:
+                yield pinned
+            except Exception as e:
+                pinned.rollback()
+                logger.error(f"Database connection error: {e}")
+                raise
+            finally:
+                self._local.in_use = False
+                # Leave it as the pool leaves a returned connection: outside any transaction
+                if pinned.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    pinned.rollback()
+            return
+        
         conn = None
         try:
             conn = self.pool.getconn()
@@ -62,13 +102,19 @@ class DatabaseManager:
             if conn:
                 self.pool.putconn(conn)
     
-    def execute_query(self, query, params=None, fetch=False):
-        """Execute a query and optionally fetch results"""
+    def execute_query(self, query, params=None, fetch=False, commit=False):
+        """
+        Execute a query and optionally fetch results (queries that aren't
+        fetched are committed; pass commit=True for writes with RETURNING)
+        """
         with self.get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
                 cursor.execute(query, params)
                 if fetch:
-                    return cursor.fetchall()
+                    results = cursor.fetchall()
+                    if commit:
+                        conn.commit()
+                    return results
                 conn.commit()
                 return cursor.rowcount
     
@@ -89,6 +135,28 @@ class DatabaseManager:
             import traceback
             print(f"[DB] Full traceback:\n{traceback.format_exc()}")
             raise
+    
+    @contextmanager
+    def read_snapshot(self):
+        """
+        Connection in a read-only REPEATABLE READ transaction, so several
+        queries see the same committed state; rolled back when done
+        """
+        with self.get_connection() as conn:
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+                conn.set_session(isolation_level='DEFAULT', readonly=False)
+    
+    @staticmethod
+    def iter_rows(conn, query, params=None, itersize=2000):
+        """Yield rows from a server-side (named) cursor, itersize rows in memory at a time"""
+        with conn.cursor(name=f"iter_rows_{uuid.uuid4().hex}", cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            yield from cursor
 
 # Global database manager instance
 db_manager = DatabaseManager()
@@ -128,6 +196,13 @@ class User:
         result = db_manager.execute_one(query, (username,))
         return dict(result) if result else None
     
+    @staticmethod
+    def find_by_usernames(usernames):
+        """Find active users by username, keyed by username (one query for any number)"""
+        query = "SELECT id, username FROM users WHERE username = ANY(%s::text[]) AND is_active = TRUE"
+        results = db_manager.execute_query(query, (list(usernames),), fetch=True)
+        return {row['username']: dict(row) for row in results}
+    
     @staticmethod
     def find_by_id(user_id):
         """Find user by ID"""
@@ -211,16 +286,21 @@ class User:
 class File:
     """File model for direct PostgreSQL operations"""
     
+    # Columns file listings may select (sparse fieldsets)
+    LISTING_COLUMNS = ('id', 'original_filename', 'content_type', 'size_bytes', 'algo', 'created_at', 'updated_at')
+    
     @staticmethod
-    def create(owner_id, original_filename, size_bytes, content_type, algo, iv, storage_path):
+    def create(owner_id, original_filename, size_bytes, content_type, algo, iv, storage_path, checksum_sha256=None):
         """Create a new file record with local filesystem storage"""
         query = """
-        INSERT INTO files (owner_id, original_filename, size_bytes, content_type, algo, iv, storage_path, status, created_at, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id, original_filename, size_bytes, content_type, created_at
+        INSERT INTO files (owner_id, original_filename, size_bytes, content_type, algo, iv, storage_path, status,
+                           checksum_sha256, checksum_verified_at, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id, original_filename, size_bytes, content_type, checksum_sha256, created_at
         """
         params = (
             owner_id, original_filename, size_bytes, content_type, algo, iv, storage_path, 'active',
+            checksum_sha256, utcnow() if checksum_sha256 else None,
             utcnow(), utcnow()
         )
         
@@ -229,29 +309,128 @@ class File:
     
     @staticmethod
     def find_by_owner(owner_id):
-        """Find all files owned by a user"""
+        """Find all active files owned by a user"""
         query = """
         SELECT f.*, u.username as owner_username
         FROM files f
         JOIN users u ON f.owner_id = u.id
-        WHERE f.owner_id = %s
+        WHERE f.owner_id = %s AND f.status = 'active'
         ORDER BY f.created_at DESC
         """
         results = db_manager.execute_query(query, (owner_id,), fetch=True)
         return [dict(row) for row in results]
     
     @staticmethod
-    def find_by_id(file_id):
-        """Find file by ID"""
+    def _listing_query(columns):
+        """Query for a user's active files selecting only columns (from LISTING_COLUMNS)"""
+        unknown = [column for column in columns if column not in File.LISTING_COLUMNS]
+        if unknown or not columns:
+            raise ValueError(f"Invalid listing columns: {columns}")
+        # Column names are checked against LISTING_COLUMNS, never taken from requests
+        return f"""
+        SELECT {', '.join(columns)}
+        FROM files
+        WHERE owner_id = %s AND status = 'active'
+        ORDER BY created_at DESC
+        """
+    
+    @staticmethod
+    def find_listing_by_owner(owner_id, columns):
+        """A user's active files with only the given listing columns, same order as find_by_owner"""
+        results = db_manager.execute_query(File._listing_query(columns), (owner_id,), fetch=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def iter_by_owner(conn, owner_id, columns=None):
+        """Stream a user's active files (listing columns only) on conn, same order as find_by_owner"""
+        query = File._listing_query(columns or File.LISTING_COLUMNS)
+        return db_manager.iter_rows(conn, query, (owner_id,))
+    
+    @staticmethod
+    def listing_totals(user_id):
+        """Counts and owned bytes of a user's file listing in one aggregate query"""
+        query = f"""
+        SELECT o.owned_count, o.owned_size,
+               (SELECT COUNT(*)
+                FROM {Share.RECEIVED_SHARES} s
+                JOIN files f ON s.file_id = f.id
+                WHERE f.status = 'active') AS shared_count
+        FROM (
+            SELECT COUNT(*) AS owned_count, COALESCE(SUM(size_bytes), 0) AS owned_size
+            FROM files
+            WHERE owner_id = %s AND status = 'active'
+        ) o
+        """
+        result = db_manager.execute_one(query, (user_id, user_id, user_id))
+        return dict(result)
+    
+    @staticmethod
+    def find_by_id(file_id, include_deleted=False):
+        """Find file by ID (files in the trash only when include_deleted)"""
         query = """
         SELECT f.*, u.username as owner_username
         FROM files f
         JOIN users u ON f.owner_id = u.id
-        WHERE f.id = %s
+        WHERE f.id = %s AND (%s OR f.status = 'active')
         """
-        result = db_manager.execute_one(query, (file_id,))
+        result = db_manager.execute_one(query, (file_id, include_deleted))
         return dict(result) if result else None
     
+    @staticmethod
+    def find_deleted_by_owner(owner_id, retention_days):
+        """Find a user's files in the trash that can still be restored"""
+        query = """
+        SELECT id, original_filename, content_type, size_bytes, created_at, deleted_at,
+               deleted_at + make_interval(days => %s) AS purge_after
+        FROM files
+        WHERE owner_id = %s AND status = 'deleted'
+          AND deleted_at > NOW() - make_interval(days => %s)
+        ORDER BY deleted_at DESC
+        """
+        results = db_manager.execute_query(query, (retention_days, owner_id, retention_days), fetch=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def soft_delete(file_ids, owner_id):
+        """
+        Move files to the trash (status 'deleted'); storage is moved and purged
+        by background jobs. Returns the rows that were deleted by this call
+        """
+        query = """
+        UPDATE files
+        SET status = 'deleted', deleted_at = NOW()
+        WHERE id = ANY(%s::uuid[]) AND owner_id = %s AND status = 'active'
+        RETURNING id, original_filename
+        """
+        results = db_manager.execute_query(query, (list(file_ids), owner_id), fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def restore(file_id, owner_id, retention_days):
+        """Take a file out of the trash if it is still inside the retention window"""
+        query = """
+        UPDATE files
+        SET status = 'active', deleted_at = NULL
+        WHERE id = %s AND owner_id = %s AND status = 'deleted'
+          AND deleted_at > NOW() - make_interval(days => %s)
+        RETURNING id, original_filename, size_bytes, storage_path
+        """
+        result = db_manager.execute_one(query, (file_id, owner_id, retention_days))
+        return dict(result) if result else None
+    
+    @staticmethod
+    def update_storage_path(file_id, storage_path):
+        """Point a file record at a new storage location"""
+        query = "UPDATE files SET storage_path = %s WHERE id = %s"
+        db_manager.execute_query(query, (storage_path, file_id))
+    
+    @staticmethod
+    def find_owner_status(file_ids):
+        """Owner and status of each existing file id (used to explain failed bulk operations)"""
+        query = "SELECT id, owner_id, status FROM files WHERE id = ANY(%s::uuid[])"
+        results = db_manager.execute_query(query, (list(file_ids),), fetch=True)
+        return {str(row['id']): dict(row) for row in results}
+    
     @staticmethod
     def delete_by_id(file_id, owner_id):
         """Delete file by ID (hard delete from database)"""
@@ -266,6 +445,47 @@ class File:
 class Share:
     """Share model for direct PostgreSQL operations"""
     
+    # Permission levels the shares.check_valid_permission constraint accepts; every
+    # endpoint writing shares validates against this list
+    PERMISSIONS = ('read', 'write', 'view', 'download', 'edit', 'full_access')
+    
+    # Columns share listings may select (sparse fieldsets): alias -> expression, per view
+    LISTING_COLUMNS = {
+        'received': {
+            'share_id': 's.id', 'file_id': 's.file_id', 'permission': 's.permission',
+            'shared_at': 's.created_at', 'original_filename': 'f.original_filename',
+            'size_bytes': 'f.size_bytes', 'content_type': 'f.content_type',
+            'file_created_at': 'f.created_at', 'owner_id': 'f.owner_id',
+            'owner_username': 'u.username', 'owner_name': 'u.name'
+        },
+        'sent': {
+            'share_id': 's.id', 'file_id': 's.file_id', 'permission': 's.permission',
+            'shared_at': 's.created_at', 'original_filename': 'f.original_filename',
+            'size_bytes': 'f.size_bytes', 'content_type': 'f.content_type',
+            'file_created_at': 'f.created_at', 'grantee_user_id': 's.grantee_user_id',
+            'grantee_username': 'u.username', 'grantee_name': 'u.name',
+            'grantee_group_id': 's.grantee_group_id', 'grantee_group_name': 'gr.name'
+        }
+    }
+    
+    # Shares a user received, directly or through a group they belong to: one row per
+    # file, a direct share winning over group shares. Both branches are index lookups
+    # (shares by grantee, memberships by user, then shares by group). Takes the user id twice
+    RECEIVED_SHARES = """
+    (SELECT DISTINCT ON (r.file_id) r.id, r.file_id, r.permission, r.created_at, r.grantee_group_id
+     FROM (
+         SELECT id, file_id, permission, created_at, grantee_group_id
+         FROM shares
+         WHERE grantee_user_id = %s
+         UNION ALL
+         SELECT s.id, s.file_id, s.permission, s.created_at, s.grantee_group_id
+         FROM group_members gm
+         JOIN shares s ON s.grantee_group_id = gm.group_id
+         WHERE gm.user_id = %s
+     ) r
+     ORDER BY r.file_id, r.grantee_group_id IS NOT NULL, r.created_at DESC)
+    """
+    
     @staticmethod
     def create(file_id, grantee_user_id, permission='read'):
         """Create a new file share"""
@@ -284,6 +504,49 @@ class Share:
             logger.error(f"Error creating share: {e}")
             return None
     
+    @staticmethod
+    def bulk_upsert(owner_id, file_ids, usernames, permission):
+        """
+        Share every active file of owner_id in file_ids with every active user in
+        usernames (other than the owner) in one statement; existing shares get the
+        new permission. Ids and usernames that don't qualify are left out.
+        
+        Returns:
+            one row per share written: share_id, file_id, original_filename,
+            grantee_user_id, grantee_username, permission, shared_at, and
+            created (False when an existing share was updated)
+        """
+        query = """
+        WITH targets AS (
+            SELECT id, original_filename
+            FROM files
+            WHERE id = ANY(%s::uuid[]) AND owner_id = %s AND status = 'active'
+        ),
+        grantees AS (
+            SELECT id, username
+            FROM users
+            WHERE username = ANY(%s::text[]) AND is_active = TRUE AND id <> %s
+        ),
+        upserted AS (
+            INSERT INTO shares (file_id, grantee_user_id, permission, created_at)
+            SELECT t.id, g.id, %s, %s
+            FROM targets t CROSS JOIN grantees g
+            -- Rows (and the change versions their triggers bump) in a fixed order
+            ORDER BY g.id, t.id
+            ON CONFLICT (file_id, grantee_user_id) DO UPDATE SET permission = EXCLUDED.permission
+            RETURNING id, file_id, grantee_user_id, permission, created_at, (xmax = 0) AS created
+        )
+        SELECT s.id AS share_id, s.file_id, t.original_filename, s.grantee_user_id,
+               g.username AS grantee_username, s.permission, s.created_at AS shared_at, s.created
+        FROM upserted s
+        JOIN targets t ON t.id = s.file_id
+        JOIN grantees g ON g.id = s.grantee_user_id
+        ORDER BY s.grantee_user_id, s.file_id
+        """
+        params = (list(file_ids), owner_id, list(usernames), owner_id, permission, utcnow())
+        results = db_manager.execute_query(query, params, fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
     @staticmethod
     def find_by_file_and_grantee(file_id, grantee_user_id):
         """Find a specific share by file and grantee"""
@@ -297,33 +560,131 @@ class Share:
         return dict(result) if result else None
     
     @staticmethod
-    def find_shared_with_user(user_id):
-        """Find all files shared with a user (files user has received)"""
+    def find_effective(file_id, user_id):
+        """
+        The share through which a user reaches a file: their own share, else the
+        most recent share with one of their groups (None when there is neither)
+        """
         query = """
+        SELECT * FROM (
+            SELECT id, file_id, grantee_user_id, grantee_group_id, permission, created_at
+            FROM shares
+            WHERE file_id = %s AND grantee_user_id = %s
+            UNION ALL
+            SELECT s.id, s.file_id, s.grantee_user_id, s.grantee_group_id, s.permission, s.created_at
+            FROM shares s
+            JOIN group_members gm ON gm.group_id = s.grantee_group_id AND gm.user_id = %s
+            WHERE s.file_id = %s
+        ) r
+        ORDER BY r.grantee_group_id IS NOT NULL, r.created_at DESC
+        LIMIT 1
+        """
+        result = db_manager.execute_one(query, (file_id, user_id, user_id, file_id))
+        return dict(result) if result else None
+    
+    @staticmethod
+    def find_shared_with_user(user_id):
+        """Find all files shared with a user (files user has received, directly or through groups)"""
+        query = f"""
         SELECT s.id as share_id, s.file_id, s.permission, s.created_at as shared_at,
+               s.grantee_group_id,
                f.original_filename, f.size_bytes, f.content_type, f.created_at as file_created_at,
                f.owner_id,
                u.username as owner_username, u.name as owner_name
-        FROM shares s
+        FROM {Share.RECEIVED_SHARES} s
         JOIN files f ON s.file_id = f.id
         JOIN users u ON f.owner_id = u.id
-        WHERE s.grantee_user_id = %s
+        WHERE f.status = 'active'
+        ORDER BY s.created_at DESC
+        """
+        results = db_manager.execute_query(query, (user_id, user_id), fetch=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def _listing_query(view, columns, paginate=False):
+        """
+        Query for shares received by ('received') or sent by ('sent') a user,
+        selecting only columns (keys of LISTING_COLUMNS[view])
+        """
+        expressions = Share.LISTING_COLUMNS[view]
+        unknown = [column for column in columns if column not in expressions]
+        if unknown or not columns:
+            raise ValueError(f"Invalid listing columns: {columns}")
+        # Expressions come from LISTING_COLUMNS, never from requests
+        select = ', '.join(f"{expressions[column]} AS {column}" for column in columns)
+        joins = []
+        if view == 'received':
+            source, where = Share.RECEIVED_SHARES, "f.status = 'active'"
+            joins.append(("u.", "JOIN users u ON f.owner_id = u.id"))
+        else:
+            # Shares with groups have no grantee user, and the other way round
+            source, where = "shares", "f.owner_id = %s AND f.status = 'active'"
+            joins.append(("u.", "LEFT JOIN users u ON s.grantee_user_id = u.id"))
+            joins.append(("gr.", "LEFT JOIN groups gr ON s.grantee_group_id = gr.id"))
+        joins = '\n        '.join(
+            join for prefix, join in joins
+            if any(expressions[column].startswith(prefix) for column in columns)
+        )
+        return f"""
+        SELECT {select}
+        FROM {source} s
+        JOIN files f ON s.file_id = f.id
+        {joins}
+        WHERE {where}
         ORDER BY s.created_at DESC
+        {'LIMIT %s OFFSET %s' if paginate else ''}
         """
-        results = db_manager.execute_query(query, (user_id,), fetch=True)
+    
+    @staticmethod
+    def _listing_params(view, user_id):
+        """Parameters of _listing_query (and count_listing) for a user"""
+        return (user_id, user_id) if view == 'received' else (user_id,)
+    
+    @staticmethod
+    def find_listing(user_id, view, columns, limit=None, offset=0):
+        """One page (or all, without limit) of a user's received or sent shares with only the given columns"""
+        params = Share._listing_params(view, user_id)
+        if limit is None:
+            query = Share._listing_query(view, columns)
+        else:
+            query, params = Share._listing_query(view, columns, paginate=True), params + (limit, offset)
+        results = db_manager.execute_query(query, params, fetch=True)
         return [dict(row) for row in results]
     
+    @staticmethod
+    def count_listing(user_id, view):
+        """Number of shares a user has received (directly or through groups) or sent (on active files)"""
+        if view == 'received':
+            source, where = Share.RECEIVED_SHARES, "f.status = 'active'"
+        else:
+            source, where = "shares", "f.owner_id = %s AND f.status = 'active'"
+        query = f"""
+        SELECT COUNT(*) AS total
+        FROM {source} s
+        JOIN files f ON s.file_id = f.id
+        WHERE {where}
+        """
+        return db_manager.execute_one(query, Share._listing_params(view, user_id))['total']
+    
+    @staticmethod
+    def iter_shared_with_user(conn, user_id, columns=None):
+        """Stream files shared with a user on conn, same rows and order as find_shared_with_user"""
+        query = Share._listing_query('received', columns or list(Share.LISTING_COLUMNS['received']))
+        return db_manager.iter_rows(conn, query, Share._listing_params('received', user_id))
+    
     @staticmethod
     def find_by_owner(owner_id):
-        """Find all shares created by an owner (files owner has shared)"""
+        """Find all shares created by an owner (files owner has shared, with users and with groups)"""
         query = """
         SELECT s.id as share_id, s.file_id, s.grantee_user_id, s.permission, s.created_at as shared_at,
                f.original_filename, f.size_bytes, f.content_type, f.created_at as file_created_at,
-               u.username as grantee_username, u.name as grantee_name
+               u.username as grantee_username, u.name as grantee_name,
+               s.grantee_group_id, gr.name as grantee_group_name
         FROM shares s
         JOIN files f ON s.file_id = f.id
-        JOIN users u ON s.grantee_user_id = u.id
-        WHERE f.owner_id = %s
+        LEFT JOIN users u ON s.grantee_user_id = u.id
+        LEFT JOIN groups gr ON s.grantee_group_id = gr.id
+        WHERE f.owner_id = %s AND f.status = 'active'
         ORDER BY s.created_at DESC
         """
         results = db_manager.execute_query(query, (owner_id,), fetch=True)
@@ -331,12 +692,14 @@ class Share:
     
     @staticmethod
     def find_by_file(file_id):
-        """Find all shares for a specific file"""
+        """Find all shares for a specific file (with users and with groups)"""
         query = """
         SELECT s.id as share_id, s.grantee_user_id, s.permission, s.created_at as shared_at,
-               u.username as grantee_username, u.name as grantee_name, u.email as grantee_email
+               u.username as grantee_username, u.name as grantee_name, u.email as grantee_email,
+               s.grantee_group_id, gr.name as grantee_group_name
         FROM shares s
-        JOIN users u ON s.grantee_user_id = u.id
+        LEFT JOIN users u ON s.grantee_user_id = u.id
+        LEFT JOIN groups gr ON s.grantee_group_id = gr.id
         WHERE s.file_id = %s
         ORDER BY s.created_at DESC
         """
@@ -354,6 +717,103 @@ class Share:
         result = db_manager.execute_one(query, (file_id, grantee_user_id))
         return dict(result) if result else None
     
+    @staticmethod
+    def bulk_upsert_group(owner_id, file_ids, group_id, permission):
+        """
+        Share every active file of owner_id in file_ids with one of the owner's
+        groups in one statement: one row per file, however many members the group has
+        
+        Returns:
+            one row per share written: share_id, file_id, original_filename,
+            grantee_group_id, permission, shared_at, created
+        """
+        query = """
+        WITH upserted AS (
+            INSERT INTO shares (file_id, grantee_group_id, permission, created_at)
+            SELECT f.id, gr.id, %s, %s
+            FROM files f
+            JOIN groups gr ON gr.id = %s AND gr.owner_id = f.owner_id
+            WHERE f.id = ANY(%s::uuid[]) AND f.owner_id = %s AND f.status = 'active'
+            ORDER BY f.id
+            ON CONFLICT (file_id, grantee_group_id) DO UPDATE SET permission = EXCLUDED.permission
+            RETURNING id, file_id, grantee_group_id, permission, created_at, (xmax = 0) AS created
+        )
+        SELECT s.id AS share_id, s.file_id, f.original_filename, s.grantee_group_id,
+               s.permission, s.created_at AS shared_at, s.created
+        FROM upserted s
+        JOIN files f ON f.id = s.file_id
+        ORDER BY s.file_id
+        """
+        params = (permission, utcnow(), group_id, list(file_ids), owner_id)
+        results = db_manager.execute_query(query, params, fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def _owner_share_filter(file_ids=None, grantee_ids=None, usernames=None, group_ids=None):
+        """
+        WHERE clause (and params) for shares s of files f chosen by file ids and/or
+        grantees (user ids, usernames or group ids); at least one must be given
+        """
+        conditions, params = [], []
+        if file_ids is not None:
+            conditions.append("f.id = ANY(%s::uuid[])")
+            params.append(list(file_ids))
+        if grantee_ids is not None or usernames is not None or group_ids is not None:
+            conditions.append(
+                "(s.grantee_user_id = ANY(%s::int[])"
+                " OR s.grantee_user_id IN (SELECT id FROM users WHERE username = ANY(%s::text[]))"
+                " OR s.grantee_group_id = ANY(%s::int[]))"
+            )
+            params.extend([list(grantee_ids or []), list(usernames or []), list(group_ids or [])])
+        if not conditions:
+            raise ValueError("Choose shares by file ids, grantees, or both")
+        return ' AND '.join(conditions), params
+    
+    @staticmethod
+    def bulk_revoke(owner_id, file_ids=None, grantee_ids=None, usernames=None, group_ids=None):
+        """
+        Delete the shares of owner_id's files chosen by file ids and/or grantees
+        (e.g. only grantees: everything shared with those users) in one statement
+        
+        Returns:
+            one row per deleted share: share_id, file_id, original_filename,
+            grantee_user_id, grantee_group_id
+        """
+        where, params = Share._owner_share_filter(file_ids, grantee_ids, usernames, group_ids)
+        query = f"""
+        DELETE FROM shares s
+        USING files f
+        WHERE s.file_id = f.id AND f.owner_id = %s AND {where}
+        RETURNING s.id AS share_id, s.file_id, f.original_filename, s.grantee_user_id, s.grantee_group_id
+        """
+        results = db_manager.execute_query(query, [owner_id] + params, fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def bulk_update_permission(owner_id, permission, file_ids=None, grantee_ids=None, usernames=None,
+                               group_ids=None):
+        """
+        Set the permission of the shares of owner_id's files chosen by file ids
+        and/or grantees in one statement (shares that already have it are left alone)
+        
+        Returns:
+            one row per changed share: share_id, file_id, original_filename,
+            grantee_user_id, grantee_group_id, permission
+        """
+        where, params = Share._owner_share_filter(file_ids, grantee_ids, usernames, group_ids)
+        query = f"""
+        UPDATE shares s
+        SET permission = %s
+        FROM files f
+        WHERE s.file_id = f.id AND f.owner_id = %s AND {where}
+          AND s.permission IS DISTINCT FROM %s
+        RETURNING s.id AS share_id, s.file_id, f.original_filename, s.grantee_user_id,
+                  s.grantee_group_id, s.permission
+        """
+        params = [permission, owner_id] + params + [permission]
+        results = db_manager.execute_query(query, params, fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
     @staticmethod
     def revoke_share(share_id):
         """Revoke a share by share ID"""
@@ -365,22 +825,145 @@ class Share:
         result = db_manager.execute_one(query, (share_id,))
         return dict(result) if result else None
 
+class Group:
+    """Group model: users a file owner shares with as one grantee"""
+    
+    @staticmethod
+    def create(owner_id, name):
+        """Create a group; None when the owner already has one with that name"""
+        query = """
+        INSERT INTO groups (owner_id, name, created_at)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (owner_id, name) DO NOTHING
+        RETURNING id, owner_id, name, created_at
+        """
+        result = db_manager.execute_one(query, (owner_id, name, utcnow()))
+        return dict(result) if result else None
+    
+    @staticmethod
+    def find_owned(group_id, owner_id):
+        """A group of owner_id with its member count, or None"""
+        query = """
+        SELECT gr.id, gr.owner_id, gr.name, gr.created_at,
+               (SELECT COUNT(*) FROM group_members gm WHERE gm.group_id = gr.id) AS member_count
+        FROM groups gr
+        WHERE gr.id = %s AND gr.owner_id = %s
+        """
+        result = db_manager.execute_one(query, (group_id, owner_id))
+        return dict(result) if result else None
+    
+    @staticmethod
+    def find_by_owner(owner_id):
+        """Groups of an owner with their member counts"""
+        query = """
+        SELECT gr.id, gr.name, gr.created_at, COUNT(gm.user_id) AS member_count
+        FROM groups gr
+        LEFT JOIN group_members gm ON gm.group_id = gr.id
+        WHERE gr.owner_id = %s
+        GROUP BY gr.id
+        ORDER BY gr.name
+        """
+        results = db_manager.execute_query(query, (owner_id,), fetch=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def find_members(group_id):
+        """Members of a group"""
+        query = """
+        SELECT u.id AS user_id, u.username, u.name, gm.added_at
+        FROM group_members gm
+        JOIN users u ON u.id = gm.user_id
+        WHERE gm.group_id = %s
+        ORDER BY u.username
+        """
+        results = db_manager.execute_query(query, (group_id,), fetch=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def find_member_ids(group_ids):
+        """User ids of the members of each group, keyed by group id (one query)"""
+        query = """
+        SELECT group_id, user_id FROM group_members
+        WHERE group_id = ANY(%s::int[])
+        ORDER BY group_id, user_id
+        """
+        results = db_manager.execute_query(query, (list(group_ids),), fetch=True)
+        members = {}
+        for row in results:
+            members.setdefault(row['group_id'], []).append(row['user_id'])
+        return members
+    
+    @staticmethod
+    def add_members(group_id, owner_id, usernames):
+        """
+        Add active users (other than the owner) to a group in one statement: one
+        membership row each, whatever the group shares. Returns the users added
+        (not those already members)
+        """
+        query = """
+        WITH added AS (
+            INSERT INTO group_members (group_id, user_id, added_at)
+            SELECT %s, id, %s
+            FROM users
+            WHERE username = ANY(%s::text[]) AND is_active = TRUE AND id <> %s
+            ORDER BY id
+            ON CONFLICT (group_id, user_id) DO NOTHING
+            RETURNING user_id
+        )
+        SELECT u.id AS user_id, u.username
+        FROM added a
+        JOIN users u ON u.id = a.user_id
+        """
+        params = (group_id, utcnow(), list(usernames), owner_id)
+        results = db_manager.execute_query(query, params, fetch=True, commit=True)
+        return [dict(row) for row in results]
+    
+    @staticmethod
+    def remove_member(group_id, user_id):
+        """Remove a user from a group"""
+        query = """
+        DELETE FROM group_members
+        WHERE group_id = %s AND user_id = %s
+        RETURNING group_id, user_id
+        """
+        result = db_manager.execute_one(query, (group_id, user_id))
+        return dict(result) if result else None
+    
+    @staticmethod
+    def delete(group_id, owner_id):
+        """Delete a group (its memberships and shares go with it)"""
+        query = """
+        DELETE FROM groups
+        WHERE id = %s AND owner_id = %s
+        RETURNING id, name
+        """
+        result = db_manager.execute_one(query, (group_id, owner_id))
+        return dict(result) if result else None
+
 def check_access(user_id, file_id):
     """
     Check if a user has access to a file
     Returns True if user is the owner or has been granted access via shares
+    (with the user or with a group the user belongs to)
     """
     try:
         query = """
         SELECT EXISTS (
-            SELECT 1 FROM files WHERE id = %s AND owner_id = %s
+            SELECT 1 FROM files WHERE id = %s AND owner_id = %s AND status = 'active'
+            UNION
+            SELECT 1 FROM shares s JOIN files f ON f.id = s.file_id
+            WHERE s.file_id = %s AND s.grantee_user_id = %s AND f.status = 'active'
             UNION
-            SELECT 1 FROM shares WHERE file_id = %s AND grantee_user_id = %s
+            -- Shares with the user's groups: (file, group) share index, (group, user) membership key
+            SELECT 1 FROM shares s
+            JOIN group_members gm ON gm.group_id = s.grantee_group_id AND gm.user_id = %s
+            JOIN files f ON f.id = s.file_id
+            WHERE s.file_id = %s AND f.status = 'active'
         )
         """
         with db_manager.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(query, (file_id, user_id, file_id, user_id))
+                cursor.execute(query, (file_id, user_id, file_id, user_id, user_id, file_id))
                 result = cursor.fetchone()
                 return result[0] if result else False
     except Exception as e:
@@ -0,0 +1,305 @@
+"""
+Account Deletion Pipeline
+DELETE /api/users/account only deactivates the user and queues a row in
+account_deletions. This job tears the account down in phases - shares, groups
+and memberships, files (rows in batches, ciphertext removed in parallel), storage
+folders and profile photos, then sync events and analytics - recording the phase and counters after
+every batch so an interrupted teardown resumes where it stopped. Progress is
+reported to the user as account_deletion_progress sync events up to the events
+phase; completion is read from GET /api/users/account/deletion.
+"""
+import glob
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import psycopg2.extras
+
+from database import db_manager
+from storage_manager import storage_manager
+from utils.batching import batched_delete, BATCH_PAUSE
+from utils.metrics import metrics
+from utils.sync_events import emit_sync_event
+
+logger = logging.getLogger(__name__)
+
+# Teardown phases, in order
+PHASES = ('shares', 'groups', 'files', 'storage', 'events', 'done')
+
+# File rows deleted per transaction
+FILE_BATCH_SIZE = 200
+
+# Threads removing ciphertext at the same time
+STORAGE_WORKERS = int(os.environ.get('ACCOUNT_DELETION_WORKERS', 8))
+
+# Seconds a run may take; unfinished accounts continue on the next run
+MAX_RUNTIME = 240
+
+# Minimum seconds between progress events for one account
+PROGRESS_INTERVAL = 2.0
+
+PROFILE_PHOTO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profile_photos')
+
+def request_account_deletion(user_id):
+    """
+    Deactivate a user and queue their account for teardown
+
+    Returns:
+        The account_deletions row (the existing one if already queued)
+    """
+    with db_manager.get_connection() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute(
+                "UPDATE users SET is_active = FALSE, updated_at = NOW() WHERE id = %s",
+                (user_id,)
+            )
+            cursor.execute(
+                """
+                INSERT INTO account_deletions (user_id)
+                VALUES (%s)
+                ON CONFLICT (user_id) DO NOTHING
+                """,
+                (user_id,)
+            )
+            cursor.execute("SELECT * FROM account_deletions WHERE user_id = %s", (user_id,))
+            deletion = cursor.fetchone()
+            conn.commit()
+    return dict(deletion)
+
+def get_account_deletion(user_id):
+    """Current state of a user's account deletion, or None if never requested"""
+    result = db_manager.execute_one("SELECT * FROM account_deletions WHERE user_id = %s", (user_id,))
+    return dict(result) if result else None
+
+def format_deletion(deletion):
+    """account_deletions row as returned by the API and progress events"""
+    files_total = deletion['files_total']
+    return {
+        'status': deletion['status'],
+        'phase': deletion['phase'],
+        'files_total': files_total,
+        'files_deleted': deletion['files_deleted'],
+        'shares_deleted': deletion['shares_deleted'],
+        'bytes_freed': deletion['bytes_freed'],
+        'percent': 100 if deletion['phase'] == 'done' else (
+            min(99, deletion['files_deleted'] * 100 // files_total) if files_total else 0
+        ),
+        'requested_at': deletion['requested_at'].isoformat(),
+        'completed_at': deletion['completed_at'].isoformat() if deletion.get('completed_at') else None
+    }
+
+def save_progress(deletion):
+    """Persist phase and counters so a later run resumes from here"""
+    db_manager.execute_query(
+        """
+        UPDATE account_deletions
+        SET status = %s, phase = %s, files_total = %s, files_deleted = %s,
+            shares_deleted = %s, bytes_freed = %s, events_deleted = %s, error = NULL,
+            started_at = COALESCE(started_at, NOW()),
+            completed_at = CASE WHEN %s = 'completed' THEN NOW() ELSE completed_at END,
+            updated_at = NOW()
+        WHERE user_id = %s
+        """,
+        (deletion['status'], deletion['phase'], deletion['files_total'], deletion['files_deleted'],
+         deletion['shares_deleted'], deletion['bytes_freed'], deletion['events_deleted'],
+         deletion['status'], deletion['user_id'])
+    )
+
+def report_progress(deletion, force=False):
+    """Emit an account_deletion_progress event, throttled to PROGRESS_INTERVAL"""
+    now = time.monotonic()
+    if not force and now - deletion.get('_reported_at', 0) < PROGRESS_INTERVAL:
+        return
+    deletion['_reported_at'] = now
+    try:
+        emit_sync_event(deletion['user_id'], 'account_deletion_progress', format_deletion(deletion))
+    except Exception as e:
+        logger.warning(f"Failed to emit account deletion progress: {e}")
+
+def remove_stored_file(storage_path):
+    """Remove one ciphertext file. Returns the bytes freed (0 if already gone)"""
+    try:
+        size = os.path.getsize(storage_path)
+        os.remove(storage_path)
+        return size
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        logger.error(f"Failed to remove {storage_path}: {e}")
+        return 0
+
+def remove_profile_photos(user_id):
+    """Remove a user's profile photo and any derived sizes"""
+    removed = 0
+    for path in glob.glob(os.path.join(PROFILE_PHOTO_DIR, f'user_{user_id}.*')) + \
+            glob.glob(os.path.join(PROFILE_PHOTO_DIR, f'user_{user_id}_*')):
+        removed += remove_stored_file(path)
+    return removed
+
+def delete_shares(deletion, deadline):
+    """Shares the user received and shares of the user's files"""
+    for name, select_ids in (
+        ('account_deletion_received_shares', "SELECT id FROM shares WHERE grantee_user_id = %s"),
+        ('account_deletion_owned_shares',
+         "SELECT s.id FROM shares s JOIN files f ON f.id = s.file_id WHERE f.owner_id = %s"),
+    ):
+        stats = batched_delete(name, 'shares', select_ids, (deletion['user_id'],),
+                               max_runtime=max(deadline - time.monotonic(), 1))
+        deletion['shares_deleted'] += stats['rows']
+        if not stats['completed']:
+            return False
+    return True
+
+def delete_groups(deletion):
+    """The user's memberships in other users' groups, then the user's own groups"""
+    db_manager.execute_query("DELETE FROM group_members WHERE user_id = %s", (deletion['user_id'],))
+    # Cascades to the groups' memberships (their shares went with the user's files' shares)
+    db_manager.execute_query("DELETE FROM groups WHERE owner_id = %s", (deletion['user_id'],))
+    return True
+
+def delete_files(deletion, deadline, pool):
+    """File rows in batches, removing each batch's ciphertext in parallel first"""
+    while time.monotonic() < deadline:
+        rows = db_manager.execute_query(
+            "SELECT id, storage_path FROM files WHERE owner_id = %s LIMIT %s",
+            (deletion['user_id'], FILE_BATCH_SIZE),
+            fetch=True
+        )
+        if not rows:
+            return True
+
+        # Files first: if the row delete fails, the next run finds them already gone
+        paths = [row['storage_path'] for row in rows if row['storage_path']]
+        deletion['bytes_freed'] += sum(pool.map(remove_stored_file, paths))
+
+        deleted = db_manager.execute_query(
+            "DELETE FROM files WHERE id = ANY(%s::uuid[]) AND owner_id = %s",
+            ([str(row['id']) for row in rows], deletion['user_id'])
+        )
+        deletion['files_deleted'] += deleted
+        metrics.incr('account_deletion.files_deleted', deleted)
+
+        save_progress(deletion)
+        report_progress(deletion)
+        time.sleep(BATCH_PAUSE)
+    return False
+
+def delete_storage(deletion):
+    """Whatever is left under the user's storage folder, plus profile photos"""
+    user = db_manager.execute_one("SELECT username FROM users WHERE id = %s", (deletion['user_id'],))
+    if user:
+        deletion['bytes_freed'] += storage_manager.delete_user_folders(user['username'], deletion['user_id'])
+    deletion['bytes_freed'] += remove_profile_photos(deletion['user_id'])
+    return True
+
+def delete_events(deletion, deadline):
+    """Sync events and analytics rollups"""
+    stats = batched_delete('account_deletion_events', 'sync_events',
+                           "SELECT id FROM sync_events WHERE user_id = %s", (deletion['user_id'],),
+                           max_runtime=max(deadline - time.monotonic(), 1))
+    deletion['events_deleted'] += stats['rows']
+    if not stats['completed']:
+        return False
+    for table in ('user_usage_hourly', 'user_stats_daily', 'user_stats'):
+        db_manager.execute_query(f"DELETE FROM {table} WHERE user_id = %s", (deletion['user_id'],))
+    return True
+
+def teardown_account(deletion, deadline, pool):
+    """
+    Advance one account through the remaining phases
+
+    Returns:
+        True when the account is completely removed
+    """
+    user_id = deletion['user_id']
+    if deletion['status'] == 'pending':
+        deletion['status'] = 'running'
+        deletion['files_total'] = db_manager.execute_one(
+            "SELECT COUNT(*) AS count FROM files WHERE owner_id = %s", (user_id,)
+        )['count']
+        save_progress(deletion)
+        report_progress(deletion, force=True)
+        logger.info(f"Account deletion started for user {user_id}: {deletion['files_total']} files")
+
+    while deletion['phase'] != 'done':
+        phase = deletion['phase']
+        if phase == 'shares':
+            finished = delete_shares(deletion, deadline)
+        elif phase == 'groups':
+            finished = delete_groups(deletion)
+        elif phase == 'files':
+            finished = delete_files(deletion, deadline, pool)
+        elif phase == 'storage':
+            finished = delete_storage(deletion)
+        else:
+            finished = delete_events(deletion, deadline)
+
+        if not finished:
+            save_progress(deletion)
+            return False
+
+        deletion['phase'] = PHASES[PHASES.index(phase) + 1]
+        if deletion['phase'] == 'done':
+            deletion['status'] = 'completed'
+            deletion['completed_at'] = datetime.now(timezone.utc)
+        save_progress(deletion)
+        # The last event is the one announcing the events phase: anything emitted after
+        # it would store new sync events and activity rows for the removed account
+        if deletion['phase'] != 'done':
+            report_progress(deletion, force=True)
+
+        if time.monotonic() >= deadline and deletion['phase'] != 'done':
+            return False
+
+    logger.info(
+        f"Account deleted for user {user_id}: {deletion['files_deleted']} files, "
+        f"{deletion['shares_deleted']} shares, {deletion['bytes_freed']} bytes freed"
+    )
+    return True
+
+def process_account_deletions(max_runtime=MAX_RUNTIME):
+    """
+    Work through queued account deletions, oldest first
+
+    Returns:
+        dict with accounts completed, accounts still pending and failures
+    """
+    deadline = time.monotonic() + max_runtime
+    stats = {'completed': 0, 'remaining': 0, 'failed': 0}
+
+    deletions = db_manager.execute_query(
+        """
+        SELECT * FROM account_deletions
+        WHERE status IN ('pending', 'running')
+        ORDER BY requested_at
+        """,
+        fetch=True
+    )
+    if not deletions:
+        return stats
+
+    with ThreadPoolExecutor(max_workers=STORAGE_WORKERS) as pool:
+        for row in deletions:
+            deletion = dict(row)
+            if time.monotonic() >= deadline:
+                stats['remaining'] += 1
+                continue
+            try:
+                if teardown_account(deletion, deadline, pool):
+                    stats['completed'] += 1
+                else:
+                    stats['remaining'] += 1
+            except Exception as e:
+                # Left open with the error recorded; the next run retries from the saved phase
+                logger.error(f"Account deletion failed for user {deletion['user_id']}: {e}")
+                db_manager.execute_query(
+                    "UPDATE account_deletions SET error = %s, updated_at = NOW() WHERE user_id = %s",
+                    (str(e), deletion['user_id'])
+                )
+                stats['failed'] += 1
+
+    metrics.incr('account_deletion.accounts_completed', stats['completed'])
+    metrics.set_gauge('account_deletion.accounts_pending', stats['remaining'] + stats['failed'])
+    return stats
@@ -0,0 +1,237 @@
+"""
+Cluster Coordination for Background Jobs
+PostgreSQL advisory locks elect one scheduler leader across all processes and
+guard each job run, so maintenance runs once per interval however many
+gunicorn workers start a scheduler. Every run is recorded in job_runs, which
+keeps JOB_RUN_RETENTION_DAYS of history.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import logging
+
+import psycopg2
+
+from database import db_manager
+from utils.batching import batched_delete
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LEADER_LOCK = 'cryptovault:scheduler-leader'
+
+# Days of job_runs history kept (two jobs run every minute)
+JOB_RUN_RETENTION_DAYS = int(os.environ.get('JOB_RUN_RETENTION_DAYS', 14))
+
+def advisory_lock_key(name):
+    """Map a lock name to the signed 64-bit key pg_advisory_lock expects"""
+    digest = hashlib.sha256(name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+class LeaderElection:
+    """
+    Scheduler leadership backed by a session-level advisory lock
+    The lock lives on a dedicated connection: if the leader process dies its
+    session ends, the lock is released and the next heartbeat elsewhere wins it.
+    Per-job locks are taken on the same connection, so a long job doesn't hold
+    a pool connection for its whole run
+    """
+
+    def __init__(self, name=SCHEDULER_LEADER_LOCK):
+        self.name = name
+        self.key = advisory_lock_key(name)
+        self.conn = None
+        self.is_leader = False
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """Open the dedicated connection if needed (callers hold self.lock)"""
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(**db_manager.connection_params)
+            self.conn.autocommit = True
+            self.is_leader = False
+
+    def try_acquire(self):
+        """Become (or confirm being) the leader. Returns True while leading"""
+        with self.lock:
+            try:
+                self._connect()
+
+                with self.conn.cursor() as cursor:
+                    if self.is_leader:
+                        # Keep-alive: the lock is held for as long as this session lives
+                        cursor.execute("SELECT 1")
+                    else:
+                        cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.key,))
+                        self.is_leader = cursor.fetchone()[0]
+                        if self.is_leader:
+                            logger.info(f"Process {os.getpid()} is now the job scheduler leader")
+            except psycopg2.Error as e:
+                logger.error(f"Lost scheduler leadership connection: {e}")
+                self._close()
+            return self.is_leader
+
+    def try_lock(self, key):
+        """Take a session advisory lock on the dedicated connection without waiting"""
+        with self.lock:
+            try:
+                self._connect()
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+                    return cursor.fetchone()[0]
+            except psycopg2.Error as e:
+                logger.error(f"Failed to take advisory lock {key}: {e}")
+                self._close()
+                return False
+
+    def unlock(self, key):
+        """Release a lock taken with try_lock (gone anyway if the session was lost)"""
+        with self.lock:
+            if self.conn is None or self.conn.closed:
+                return
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (key,))
+            except psycopg2.Error as e:
+                logger.warning(f"Error releasing advisory lock {key}: {e}")
+                self._close()
+
+    def release(self):
+        """Give up leadership"""
+        with self.lock:
+            if self.conn is not None and not self.conn.closed and self.is_leader:
+                try:
+                    with self.conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", (self.key,))
+                except psycopg2.Error as e:
+                    logger.warning(f"Error releasing scheduler leadership: {e}")
+            self._close()
+
+    def _close(self):
+        if self.conn is not None and not self.conn.closed:
+            self.conn.close()
+        self.conn = None
+        self.is_leader = False
+
+def _worker_identity():
+    return socket.gethostname()[:255], os.getpid()
+
+def record_job_start(job_id):
+    """Insert a running job_runs row and return its id"""
+    host, pid = _worker_identity()
+    query = """
+    INSERT INTO job_runs (job_id, status, host, pid, started_at)
+    VALUES (%s, 'running', %s, %s, NOW())
+    RETURNING id
+    """
+    result = db_manager.execute_one(query, (job_id, host, pid))
+    return result['id'] if result else None
+
+def record_job_finish(run_id, status, result=None, error=None, duration=None):
+    """Mark a job run as succeeded or failed"""
+    query = """
+    UPDATE job_runs
+    SET status = %s, result = %s, error = %s, duration_seconds = %s, finished_at = NOW()
+    WHERE id = %s
+    """
+    db_manager.execute_query(query, (
+        status,
+        json.dumps(result, default=str) if result is not None else None,
+        error,
+        duration,
+        run_id
+    ))
+
+def ran_recently(job_id, min_interval_seconds):
+    """Check whether any process started this job within the interval"""
+    query = """
+    SELECT EXISTS (
+        SELECT 1 FROM job_runs
+        WHERE job_id = %s
+          AND status IN ('running', 'succeeded')
+          AND started_at > NOW() - make_interval(secs => %s)
+    ) AS recent
+    """
+    result = db_manager.execute_one(query, (job_id, min_interval_seconds))
+    return bool(result and result['recent'])
+
+def get_job_runs(job_id=None, limit=50):
+    """Most recent job runs, optionally for one job"""
+    if job_id:
+        query = """
+        SELECT * FROM job_runs WHERE job_id = %s
+        ORDER BY started_at DESC LIMIT %s
+        """
+        params = (job_id, limit)
+    else:
+        query = "SELECT * FROM job_runs ORDER BY started_at DESC LIMIT %s"
+        params = (limit,)
+    results = db_manager.execute_query(query, params, fetch=True)
+    return [dict(row) for row in results]
+
+def prune_job_runs(days=JOB_RUN_RETENTION_DAYS):
+    """Delete finished job runs older than the retention window, in small batches"""
+    select_ids = """
+    SELECT id FROM job_runs
+    WHERE started_at < NOW() - make_interval(days => %s)
+      AND status <> 'running'
+    """
+    stats = batched_delete('cleanup_job_runs', 'job_runs', select_ids, (days,))
+    return stats['rows']
+
+def load_job_state(job_id):
+    """Checkpoint saved by a previous run of a resumable job, or None"""
+    result = db_manager.execute_one("SELECT state FROM job_state WHERE job_id = %s", (job_id,))
+    return result['state'] if result else None
+
+def save_job_state(job_id, state):
+    """Save (or clear, when state is None) a resumable job's checkpoint"""
+    if state is None:
+        db_manager.execute_query("DELETE FROM job_state WHERE job_id = %s", (job_id,))
+        return
+    query = """
+    INSERT INTO job_state (job_id, state, updated_at)
+    VALUES (%s, %s, NOW())
+    ON CONFLICT (job_id) DO UPDATE SET state = EXCLUDED.state, updated_at = NOW()
+    """
+    db_manager.execute_query(query, (job_id, json.dumps(state, default=str)))
+
+def run_exclusive(job_id, func, locks, min_interval_seconds=None):
+    """
+    Run func at most once at a time across the cluster and record the run
+
+    Args:
+        job_id: Scheduler job id (also the advisory lock name)
+        func: Callable doing the work; its return value is stored as the result
+        locks: LeaderElection whose dedicated connection holds the job lock
+        min_interval_seconds: Skip when another process started the job this recently
+
+    Returns:
+        func's result, or None when the run was skipped or failed
+    """
+    key = advisory_lock_key(f'cryptovault:job:{job_id}')
+
+    if not locks.try_lock(key):
+        logger.info(f"Job {job_id} is already running elsewhere, skipping")
+        return None
+
+    try:
+        if min_interval_seconds and ran_recently(job_id, min_interval_seconds):
+            logger.info(f"Job {job_id} already ran within {min_interval_seconds}s, skipping")
+            return None
+
+        run_id = record_job_start(job_id)
+        started = time.monotonic()
+        try:
+            result = func()
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            record_job_finish(run_id, 'failed', error=str(e), duration=time.monotonic() - started)
+            return None
+
+        record_job_finish(run_id, 'succeeded', result=result, duration=time.monotonic() - started)
+        return result
+    finally:
+        locks.unlock(key)
@@ -3,170 +3,216 @@ Data Cleaning Background Jobs
 Scheduled tasks to maintain data cleanliness and relevance
 """
 from apscheduler.schedulers.background import BackgroundScheduler
-from database import db_manager
-from utils.sync_events import cleanup_old_events
+from apscheduler.schedulers.blocking import BlockingScheduler
+from jobs.account_deletion import process_account_deletions
+from jobs.cluster import LeaderElection, prune_job_runs, run_exclusive
+from jobs.reconciler import reconcile_storage
+from jobs.scrubber import scrub_storage
+from jobs.trash import move_trashed_files, purge_trash
+from utils.batching import batched_delete
+from utils.analytics import repair_user_stats, compact_usage_history
+from utils.changes import prune_change_tombstones
+from utils.sync_events import (
+    cleanup_old_events, ensure_sync_event_partitions, is_sync_events_partitioned,
+    SYNC_EVENT_RETENTION_DAYS
+)
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# How often non-leaders try to take over scheduler leadership
+LEADER_HEARTBEAT_SECONDS = 30
+
 class DataCleanerJob:
-    """Background job for data cleaning and maintenance"""
+    """
+    Background job for data cleaning and maintenance
+    Every process may run a scheduler, but only the elected leader executes
+    jobs and each run is additionally guarded by a per-job advisory lock.
+    Job methods let errors propagate so run_exclusive records the run as failed.
+    """
     
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+    def __init__(self, blocking=False):
+        self.scheduler = BlockingScheduler() if blocking else BackgroundScheduler()
+        self.leader = LeaderElection()
+        self.blocking = blocking
+    
+    def start(self):
+        """Start the scheduler (blocks when running as a standalone worker)"""
         logger.info("Data cleaner scheduler started")
+        self.scheduler.start()
     
-    def start_jobs(self):
-        """Start all scheduled jobs"""
-        # Run hourly cleanup
+    def schedule(self, job_id, name, func, hours=0, minutes=0):
+        """Add an interval job that only the cluster leader executes"""
         self.scheduler.add_job(
-            func=self.cleanup_incomplete_uploads,
+            func=self.run_job,
+            args=[job_id, func, hours * 3600 + minutes * 60],
             trigger="interval",
-            hours=1,
-            id='cleanup_incomplete_uploads',
-            name='Clean up incomplete uploads',
+            hours=hours,
+            minutes=minutes,
+            id=job_id,
+            name=name,
             replace_existing=True
         )
-        
-        # Run daily cleanup
+    
+    def run_job(self, job_id, func, interval_seconds):
+        """Run a scheduled job once across the cluster, recording it in job_runs"""
+        if not self.leader.try_acquire():
+            logger.debug(f"Not the scheduler leader, skipping {job_id}")
+            return None
+        # Leadership can change hands between ticks - the run history stops a new
+        # leader from repeating a job the previous one just finished
+        return run_exclusive(job_id, func, self.leader, min_interval_seconds=interval_seconds * 0.9)
+    
+    def run_now(self, job_id):
+        """Run one registered job immediately (still exclusive across the cluster)"""
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        _, func, _ = job.args
+        return run_exclusive(job_id, func, self.leader)
+    
+    def start_jobs(self):
+        """Register all scheduled jobs"""
+        # Keep trying to become leader so a crashed leader is replaced quickly
         self.scheduler.add_job(
-            func=self.cleanup_orphaned_shares,
+            func=self.leader.try_acquire,
             trigger="interval",
-            hours=24,
-            id='cleanup_orphaned_shares',
-            name='Clean up orphaned shares',
+            seconds=LEADER_HEARTBEAT_SECONDS,
+            id='leader_heartbeat',
+            name='Scheduler leader election',
             replace_existing=True
         )
         
-        # Run daily sync events cleanup
-        self.scheduler.add_job(
-            func=self.cleanup_sync_events,
-            trigger="interval",
-            hours=24,
-            id='cleanup_sync_events',
-            name='Clean up old sync events',
-            replace_existing=True
-        )
+        # Run hourly cleanup
+        self.schedule('cleanup_incomplete_uploads', 'Clean up incomplete uploads',
+                      self.cleanup_incomplete_uploads, hours=1)
+        
+        # Run daily cleanup
+        self.schedule('cleanup_orphaned_shares', 'Clean up orphaned shares',
+                      self.cleanup_orphaned_shares, hours=24)
+        
+        # Make sure today's and the upcoming sync_events partitions exist
+        if is_sync_events_partitioned():
+            ensure_sync_event_partitions()
+        
+        # Run daily sync events cleanup (drops expired partitions)
+        self.schedule('cleanup_sync_events', 'Clean up old sync events',
+                      self.cleanup_sync_events, hours=24)
         
         # Recalculate analytics hourly
-        self.scheduler.add_job(
-            func=self.recalculate_analytics,
-            trigger="interval",
-            hours=1,
-            id='recalculate_analytics',
-            name='Recalculate user analytics',
-            replace_existing=True
-        )
+        self.schedule('recalculate_analytics', 'Recalculate user analytics',
+                      self.recalculate_analytics, hours=1)
+        
+        # Fold completed days of hourly usage into the daily history
+        self.schedule('compact_usage_history', 'Compact usage history',
+                      self.compact_usage_history, hours=24)
+        
+        # Reconcile storage against the database; long scans resume next run
+        self.schedule('reconcile_storage', 'Reconcile storage with database',
+                      self.reconcile_storage, hours=1)
+        
+        # Re-verify ciphertext checksums at a throttled read rate
+        self.schedule('scrub_storage', 'Verify stored file checksums',
+                      self.scrub_storage, hours=1)
+        
+        # Move trashed files out of uploads/ shortly after they are deleted
+        self.schedule('move_trashed_files', 'Move trashed files to deleted folders',
+                      self.move_trashed_files, minutes=1)
+        
+        # Permanently remove files whose trash retention has passed
+        self.schedule('purge_trash', 'Purge expired trash',
+                      self.purge_trash, hours=1)
+        
+        # Tear down deleted accounts; large accounts continue on the next run
+        self.schedule('process_account_deletions', 'Process account deletions',
+                      self.process_account_deletions, minutes=1)
         
         logger.info("All data cleaner jobs scheduled")
     
     def cleanup_incomplete_uploads(self):
-        """Remove incomplete uploads older than 24 hours"""
-        try:
-            logger.info("Starting cleanup of incomplete uploads")
-            
-            # This would require an 'upload_status' field in files table
-            # For now, we'll just log
-            query = """
-            DELETE FROM files
-            WHERE created_at < NOW() - INTERVAL '24 hours'
-            AND size_bytes = 0
-            RETURNING id
-            """
-            
-            with db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query)
-                    deleted_files = cursor.fetchall()
-                    conn.commit()
-                    
-                    count = len(deleted_files)
-                    if count > 0:
-                        logger.info(f"Cleaned up {count} incomplete uploads")
-                        return count
-                    
-            return 0
-            
-        except Exception as e:
-            logger.error(f"Error cleaning up incomplete uploads: {e}")
-            return 0
+        """Remove incomplete uploads older than 24 hours, in small batches"""
+        logger.info("Starting cleanup of incomplete uploads")
+        
+        # Uploads that never received any bytes
+        select_ids = """
+        SELECT id FROM files
+        WHERE created_at < NOW() - INTERVAL '24 hours'
+        AND size_bytes = 0
+        """
+        stats = batched_delete('cleanup_incomplete_uploads', 'files', select_ids)
+        return stats['rows']
     
     def cleanup_orphaned_shares(self):
-        """Delete shares pointing to non-existent users or files"""
-        try:
-            logger.info("Starting cleanup of orphaned shares")
-            
-            # PostgreSQL will handle this automatically with ON DELETE CASCADE
-            # But we can also manually check and log
-            query = """
-            DELETE FROM shares
-            WHERE file_id NOT IN (SELECT id FROM files)
-            OR grantee_user_id NOT IN (SELECT id FROM users WHERE is_active = TRUE)
-            RETURNING id
-            """
-            
-            with db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query)
-                    deleted_shares = cursor.fetchall()
-                    conn.commit()
-                    
-                    count = len(deleted_shares)
-                    if count > 0:
-                        logger.info(f"Cleaned up {count} orphaned shares")
-                        return count
-            
-            return 0
-            
-        except Exception as e:
-            logger.error(f"Error cleaning up orphaned shares: {e}")
-            return 0
+        """Delete shares pointing to non-existent files or inactive users, in small batches"""
+        logger.info("Starting cleanup of orphaned shares")
+        
+        # ON DELETE CASCADE covers hard deletes; this catches deactivated users.
+        # NOT EXISTS plans as an anti-join, unlike NOT IN over a subquery.
+        # Shares with groups have no grantee user (inactive members just lose access)
+        select_ids = """
+        SELECT s.id FROM shares s
+        WHERE NOT EXISTS (SELECT 1 FROM files f WHERE f.id = s.file_id)
+        OR (s.grantee_user_id IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM users u
+            WHERE u.id = s.grantee_user_id AND u.is_active = TRUE
+        ))
+        """
+        stats = batched_delete('cleanup_orphaned_shares', 'shares', select_ids)
+        return stats['rows']
     
     def cleanup_sync_events(self):
-        """Delete sync events older than 7 days"""
-        try:
-            logger.info("Starting cleanup of old sync events")
-            count = cleanup_old_events(days=7)
-            logger.info(f"Cleaned up {count} old sync events")
-            return count
-        except Exception as e:
-            logger.error(f"Error cleaning up sync events: {e}")
-            return 0
+        """Drop sync events, change tombstones and job runs older than their retention windows and pre-create upcoming partitions"""
+        logger.info("Starting cleanup of old sync events")
+        count = cleanup_old_events(days=SYNC_EVENT_RETENTION_DAYS)
+        logger.info(f"Cleaned up {count} old sync events")
+        tombstones = prune_change_tombstones(days=SYNC_EVENT_RETENTION_DAYS)
+        logger.info(f"Pruned {tombstones} change tombstones")
+        job_runs = prune_job_runs()
+        logger.info(f"Pruned {job_runs} job runs")
+        return count
     
     def recalculate_analytics(self):
-        """Recalculate storage usage and file counts for all users"""
-        try:
-            logger.info("Starting analytics recalculation")
-            
-            # This would update a user_analytics table or similar
-            # For now, we just log
-            query = """
-            SELECT 
-                owner_id,
-                COUNT(*) as file_count,
-                SUM(size_bytes) as total_size
-            FROM files
-            GROUP BY owner_id
-            """
-            
-            with db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query)
-                    results = cursor.fetchall()
-                    
-                    logger.info(f"Recalculated analytics for {len(results)} users")
-                    return len(results)
-            
-        except Exception as e:
-            logger.error(f"Error recalculating analytics: {e}")
-            return 0
+        """Repair drift in the trigger-maintained user_stats rollup"""
+        logger.info("Starting analytics drift repair")
+        repaired = repair_user_stats()
+        logger.info(f"Analytics drift repair corrected {repaired} users")
+        return repaired
+    
+    def compact_usage_history(self):
+        """Snapshot daily bytes stored and drop expired hourly usage rows"""
+        logger.info("Starting usage history compaction")
+        return compact_usage_history()
+    
+    def reconcile_storage(self):
+        """Quarantine files without a database row and report rows without a file"""
+        logger.info("Starting storage reconciliation")
+        return reconcile_storage()
+    
+    def scrub_storage(self):
+        """Re-hash stored files and flag size or checksum mismatches"""
+        logger.info("Starting storage integrity scrub")
+        return scrub_storage()
+    
+    def move_trashed_files(self):
+        """Rename soft-deleted files into the owner's deleted folder"""
+        return move_trashed_files()
+    
+    def purge_trash(self):
+        """Delete files that have been in the trash longer than the retention window"""
+        logger.info("Starting trash purge")
+        return purge_trash()
+    
+    def process_account_deletions(self):
+        """Remove the data of accounts queued for deletion"""
+        return process_account_deletions()
     
     def shutdown(self):
-        """Shutdown the scheduler"""
+        """Shutdown the scheduler and hand leadership to another process"""
         try:
-            self.scheduler.shutdown()
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=not self.blocking)
+            self.leader.release()
             logger.info("Data cleaner scheduler shut down")
         except Exception as e:
             logger.error(f"Error shutting down scheduler: {e}")
@@ -180,6 +226,7 @@ def init_data_cleaner():
     if data_cleaner is None:
         data_cleaner = DataCleanerJob()
         data_cleaner.start_jobs()
+        data_cleaner.start()
         logger.info("Data cleaner initialized and jobs started")
     return data_cleaner
 
@@ -0,0 +1,191 @@
+"""
+Storage Reconciler
+Compares encrypted files on disk with files.storage_path in constant memory:
+the storage tree is walked in sorted order and merge-joined against a
+server-side cursor ordered the same way. Files without a row are moved to a
+quarantine folder (never deleted) once a fresh lookup confirms no row points at
+them; rows without a file are reported.
+Long scans stop after a time budget and resume from a checkpoint.
+"""
+import os
+import shutil
+import time
+import logging
+from pathlib import Path
+
+from database import db_manager
+from jobs.cluster import load_job_state, save_job_state
+from storage_manager import storage_manager
+from utils.metrics import metrics
+from utils.storage_walk import iter_storage_files, merge_join, storage_key
+
+logger = logging.getLogger(__name__)
+
+JOB_ID = 'reconcile_storage'
+
+# Orphans are moved here (under the storage root, skipped by the scan)
+QUARANTINE_DIR = '.quarantine'
+
+# Files created, modified or moved this recently may belong to an upload whose row
+# isn't committed yet, or to a move (trash) the cursor snapshot predates
+ORPHAN_GRACE_SECONDS = 3600
+
+# Seconds a run may take before it checkpoints and stops
+MAX_RUNTIME = 300
+
+# Entries processed between checkpoint writes
+CHECKPOINT_EVERY = 1000
+
+# Rows fetched per round trip by the server-side cursor
+CURSOR_ITERSIZE = 2000
+
+# Orphans listed individually in the run result
+MAX_REPORTED = 100
+
+def iter_db_paths(cursor, prefix, after=None):
+    """Yield (storage_path, id) for rows under prefix in byte order"""
+    cursor.itersize = CURSOR_ITERSIZE
+    cursor.execute(
+        """
+        SELECT storage_path, id FROM files
+        WHERE storage_path IS NOT NULL
+          AND left(storage_path, length(%s)) = %s
+          AND (%s::TEXT IS NULL OR storage_path COLLATE "C" > %s)
+        ORDER BY storage_path COLLATE "C"
+        """,
+        (prefix, prefix, after, after)
+    )
+    for storage_path, file_id in cursor:
+        yield storage_path, file_id
+
+def has_file_row(key):
+    """Whether a files row points at key now (the scan's cursor reads an older snapshot)"""
+    row = db_manager.execute_one(
+        'SELECT 1 AS found FROM files WHERE storage_path COLLATE "C" = %s LIMIT 1',
+        (key,)
+    )
+    return row is not None
+
+def quarantine_file(path, root):
+    """Move an orphaned file into the quarantine folder, keeping its relative path"""
+    target = Path(root) / QUARANTINE_DIR / Path(path).relative_to(root)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(path), str(target))
+    return target
+
+def reconcile_storage(dry_run=False, max_runtime=MAX_RUNTIME, restart=False):
+    """
+    Merge-join the storage tree against files.storage_path
+
+    Args:
+        dry_run: Only report orphans, don't quarantine them or save checkpoints
+        max_runtime: Seconds before checkpointing and stopping
+        restart: Ignore a saved checkpoint and scan from the beginning
+
+    Returns:
+        dict with scanned counts, orphans in both directions and whether the
+        scan reached the end (completed) or stopped at a checkpoint
+    """
+    root = storage_manager.storage_root
+    prefix = storage_key(root) + os.sep
+
+    state = None if restart else load_job_state(JOB_ID)
+    after = state.get('last_key') if state else None
+    if after:
+        logger.info(f"Resuming storage reconciliation after {after}")
+
+    stats = {
+        'files_scanned': 0,
+        'rows_scanned': 0,
+        'orphaned_files': 0,
+        'orphaned_bytes': 0,
+        'quarantined': 0,
+        'missing_files': 0,
+        'skipped_recent': 0,
+        'orphaned_file_paths': [],
+        'missing_file_ids': [],
+        'resumed_from': after,
+        'completed': False
+    }
+    started = time.monotonic()
+    now = time.time()
+    last_key = after
+    processed = 0
+
+    def checkpoint():
+        if not dry_run:
+            save_job_state(JOB_ID, {'last_key': last_key})
+
+    def orphaned_file(key, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        # rename keeps mtime, so a file the trash job just moved looks old by mtime;
+        # ctime changes on the move
+        if now - max(stat.st_mtime, stat.st_ctime) < ORPHAN_GRACE_SECONDS:
+            stats['skipped_recent'] += 1
+            return
+        if has_file_row(key):
+            # Moved here after the cursor's snapshot was taken
+            stats['skipped_recent'] += 1
+            return
+        stats['orphaned_files'] += 1
+        stats['orphaned_bytes'] += stat.st_size
+        if len(stats['orphaned_file_paths']) < MAX_REPORTED:
+            stats['orphaned_file_paths'].append(key)
+        if not dry_run:
+            try:
+                quarantine_file(path, root)
+                stats['quarantined'] += 1
+            except OSError as e:
+                logger.error(f"Failed to quarantine {key}: {e}")
+
+    def missing_file(key, file_id):
+        stats['missing_files'] += 1
+        if len(stats['missing_file_ids']) < MAX_REPORTED:
+            stats['missing_file_ids'].append(str(file_id))
+        logger.warning(f"File {file_id} has no data on disk: {key}")
+
+    with db_manager.get_connection() as conn:
+        # Named cursor streams rows from the server instead of loading them all
+        with conn.cursor(name='reconcile_storage') as cursor:
+            pairs = merge_join(iter_storage_files(root, after), iter_db_paths(cursor, prefix, after))
+            for fs_item, db_item in pairs:
+                if time.monotonic() - started > max_runtime:
+                    checkpoint()
+                    break
+
+                if db_item is None:
+                    stats['files_scanned'] += 1
+                    last_key = fs_item[0]
+                    orphaned_file(*fs_item)
+                elif fs_item is None:
+                    stats['rows_scanned'] += 1
+                    last_key = db_item[0]
+                    missing_file(*db_item)
+                else:
+                    stats['files_scanned'] += 1
+                    stats['rows_scanned'] += 1
+                    last_key = fs_item[0]
+
+                processed += 1
+                if processed % CHECKPOINT_EVERY == 0:
+                    checkpoint()
+            else:
+                stats['completed'] = True
+                if not dry_run:
+                    save_job_state(JOB_ID, None)
+        conn.commit()
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    metrics.incr('reconciler.orphaned_files', stats['orphaned_files'])
+    metrics.incr('reconciler.missing_files', stats['missing_files'])
+    metrics.set_gauge('reconciler.last_run_seconds', stats['seconds'])
+
+    logger.info(
+        f"Storage reconciliation {'finished' if stats['completed'] else 'paused'}: "
+        f"{stats['files_scanned']} files, {stats['rows_scanned']} rows, "
+        f"{stats['orphaned_files']} orphaned files, {stats['missing_files']} missing files"
+    )
+    return stats
@@ -0,0 +1,117 @@
+"""
+Storage Integrity Scrubber
+Re-hashes stored ciphertext at a bounded read rate, oldest verification first,
+and flags files whose size or SHA-256 no longer match the files row. Files
+that can't be read are flagged as errors and the run moves on
+"""
+import os
+import time
+import logging
+
+from database import db_manager
+from utils.checksums import RateLimiter, verify_stored_file
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Read budget shared by all files in a run
+SCRUB_BYTES_PER_SECOND = int(os.environ.get('SCRUB_BYTES_PER_SECOND', 10 * 1024 * 1024))
+
+# Seconds a run may take; the next run continues with the next-oldest files
+MAX_RUNTIME = 600
+
+# Rows fetched per query
+BATCH_SIZE = 100
+
+def record_result(file_id, status, checksum, baseline):
+    """Store a verification result on the files row"""
+    if baseline:
+        query = """
+        UPDATE files
+        SET integrity_status = %s, checksum_sha256 = %s, checksum_verified_at = NOW()
+        WHERE id = %s
+        """
+        params = (status, checksum, file_id)
+    else:
+        query = """
+        UPDATE files
+        SET integrity_status = %s, checksum_verified_at = NOW()
+        WHERE id = %s
+        """
+        params = (status, file_id)
+    db_manager.execute_query(query, params)
+
+def scrub_storage(bytes_per_second=SCRUB_BYTES_PER_SECOND, max_runtime=MAX_RUNTIME):
+    """
+    Verify stored files, least recently verified first
+
+    Args:
+        bytes_per_second: Read budget (0 disables throttling)
+        max_runtime: Seconds before the run stops
+
+    Returns:
+        dict with files and bytes verified, mismatches, missing and unreadable
+        files and the ids of flagged files
+    """
+    limiter = RateLimiter(bytes_per_second)
+    started = time.monotonic()
+    run_started_at = db_manager.execute_one("SELECT NOW() AS now")['now']
+    stats = {'files': 0, 'bytes': 0, 'ok': 0, 'baselined': 0, 'mismatch': 0, 'missing': 0, 'error': 0,
+             'flagged_ids': []}
+
+    query = """
+    SELECT id, storage_path, size_bytes, checksum_sha256
+    FROM files
+    WHERE storage_path IS NOT NULL
+      AND status = 'active'
+      AND (checksum_verified_at IS NULL OR checksum_verified_at < %s)
+    ORDER BY checksum_verified_at NULLS FIRST
+    LIMIT %s
+    """
+
+    while time.monotonic() - started < max_runtime:
+        # Rows verified in this run move past run_started_at and drop out
+        rows = db_manager.execute_query(query, (run_started_at, BATCH_SIZE), fetch=True)
+        if not rows:
+            break
+
+        for row in rows:
+            if time.monotonic() - started >= max_runtime:
+                break
+
+            # Rows uploaded before checksums existed get this read as their baseline
+            baseline = row['checksum_sha256'] is None
+            try:
+                status, checksum, read = verify_stored_file(
+                    row['storage_path'], row['size_bytes'], row['checksum_sha256'], limiter
+                )
+            except OSError as e:
+                # Permission denied, EIO...: recorded (which advances checksum_verified_at)
+                # so the next run doesn't stop at the same file
+                logger.error(f"Cannot read file {row['id']} ({row['storage_path']}): {e}")
+                status, checksum, read = 'error', None, 0
+            record_result(row['id'], status, checksum, baseline and checksum is not None)
+
+            stats['files'] += 1
+            stats['bytes'] += read
+            if status in ('mismatch', 'missing', 'error'):
+                stats[status] += 1
+                stats['flagged_ids'].append(str(row['id']))
+                metrics.incr(f'scrubber.{status}')
+                logger.error(f"Integrity check failed for file {row['id']}: {status} ({row['storage_path']})")
+            elif status == 'unverified':
+                stats['baselined'] += 1
+            else:
+                stats['ok'] += 1
+
+    elapsed = time.monotonic() - started
+    stats['seconds'] = round(elapsed, 3)
+    metrics.incr('scrubber.files_verified', stats['files'])
+    metrics.incr('scrubber.bytes_verified', stats['bytes'])
+    metrics.set_gauge('scrubber.bytes_per_second', round(stats['bytes'] / elapsed) if elapsed else 0)
+
+    logger.info(
+        f"Integrity scrub verified {stats['files']} files ({stats['bytes']} bytes): "
+        f"{stats['mismatch']} mismatched, {stats['missing']} missing, {stats['error']} unreadable"
+    )
+    return stats
@@ -0,0 +1,156 @@
+"""
+Trash Processing
+Deletes only flip files.status to 'deleted' so the API returns immediately.
+These jobs do the slow part afterwards: move trashed files into the user's
+deleted/ folder, then remove them for good once the retention window passes.
+"""
+import os
+import time
+import logging
+
+import psycopg2.extras
+
+from database import db_manager
+from storage_manager import storage_manager, TRASH_RETENTION_DAYS
+from utils.batching import BATCH_PAUSE
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Files handled per query
+BATCH_SIZE = 200
+
+# Seconds a run may take; leftovers are picked up by the next run
+MAX_RUNTIME = 120
+
+# storage_path already inside a deleted/ folder (either path separator)
+DELETED_PATH_PATTERN = r'[/\\]deleted[/\\][^/\\]+$'
+
+def move_trashed_files(batch_size=BATCH_SIZE, max_runtime=MAX_RUNTIME):
+    """
+    Rename trashed files from uploads/ into deleted/
+
+    Returns:
+        Number of files moved
+    """
+    select_query = """
+    SELECT f.id, f.storage_path, u.username
+    FROM files f
+    JOIN users u ON u.id = f.owner_id
+    WHERE f.status = 'deleted'
+      AND f.storage_path IS NOT NULL
+      AND f.storage_path !~ %s
+      AND f.integrity_status <> 'missing'
+    LIMIT %s
+    """
+    started = time.monotonic()
+    moved = 0
+    missing = 0
+
+    while time.monotonic() - started < max_runtime:
+        rows = db_manager.execute_query(select_query, (DELETED_PATH_PATTERN, batch_size), fetch=True)
+        if not rows:
+            break
+        handled_before = moved + missing
+
+        for row in rows:
+            # One short transaction per file: the row lock keeps a concurrent restore
+            # from reading the old path while the file is being moved
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        SELECT storage_path FROM files
+                        WHERE id = %s AND status = 'deleted' AND storage_path = %s
+                        FOR UPDATE SKIP LOCKED
+                        """,
+                        (row['id'], row['storage_path'])
+                    )
+                    if cursor.fetchone() is None:
+                        # Restored, purged or being handled elsewhere
+                        conn.rollback()
+                        continue
+
+                    if not os.path.exists(row['storage_path']):
+                        cursor.execute(
+                            "UPDATE files SET integrity_status = 'missing' WHERE id = %s",
+                            (row['id'],)
+                        )
+                        conn.commit()
+                        missing += 1
+                        continue
+
+                    new_path = storage_manager.move_to_deleted(row['storage_path'], row['username'])
+                    if new_path is None:
+                        conn.rollback()
+                        continue
+                    cursor.execute("UPDATE files SET storage_path = %s WHERE id = %s", (new_path, row['id']))
+                    conn.commit()
+                    moved += 1
+
+        # Stop when nothing in a full batch could be handled (e.g. rows locked elsewhere)
+        if len(rows) < batch_size or moved + missing == handled_before:
+            break
+        time.sleep(BATCH_PAUSE)
+
+    metrics.incr('trash.files_moved', moved)
+    if moved or missing:
+        logger.info(f"Moved {moved} trashed files to deleted folders ({missing} already missing)")
+    return moved
+
+def purge_trash(retention_days=TRASH_RETENTION_DAYS, batch_size=BATCH_SIZE, max_runtime=MAX_RUNTIME):
+    """
+    Permanently remove files that have been in the trash longer than retention_days
+
+    Returns:
+        Number of files purged
+    """
+    select_query = """
+    SELECT id, storage_path FROM files
+    WHERE status = 'deleted'
+      AND deleted_at < NOW() - make_interval(days => %s)
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+    """
+    started = time.monotonic()
+    purged = 0
+    bytes_freed = 0
+
+    while time.monotonic() - started < max_runtime:
+        with db_manager.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute(select_query, (retention_days, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    conn.commit()
+                    break
+
+                # Files first: if the transaction then fails, the next run just
+                # deletes rows whose files are already gone
+                for row in rows:
+                    if not row['storage_path']:
+                        continue
+                    try:
+                        bytes_freed += os.path.getsize(row['storage_path'])
+                        os.remove(row['storage_path'])
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        logger.error(f"Failed to remove {row['storage_path']}: {e}")
+
+                cursor.execute(
+                    "DELETE FROM files WHERE id = ANY(%s::uuid[])",
+                    ([str(row['id']) for row in rows],)
+                )
+                purged += cursor.rowcount
+                conn.commit()
+
+        if len(rows) < batch_size:
+            break
+        time.sleep(BATCH_PAUSE)
+
+    metrics.incr('trash.files_purged', purged)
+    metrics.incr('trash.bytes_freed', bytes_freed)
+    if purged:
+        logger.info(f"Purged {purged} files from the trash ({bytes_freed} bytes freed)")
+    return purged
@@ -0,0 +1,75 @@
+"""
+Standalone Background Job Worker
+Runs the maintenance scheduler outside the web processes:
+
+    python -m jobs.worker                     # run the scheduler (blocks)
+    python -m jobs.worker --run-once cleanup_sync_events
+    python -m jobs.worker --list-runs
+
+Set RUN_SCHEDULER_IN_WEB=false for the web workers when using this.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import config
+from jobs.cluster import get_job_runs
+from jobs.data_cleaner import DataCleanerJob
+from utils.socketio_queue import get_external_emitter
+from utils.sync_events import set_socketio, set_event_policies
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CryptoVault background job worker')
+    parser.add_argument('--run-once', metavar='JOB_ID', help='Run a single job now and exit')
+    parser.add_argument('--list-runs', action='store_true', help='Show recent job runs and exit')
+    parser.add_argument('--limit', type=int, default=20, help='Rows shown by --list-runs')
+    args = parser.parse_args(argv)
+
+    if args.list_runs:
+        for run in get_job_runs(limit=args.limit):
+            print(json.dumps(run, default=str))
+        return 0
+
+    app_config = config[os.environ.get('FLASK_ENV', 'development')]
+
+    # Sync events emitted by jobs go through the shared queue to the web workers
+    emitter = get_external_emitter(app_config.SOCKETIO_MESSAGE_QUEUE, app_config.SOCKETIO_CHANNEL)
+    if emitter is None:
+        logger.warning("SOCKETIO_MESSAGE_QUEUE not set - job sync events are stored but not pushed")
+    set_socketio(emitter)
+    set_event_policies(app_config.SYNC_EVENT_POLICIES)
+
+    cleaner = DataCleanerJob(blocking=True)
+    cleaner.start_jobs()
+
+    if args.run_once:
+        try:
+            result = cleaner.run_now(args.run_once)
+        except ValueError as e:
+            logger.error(str(e))
+            return 1
+        print(json.dumps({'job_id': args.run_once, 'result': result}, default=str))
+        return 0
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        cleaner.shutdown()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    cleaner.start()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,8 +22,8 @@ def check_file_access(file_id, user_id):
     if file['owner_id'] == user_id:
         return True, file, 'owner'
     
-    # Check if file is shared with the user
-    share = Share.find_by_file_and_grantee(file_id, user_id)
+    # Check if file is shared with the user (directly or through a group)
+    share = Share.find_effective(file_id, user_id)
     if share:
         return True, file, 'shared'
     
@@ -11,6 +11,12 @@ def auth_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
+            # Sub-requests of POST /api/batch run as the user the batch authenticated
+            batch_user = getattr(g, 'batch_user', None)
+            if batch_user is not None:
+                g.current_user = batch_user
+                return f(*args, **kwargs)
+            
             # Verify JWT token is present and valid
             print("[AUTH] Starting authentication check")
             verify_jwt_in_request()
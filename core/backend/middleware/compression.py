@@ -0,0 +1,121 @@
+"""
+Response Compression
+Compresses text responses (JSON listings, sync payloads) with brotli when the
+brotli package is installed and the client accepts it, otherwise gzip.
+Streamed responses are compressed chunk by chunk, so each chunk still reaches
+the client as soon as it is produced. Ciphertext downloads are never touched:
+encrypted data doesn't compress, and they are streamed as-is.
+"""
+import logging
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Mimetypes never compressed, whatever the allowlist says (encrypted file contents)
+NEVER_COMPRESS = ('application/octet-stream',)
+
+class _Encoder:
+    """Incremental gzip or brotli encoder"""
+
+    def __init__(self, encoding, level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data, flush=False):
+        """Compress data; with flush, everything so far is emitted (for streamed chunks)"""
+        if self.encoding == 'br':
+            out = self.compressor.process(data)
+            return out + self.compressor.flush() if flush else out
+        out = self.compressor.compress(data)
+        return out + self.compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+def _compress_stream(chunks, encoder, charset):
+    """Compress a streamed response body, flushing after every chunk"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            if chunk:
+                yield encoder.compress(chunk, flush=True)
+        yield encoder.finish()
+    finally:
+        # Let the wrapped generator clean up (e.g. return its database connection)
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+def init_compression(app):
+    """
+    Compress eligible responses of app. Register before other after_request
+    hooks so it runs last, on the final body and headers.
+
+    Config:
+        COMPRESSION_MIN_SIZE: smallest body compressed, in bytes (streams always are)
+        COMPRESSION_LEVEL: gzip level 1-9 (0 disables compression)
+        COMPRESSION_BROTLI_QUALITY: brotli quality 0-11
+        COMPRESSION_MIMETYPES: mimetypes compressed
+    """
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 4)
+    mimetypes = set(app.config.get('COMPRESSION_MIMETYPES', ('application/json',)))
+    encodings = (['br'] if brotli is not None else []) + ['gzip']
+
+    if level <= 0:
+        logger.info("Response compression disabled")
+        return
+    logger.info(f"Response compression enabled ({', '.join(encodings)})")
+
+    @app.after_request
+    def compress_response(response):
+        if (response.mimetype in NEVER_COMPRESS
+                or response.mimetype not in mimetypes
+                or response.direct_passthrough):
+            return response
+
+        # The body depends on Accept-Encoding whether or not this one is compressed
+        response.vary.add('Accept-Encoding')
+
+        if (request.method == 'HEAD'
+                or response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        if not response.is_streamed:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            encoder = _Encoder(encoding, level, brotli_quality)
+            response.set_data(encoder.compress(data) + encoder.finish())
+        else:
+            encoder = _Encoder(encoding, level, brotli_quality)
+            response.response = _compress_stream(response.response, encoder, 'utf-8')
+            response.headers.pop('Content-Length', None)
+
+        response.headers['Content-Encoding'] = encoding
+        # A compressed body is a different representation of the same content
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,41 @@
+from functools import wraps
+import logging
+from flask import g, make_response, request
+from utils.changes import get_change_version
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def etag_by_change_version(f):
+    """
+    Conditional GET for per-user listings (use below auth_required).
+    The ETag is the user's change version, read before the handler runs, so
+    a matching If-None-Match is answered with 304 without running any listing
+    queries. A change committed while the handler runs only makes the next
+    request refetch.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            user_id = g.current_user['id']
+            etag = f"{request.endpoint}-{user_id}-{get_change_version(user_id)}"
+        except Exception as e:
+            # Without a version, just serve the listing uncached
+            logger.warning(f"Change version unavailable, skipping ETag: {e}")
+            return f(*args, **kwargs)
+
+        # Weak comparison: compressed responses carry the ETag as W/"..."
+        if request.if_none_match.contains_weak(etag):
+            metrics.incr('etag.not_modified')
+            response = make_response('', 304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        # Browsers must revalidate every time; shared caches must not store it
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return decorated_function
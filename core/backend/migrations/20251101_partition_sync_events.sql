@@ -0,0 +1,72 @@
+-- Migration: Convert sync_events to daily range partitions
+-- Date: 2025-11-01
+-- Description: Retention becomes DETACH + DROP of whole day partitions instead of a
+-- daily DELETE, which avoids table bloat, long vacuums and lock contention.
+-- Existing events inside the retention window are copied into the new table.
+
+BEGIN;
+
+-- Keep the old table around until its rows have been copied
+ALTER TABLE sync_events RENAME TO sync_events_legacy;
+DROP INDEX IF EXISTS idx_sync_events_user_id;
+DROP INDEX IF EXISTS idx_sync_events_created_at;
+DROP INDEX IF EXISTS idx_sync_events_type;
+DROP INDEX IF EXISTS idx_sync_events_user_created;
+DROP INDEX IF EXISTS idx_sync_events_created;
+
+-- The partition key has to be part of the primary key
+CREATE TABLE sync_events (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    event_type VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_sync_events_user_created ON sync_events(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sync_events_created_at ON sync_events(created_at);
+
+-- Catches rows outside the pre-created range so inserts never fail
+CREATE TABLE IF NOT EXISTS sync_events_default PARTITION OF sync_events DEFAULT;
+
+-- Create one partition per day from days_back days ago to days_ahead days ahead
+CREATE OR REPLACE FUNCTION create_sync_events_partitions(days_ahead INTEGER DEFAULT 7, days_back INTEGER DEFAULT 0)
+RETURNS INTEGER AS $$
+DECLARE
+    day DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR day IN
+        SELECT generate_series(CURRENT_DATE - days_back, CURRENT_DATE + days_ahead, INTERVAL '1 day')::DATE
+    LOOP
+        partition_name := 'sync_events_' || to_char(day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF sync_events FOR VALUES FROM (%L) TO (%L)',
+                partition_name, day, day + 1
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Copy events still inside the 7 day retention window
+SELECT create_sync_events_partitions(7, 7);
+
+INSERT INTO sync_events (id, user_id, event_type, payload, created_at)
+SELECT id, user_id, event_type, payload, created_at
+FROM sync_events_legacy
+WHERE created_at >= CURRENT_DATE - 7;
+
+DROP TABLE sync_events_legacy;
+
+COMMENT ON TABLE sync_events IS 'Stores real-time sync events for dashboard updates and polling fallback (partitioned by day)';
+COMMENT ON COLUMN sync_events.event_type IS 'Type of event: file_uploaded, file_deleted, file_shared, file_unshared, file_downloaded, metadata_updated, analytics_updated';
+COMMENT ON COLUMN sync_events.payload IS 'Event metadata (non-sensitive data only)';
+COMMENT ON FUNCTION create_sync_events_partitions IS 'Creates missing daily sync_events partitions around the current date';
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- Migration: Add a monotonic sequence number to sync_events
+-- Date: 2025-11-02
+-- Description: Reconnecting WebSocket clients send the last sequence they saw and the
+-- server replays everything after it. UUID ids carry no order, so events get a seq.
+
+CREATE SEQUENCE IF NOT EXISTS sync_events_seq;
+
+ALTER TABLE sync_events ADD COLUMN IF NOT EXISTS seq BIGINT;
+
+-- Number existing events in the order they happened (a column default would follow the
+-- physical row order), so the oldest retained event also has the lowest seq
+UPDATE sync_events e
+SET seq = numbered.seq
+FROM (
+    SELECT id,
+           ROW_NUMBER() OVER (ORDER BY created_at, id)
+               + (SELECT COALESCE(MAX(seq), 0) FROM sync_events) AS seq
+    FROM sync_events
+    WHERE seq IS NULL
+) numbered
+WHERE e.id = numbered.id;
+
+SELECT setval('sync_events_seq', COALESCE(MAX(seq), 0) + 1, false) FROM sync_events;
+
+ALTER TABLE sync_events ALTER COLUMN seq SET DEFAULT nextval('sync_events_seq');
+ALTER TABLE sync_events ALTER COLUMN seq SET NOT NULL;
+
+ALTER SEQUENCE sync_events_seq OWNED BY sync_events.seq;
+
+-- Replay lookups: events for one user after a given seq
+CREATE INDEX IF NOT EXISTS idx_sync_events_user_seq ON sync_events(user_id, seq);
+
+COMMENT ON COLUMN sync_events.seq IS 'Monotonic event sequence used to resume WebSocket sessions';
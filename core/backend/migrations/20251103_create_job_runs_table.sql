@@ -0,0 +1,22 @@
+-- Migration: Create job_runs table
+-- Date: 2025-11-03
+-- Description: History of background job runs. Used by the scheduler to skip a job
+-- another process already ran this interval and to inspect job outcomes.
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job_id VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'succeeded', 'failed')),
+    result JSONB,
+    error TEXT,
+    host VARCHAR(255),
+    pid INTEGER,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    duration_seconds DOUBLE PRECISION
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs(job_id, started_at DESC);
+
+COMMENT ON TABLE job_runs IS 'One row per background job execution across all workers';
+COMMENT ON COLUMN job_runs.result IS 'JSON return value of the job (e.g. rows cleaned up)';
@@ -0,0 +1,198 @@
+-- Migration: Create user_stats and user_stats_daily rollups
+-- Date: 2025-11-04
+-- Description: Per-user analytics kept current by triggers on files and shares
+-- (downloads are recorded from the sync event pipeline). The hourly analytics
+-- job only repairs drift instead of recomputing everything.
+
+BEGIN;
+
+-- Current totals, one row per user
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    file_count BIGINT NOT NULL DEFAULT 0,
+    total_bytes BIGINT NOT NULL DEFAULT 0,
+    shares_given BIGINT NOT NULL DEFAULT 0,
+    shares_received BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Activity per user per UTC day
+CREATE TABLE IF NOT EXISTS user_stats_daily (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    uploads INTEGER NOT NULL DEFAULT 0,
+    bytes_uploaded BIGINT NOT NULL DEFAULT 0,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    bytes_downloaded BIGINT NOT NULL DEFAULT 0,
+    shares_created INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+-- Apply deltas to a user's totals, creating the row on first use
+CREATE OR REPLACE FUNCTION bump_user_stats(
+    p_user_id INTEGER,
+    d_files BIGINT DEFAULT 0,
+    d_bytes BIGINT DEFAULT 0,
+    d_given BIGINT DEFAULT 0,
+    d_received BIGINT DEFAULT 0
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO user_stats (user_id, file_count, total_bytes, shares_given, shares_received, updated_at)
+    VALUES (p_user_id, d_files, d_bytes, d_given, d_received, NOW())
+    ON CONFLICT (user_id) DO UPDATE SET
+        file_count = user_stats.file_count + EXCLUDED.file_count,
+        total_bytes = user_stats.total_bytes + EXCLUDED.total_bytes,
+        shares_given = user_stats.shares_given + EXCLUDED.shares_given,
+        shares_received = user_stats.shares_received + EXCLUDED.shares_received,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apply deltas to a user's activity for a day
+CREATE OR REPLACE FUNCTION bump_user_stats_daily(
+    p_user_id INTEGER,
+    p_day DATE,
+    d_uploads INTEGER DEFAULT 0,
+    d_bytes_uploaded BIGINT DEFAULT 0,
+    d_downloads INTEGER DEFAULT 0,
+    d_bytes_downloaded BIGINT DEFAULT 0,
+    d_shares INTEGER DEFAULT 0
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO user_stats_daily (user_id, day, uploads, bytes_uploaded, downloads, bytes_downloaded, shares_created)
+    VALUES (p_user_id, p_day, d_uploads, d_bytes_uploaded, d_downloads, d_bytes_downloaded, d_shares)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        uploads = user_stats_daily.uploads + EXCLUDED.uploads,
+        bytes_uploaded = user_stats_daily.bytes_uploaded + EXCLUDED.bytes_uploaded,
+        downloads = user_stats_daily.downloads + EXCLUDED.downloads,
+        bytes_downloaded = user_stats_daily.bytes_downloaded + EXCLUDED.bytes_downloaded,
+        shares_created = user_stats_daily.shares_created + EXCLUDED.shares_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- files: only active files count towards totals
+CREATE OR REPLACE FUNCTION user_stats_files_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        IF NEW.status = 'active' THEN
+            PERFORM bump_user_stats(NEW.owner_id, 1, NEW.size_bytes);
+        END IF;
+        PERFORM bump_user_stats_daily(NEW.owner_id, (NOW() AT TIME ZONE 'UTC')::DATE, 1, NEW.size_bytes);
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        IF OLD.status = 'active' THEN
+            PERFORM bump_user_stats(OLD.owner_id, -1, -OLD.size_bytes);
+        END IF;
+        -- Shares are removed by ON DELETE CASCADE after this row is gone, when the
+        -- shares trigger can no longer find the owner - account for them here
+        PERFORM bump_user_stats(OLD.owner_id, 0, 0, -(SELECT COUNT(*) FROM shares WHERE file_id = OLD.id));
+        RETURN OLD;
+    END IF;
+
+    -- UPDATE: remove the old contribution, add the new one
+    IF OLD.status = 'active' THEN
+        PERFORM bump_user_stats(OLD.owner_id, -1, -OLD.size_bytes);
+    END IF;
+    IF NEW.status = 'active' THEN
+        PERFORM bump_user_stats(NEW.owner_id, 1, NEW.size_bytes);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_user_stats_files_insert ON files;
+CREATE TRIGGER trigger_user_stats_files_insert
+    AFTER INSERT ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_files_trigger();
+
+DROP TRIGGER IF EXISTS trigger_user_stats_files_update ON files;
+CREATE TRIGGER trigger_user_stats_files_update
+    AFTER UPDATE OF owner_id, size_bytes, status ON files
+    FOR EACH ROW
+    WHEN (OLD.owner_id IS DISTINCT FROM NEW.owner_id
+          OR OLD.size_bytes IS DISTINCT FROM NEW.size_bytes
+          OR OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION user_stats_files_trigger();
+
+-- BEFORE so the file's shares are still visible
+DROP TRIGGER IF EXISTS trigger_user_stats_files_delete ON files;
+CREATE TRIGGER trigger_user_stats_files_delete
+    BEFORE DELETE ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_files_trigger();
+
+-- shares: given by the file owner, received by the grantee
+CREATE OR REPLACE FUNCTION user_stats_shares_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    file_owner INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT owner_id INTO file_owner FROM files WHERE id = NEW.file_id;
+        PERFORM bump_user_stats(NEW.grantee_user_id, 0, 0, 0, 1);
+        IF file_owner IS NOT NULL THEN
+            PERFORM bump_user_stats(file_owner, 0, 0, 1, 0);
+            PERFORM bump_user_stats_daily(file_owner, (NOW() AT TIME ZONE 'UTC')::DATE, 0, 0, 0, 0, 1);
+        END IF;
+        RETURN NEW;
+    END IF;
+
+    SELECT owner_id INTO file_owner FROM files WHERE id = OLD.file_id;
+    PERFORM bump_user_stats(OLD.grantee_user_id, 0, 0, 0, -1);
+    IF file_owner IS NOT NULL THEN
+        PERFORM bump_user_stats(file_owner, 0, 0, -1, 0);
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_user_stats_shares ON shares;
+CREATE TRIGGER trigger_user_stats_shares
+    AFTER INSERT OR DELETE ON shares
+    FOR EACH ROW
+    EXECUTE FUNCTION user_stats_shares_trigger();
+
+-- Seed totals from existing data
+INSERT INTO user_stats (user_id, file_count, total_bytes, shares_given, shares_received, updated_at)
+SELECT u.id,
+       COALESCE(f.file_count, 0),
+       COALESCE(f.total_bytes, 0),
+       COALESCE(g.shares_given, 0),
+       COALESCE(r.shares_received, 0),
+       NOW()
+FROM users u
+LEFT JOIN (
+    SELECT owner_id, COUNT(*) AS file_count, SUM(size_bytes) AS total_bytes
+    FROM files WHERE status = 'active' GROUP BY owner_id
+) f ON f.owner_id = u.id
+LEFT JOIN (
+    SELECT f.owner_id, COUNT(*) AS shares_given
+    FROM shares s JOIN files f ON s.file_id = f.id GROUP BY f.owner_id
+) g ON g.owner_id = u.id
+LEFT JOIN (
+    SELECT grantee_user_id, COUNT(*) AS shares_received
+    FROM shares GROUP BY grantee_user_id
+) r ON r.grantee_user_id = u.id
+ON CONFLICT (user_id) DO NOTHING;
+
+-- Backfill upload and share history (download history was never stored)
+INSERT INTO user_stats_daily (user_id, day, uploads, bytes_uploaded)
+SELECT owner_id, (created_at AT TIME ZONE 'UTC')::DATE, COUNT(*), SUM(size_bytes)
+FROM files
+GROUP BY 1, 2
+ON CONFLICT (user_id, day) DO NOTHING;
+
+INSERT INTO user_stats_daily (user_id, day, shares_created)
+SELECT f.owner_id, s.created_at::DATE, COUNT(*)
+FROM shares s JOIN files f ON s.file_id = f.id
+GROUP BY 1, 2
+ON CONFLICT (user_id, day) DO UPDATE SET shares_created = EXCLUDED.shares_created;
+
+COMMENT ON TABLE user_stats IS 'Per-user totals maintained by triggers; repaired hourly by the analytics job';
+COMMENT ON TABLE user_stats_daily IS 'Per-user activity per UTC day (uploads, downloads, shares)';
+
+COMMIT;
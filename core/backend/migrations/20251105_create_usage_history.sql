@@ -0,0 +1,30 @@
+-- Migration: Usage history for the analytics dashboard
+-- Date: 2025-11-05
+-- Description: Hourly usage buckets per user fed from sync events. Completed days
+-- are compacted into user_stats_daily (which gains an end-of-day bytes_stored) and
+-- hourly rows are dropped after a few weeks, so long ranges read one row per day.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS user_usage_hourly (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    bucket TIMESTAMPTZ NOT NULL,
+    uploads INTEGER NOT NULL DEFAULT 0,
+    bytes_uploaded BIGINT NOT NULL DEFAULT 0,
+    downloads INTEGER NOT NULL DEFAULT 0,
+    bytes_downloaded BIGINT NOT NULL DEFAULT 0,
+    shares INTEGER NOT NULL DEFAULT 0,
+    bytes_stored BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_usage_hourly_bucket ON user_usage_hourly(bucket);
+
+-- NULL until the day has been compacted (or when the user had no activity that day)
+ALTER TABLE user_stats_daily ADD COLUMN IF NOT EXISTS bytes_stored BIGINT;
+
+COMMENT ON TABLE user_usage_hourly IS 'Recent per-user usage per hour; compacted into user_stats_daily';
+COMMENT ON COLUMN user_usage_hourly.bytes_stored IS 'Bytes stored by the user after the last event in the hour';
+COMMENT ON COLUMN user_stats_daily.bytes_stored IS 'Bytes stored at the end of the day (last hourly value)';
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Migration: Create job_state table and a byte-order storage_path index
+-- Date: 2025-11-06
+-- Description: job_state holds resumable checkpoints for long-running background jobs
+-- (e.g. the storage reconciler). The storage_path index lets the reconciler read
+-- files in the same byte order it walks the filesystem.
+
+CREATE TABLE IF NOT EXISTS job_state (
+    job_id VARCHAR(100) PRIMARY KEY,
+    state JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_files_storage_path_c ON files (storage_path COLLATE "C")
+    WHERE storage_path IS NOT NULL;
+
+COMMENT ON TABLE job_state IS 'Checkpoints of background jobs that resume across runs';
@@ -0,0 +1,22 @@
+-- Migration: Add ciphertext checksums and integrity status to files
+-- Date: 2025-11-07
+-- Description: SHA-256 of the stored ciphertext, recorded at upload and re-verified
+-- by the background integrity scrubber. Rows uploaded before this migration get
+-- their checksum the first time the scrubber reads them.
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS checksum_sha256 CHAR(64);
+ALTER TABLE files ADD COLUMN IF NOT EXISTS checksum_verified_at TIMESTAMPTZ;
+ALTER TABLE files ADD COLUMN IF NOT EXISTS integrity_status VARCHAR(20) NOT NULL DEFAULT 'unverified';
+
+ALTER TABLE files DROP CONSTRAINT IF EXISTS files_integrity_status_check;
+ALTER TABLE files ADD CONSTRAINT files_integrity_status_check
+    CHECK (integrity_status IN ('unverified', 'ok', 'mismatch', 'missing', 'error'));
+
+-- Scrubber picks the files checked longest ago (never-checked first)
+CREATE INDEX IF NOT EXISTS idx_files_checksum_verified_at
+    ON files (checksum_verified_at NULLS FIRST)
+    WHERE storage_path IS NOT NULL;
+
+COMMENT ON COLUMN files.checksum_sha256 IS 'Hex SHA-256 of the encrypted file as stored';
+COMMENT ON COLUMN files.checksum_verified_at IS 'Last time the stored file was hashed';
+COMMENT ON COLUMN files.integrity_status IS 'unverified, ok, mismatch (size or hash differs), missing or error (unreadable)';
@@ -0,0 +1,30 @@
+-- Migration: Create account_deletions table
+-- Date: 2025-11-08
+-- Description: Queue of account teardowns processed by the background worker.
+-- DELETE /api/users/account deactivates the user and inserts a row here; the
+-- process_account_deletions job then removes shares, files, storage and sync events
+-- in batches, recording the current phase so an interrupted teardown resumes.
+
+CREATE TABLE IF NOT EXISTS account_deletions (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'completed')),
+    phase VARCHAR(20) NOT NULL DEFAULT 'shares'
+        CHECK (phase IN ('shares', 'files', 'storage', 'events', 'done')),
+    files_total INTEGER NOT NULL DEFAULT 0,
+    files_deleted INTEGER NOT NULL DEFAULT 0,
+    shares_deleted INTEGER NOT NULL DEFAULT 0,
+    bytes_freed BIGINT NOT NULL DEFAULT 0,
+    events_deleted INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    requested_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_account_deletions_open
+    ON account_deletions (requested_at)
+    WHERE status IN ('pending', 'running');
+
+COMMENT ON TABLE account_deletions IS 'Account teardowns queued for the background worker';
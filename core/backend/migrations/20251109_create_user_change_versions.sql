@@ -0,0 +1,99 @@
+-- Migration: Create user_change_versions table
+-- Date: 2025-11-09
+-- Description: Per-user counter bumped by triggers whenever something in the user's
+-- file listings changes (their files, shares of their files, files shared with them).
+-- Listing endpoints use it as an ETag and answer 304 without running their queries.
+-- The counter is incremented under the row lock, so versions commit in order.
+
+CREATE TABLE IF NOT EXISTS user_change_versions (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_change_version(p_user_id INTEGER)
+RETURNS BIGINT AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO user_change_versions (user_id, version, updated_at)
+    VALUES (p_user_id, 1, NOW())
+    ON CONFLICT (user_id) DO UPDATE SET
+        version = user_change_versions.version + 1,
+        updated_at = NOW()
+    RETURNING version INTO new_version;
+    RETURN new_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- files: the owner's listings and quota, plus the listings of everyone it is shared with
+CREATE OR REPLACE FUNCTION change_versions_files_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_change_version(NEW.owner_id);
+        RETURN NULL;
+    END IF;
+
+    PERFORM bump_change_version(OLD.owner_id);
+    IF TG_OP = 'UPDATE' THEN
+        IF NEW.owner_id IS DISTINCT FROM OLD.owner_id THEN
+            PERFORM bump_change_version(NEW.owner_id);
+        END IF;
+        PERFORM bump_change_version(grantee_user_id)
+        FROM shares WHERE file_id = NEW.id ORDER BY grantee_user_id;
+    END IF;
+    -- Deleted files take their shares with them; the shares trigger bumps the grantees
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_insert ON files;
+CREATE TRIGGER trigger_change_versions_files_insert
+    AFTER INSERT ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_trigger();
+
+-- Only columns that appear in listings or affect quota (not checksum bookkeeping)
+DROP TRIGGER IF EXISTS trigger_change_versions_files_update ON files;
+CREATE TRIGGER trigger_change_versions_files_update
+    AFTER UPDATE OF owner_id, original_filename, content_type, size_bytes, algo, status, storage_path ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_trigger();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_delete ON files;
+CREATE TRIGGER trigger_change_versions_files_delete
+    AFTER DELETE ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_trigger();
+
+-- shares: the file owner's and the grantee's listings
+-- (owners are always bumped before grantees so concurrent transactions lock in the same order)
+CREATE OR REPLACE FUNCTION change_versions_shares_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_change_version((SELECT owner_id FROM files WHERE id = NEW.file_id));
+        PERFORM bump_change_version(NEW.grantee_user_id);
+        RETURN NULL;
+    END IF;
+
+    PERFORM bump_change_version((SELECT owner_id FROM files WHERE id = OLD.file_id));
+    PERFORM bump_change_version(OLD.grantee_user_id);
+    IF TG_OP = 'UPDATE' AND NEW.grantee_user_id IS DISTINCT FROM OLD.grantee_user_id THEN
+        PERFORM bump_change_version(NEW.grantee_user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_shares ON shares;
+CREATE TRIGGER trigger_change_versions_shares
+    AFTER INSERT OR UPDATE OR DELETE ON shares
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_shares_trigger();
+
+COMMENT ON TABLE user_change_versions IS 'Per-user listing version, bumped by triggers on files and shares';
@@ -0,0 +1,153 @@
+-- Migration: Track which files and shares changed at which change version
+-- Date: 2025-11-10
+-- Description: Extends the user_change_versions triggers so every files/shares row
+-- carries the version at which it last changed (in the counter of each user who
+-- lists it), and hard deletes leave tombstones. GET /api/files/changes?since=<version>
+-- returns only what changed after a version. Tombstones are pruned with the sync event
+-- log; pruning raises user_change_versions.resync_below so older clients resync fully.
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE shares ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE shares ADD COLUMN IF NOT EXISTS owner_change_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE user_change_versions ADD COLUMN IF NOT EXISTS resync_below BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN files.change_version IS 'Owner''s change version when the row last changed';
+COMMENT ON COLUMN shares.change_version IS 'Grantee''s change version when the share or its file last changed';
+COMMENT ON COLUMN shares.owner_change_version IS 'File owner''s change version when the share last changed';
+COMMENT ON COLUMN user_change_versions.resync_below IS 'Deltas from versions below this may miss pruned tombstones';
+
+CREATE INDEX IF NOT EXISTS idx_files_owner_change_version ON files(owner_id, change_version);
+CREATE INDEX IF NOT EXISTS idx_shares_grantee_change_version ON shares(grantee_user_id, change_version);
+
+CREATE TABLE IF NOT EXISTS change_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    change_version BIGINT NOT NULL,
+    kind VARCHAR(10) NOT NULL CHECK (kind IN ('file', 'share')),
+    file_id TEXT NOT NULL,
+    share_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_tombstones_user_version ON change_tombstones(user_id, change_version);
+CREATE INDEX IF NOT EXISTS idx_change_tombstones_created_at ON change_tombstones(created_at);
+
+-- Replaced by the stamping triggers below
+DROP TRIGGER IF EXISTS trigger_change_versions_files_insert ON files;
+DROP TRIGGER IF EXISTS trigger_change_versions_files_update ON files;
+DROP TRIGGER IF EXISTS trigger_change_versions_files_delete ON files;
+DROP TRIGGER IF EXISTS trigger_change_versions_shares ON shares;
+DROP FUNCTION IF EXISTS change_versions_files_trigger();
+DROP FUNCTION IF EXISTS change_versions_shares_trigger();
+
+-- files, before the row is written: stamp the owner's new version on it
+-- (runs next to trigger_files_updated_at, but only for columns clients list)
+CREATE OR REPLACE FUNCTION change_versions_files_stamp()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.owner_id IS DISTINCT FROM OLD.owner_id THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id)
+        VALUES (OLD.owner_id, bump_change_version(OLD.owner_id), 'file', OLD.id::text);
+    END IF;
+    NEW.change_version := bump_change_version(NEW.owner_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- files, after an update: restamp the file's shares for each grantee (in user id
+-- order, after the owner, so concurrent transactions lock versions in the same order)
+CREATE OR REPLACE FUNCTION change_versions_files_shares()
+RETURNS TRIGGER AS $$
+DECLARE
+    share_row RECORD;
+BEGIN
+    FOR share_row IN
+        SELECT id, grantee_user_id FROM shares WHERE file_id = NEW.id ORDER BY grantee_user_id
+    LOOP
+        UPDATE shares SET change_version = bump_change_version(share_row.grantee_user_id)
+        WHERE id = share_row.id;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- files, after a delete: tombstone for the owner (the shares cascade and leave their own)
+CREATE OR REPLACE FUNCTION change_versions_files_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_tombstones (user_id, change_version, kind, file_id)
+    VALUES (OLD.owner_id, bump_change_version(OLD.owner_id), 'file', OLD.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_stamp_insert ON files;
+CREATE TRIGGER trigger_change_versions_files_stamp_insert
+    BEFORE INSERT ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_stamp();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_stamp_update ON files;
+CREATE TRIGGER trigger_change_versions_files_stamp_update
+    BEFORE UPDATE OF owner_id, original_filename, content_type, size_bytes, algo, status, storage_path ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_stamp();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_shares ON files;
+CREATE TRIGGER trigger_change_versions_files_shares
+    AFTER UPDATE OF owner_id, original_filename, content_type, size_bytes, algo, status, storage_path ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_shares();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_files_delete ON files;
+CREATE TRIGGER trigger_change_versions_files_delete
+    AFTER DELETE ON files
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_files_delete();
+
+-- shares, before the row is written: stamp the owner's and the grantee's versions
+CREATE OR REPLACE FUNCTION change_versions_shares_stamp()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.owner_change_version := COALESCE(
+        bump_change_version((SELECT owner_id FROM files WHERE id = NEW.file_id)), 0
+    );
+    IF TG_OP = 'UPDATE' AND NEW.grantee_user_id IS DISTINCT FROM OLD.grantee_user_id THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+        VALUES (OLD.grantee_user_id, bump_change_version(OLD.grantee_user_id), 'share', OLD.file_id::text, OLD.id::text);
+    END IF;
+    NEW.change_version := bump_change_version(NEW.grantee_user_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- shares, after a delete: tombstones for the owner (if the file still exists) and the grantee
+CREATE OR REPLACE FUNCTION change_versions_shares_delete()
+RETURNS TRIGGER AS $$
+DECLARE
+    file_owner INTEGER;
+BEGIN
+    SELECT owner_id INTO file_owner FROM files WHERE id = OLD.file_id;
+    IF file_owner IS NOT NULL THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+        VALUES (file_owner, bump_change_version(file_owner), 'share', OLD.file_id::text, OLD.id::text);
+    END IF;
+    INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+    VALUES (OLD.grantee_user_id, bump_change_version(OLD.grantee_user_id), 'share', OLD.file_id::text, OLD.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_shares_stamp ON shares;
+CREATE TRIGGER trigger_change_versions_shares_stamp
+    BEFORE INSERT OR UPDATE OF file_id, grantee_user_id, permission ON shares
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_shares_stamp();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_shares_delete ON shares;
+CREATE TRIGGER trigger_change_versions_shares_delete
+    AFTER DELETE ON shares
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_shares_delete();
+
+COMMENT ON TABLE change_tombstones IS 'Deleted files and shares, kept as long as sync events, for delta listings';
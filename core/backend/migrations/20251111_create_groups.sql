@@ -0,0 +1,254 @@
+-- Migration: Groups as share grantees
+-- Date: 2025-11-11
+-- Description: A user can collect other users in groups and share files with a group
+-- instead of each member: one shares row per file and group, whatever the group's size.
+-- Members reach group shares through group_members (check_access and the received
+-- listings join it on indexed columns), so adding or removing a member is one row.
+-- Group shares carry no per-member change_version: when a group share or a membership
+-- changes, the affected members' change versions are bumped and their resync_below
+-- raised, so their clients reload listings instead of applying a delta.
+
+CREATE TABLE IF NOT EXISTS groups (
+    id SERIAL PRIMARY KEY,
+    owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT unique_owner_group_name UNIQUE (owner_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id INTEGER NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    added_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (group_id, user_id)
+);
+
+-- Groups a user belongs to (the primary key serves members of a group)
+CREATE INDEX IF NOT EXISTS idx_group_members_user_id ON group_members(user_id, group_id);
+
+-- A share goes to exactly one user or one group
+ALTER TABLE shares ALTER COLUMN grantee_user_id DROP NOT NULL;
+ALTER TABLE shares ADD COLUMN IF NOT EXISTS grantee_group_id INTEGER REFERENCES groups(id) ON DELETE CASCADE;
+
+ALTER TABLE shares DROP CONSTRAINT IF EXISTS check_share_grantee;
+ALTER TABLE shares ADD CONSTRAINT check_share_grantee
+    CHECK (num_nonnulls(grantee_user_id, grantee_group_id) = 1);
+
+-- One share per file per group (user shares have a NULL group and never conflict here)
+ALTER TABLE shares DROP CONSTRAINT IF EXISTS unique_file_group_share;
+ALTER TABLE shares ADD CONSTRAINT unique_file_group_share UNIQUE (file_id, grantee_group_id);
+
+CREATE INDEX IF NOT EXISTS idx_shares_grantee_group_id ON shares(grantee_group_id)
+    WHERE grantee_group_id IS NOT NULL;
+
+-- Account deletion removes a user's groups and memberships in their own phase
+ALTER TABLE account_deletions DROP CONSTRAINT IF EXISTS account_deletions_phase_check;
+ALTER TABLE account_deletions ADD CONSTRAINT account_deletions_phase_check
+    CHECK (phase IN ('shares', 'groups', 'files', 'storage', 'events', 'done'));
+
+COMMENT ON TABLE groups IS 'Named sets of users a file owner can share with at once';
+COMMENT ON TABLE group_members IS 'Members of each group; membership grants the group''s shares';
+COMMENT ON COLUMN shares.grantee_group_id IS 'Group the file is shared with (NULL for a share with one user)';
+
+-- Bump the change versions of users and make their clients resync (one statement,
+-- in user id order like every other version bump)
+CREATE OR REPLACE FUNCTION bump_change_versions_resync(p_user_ids INTEGER[])
+RETURNS VOID AS $$
+    INSERT INTO user_change_versions (user_id, version, resync_below, updated_at)
+    SELECT user_id, 1, 1, NOW()
+    FROM unnest(p_user_ids) AS ids(user_id)
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    ORDER BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        version = user_change_versions.version + 1,
+        resync_below = user_change_versions.version + 1,
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION bump_group_change_versions(p_group_ids INTEGER[])
+RETURNS VOID AS $$
+    SELECT bump_change_versions_resync(ARRAY(
+        SELECT user_id FROM group_members WHERE group_id = ANY(p_group_ids)
+    ));
+$$ LANGUAGE sql;
+
+-- shares, before the row is written: as before, with group shares stamped 0
+CREATE OR REPLACE FUNCTION change_versions_shares_stamp()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.owner_change_version := COALESCE(
+        bump_change_version((SELECT owner_id FROM files WHERE id = NEW.file_id)), 0
+    );
+    IF TG_OP = 'UPDATE' AND OLD.grantee_user_id IS NOT NULL
+            AND NEW.grantee_user_id IS DISTINCT FROM OLD.grantee_user_id THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+        VALUES (OLD.grantee_user_id, bump_change_version(OLD.grantee_user_id), 'share', OLD.file_id::text, OLD.id::text);
+    END IF;
+    NEW.change_version := COALESCE(bump_change_version(NEW.grantee_user_id), 0);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_shares_stamp ON shares;
+CREATE TRIGGER trigger_change_versions_shares_stamp
+    BEFORE INSERT OR UPDATE OF file_id, grantee_user_id, grantee_group_id, permission ON shares
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_shares_stamp();
+
+-- shares, after a delete: tombstones for the owner and a user grantee (group members resync)
+CREATE OR REPLACE FUNCTION change_versions_shares_delete()
+RETURNS TRIGGER AS $$
+DECLARE
+    file_owner INTEGER;
+BEGIN
+    SELECT owner_id INTO file_owner FROM files WHERE id = OLD.file_id;
+    IF file_owner IS NOT NULL THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+        VALUES (file_owner, bump_change_version(file_owner), 'share', OLD.file_id::text, OLD.id::text);
+    END IF;
+    IF OLD.grantee_user_id IS NOT NULL THEN
+        INSERT INTO change_tombstones (user_id, change_version, kind, file_id, share_id)
+        VALUES (OLD.grantee_user_id, bump_change_version(OLD.grantee_user_id), 'share', OLD.file_id::text, OLD.id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- shares, once per statement: members of every group whose shares changed, each bumped once
+-- (transition tables are allowed for one event per trigger, hence three triggers)
+CREATE OR REPLACE FUNCTION change_versions_group_shares()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_group_change_versions(ARRAY(
+            SELECT DISTINCT grantee_group_id FROM new_rows WHERE grantee_group_id IS NOT NULL
+        ));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM bump_group_change_versions(ARRAY(
+            SELECT grantee_group_id FROM new_rows WHERE grantee_group_id IS NOT NULL
+            UNION
+            SELECT grantee_group_id FROM old_rows WHERE grantee_group_id IS NOT NULL
+        ));
+    ELSE
+        PERFORM bump_group_change_versions(ARRAY(
+            SELECT DISTINCT grantee_group_id FROM old_rows WHERE grantee_group_id IS NOT NULL
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_group_shares_insert ON shares;
+CREATE TRIGGER trigger_change_versions_group_shares_insert
+    AFTER INSERT ON shares
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION change_versions_group_shares();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_group_shares_update ON shares;
+CREATE TRIGGER trigger_change_versions_group_shares_update
+    AFTER UPDATE ON shares
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION change_versions_group_shares();
+
+DROP TRIGGER IF EXISTS trigger_change_versions_group_shares_delete ON shares;
+CREATE TRIGGER trigger_change_versions_group_shares_delete
+    AFTER DELETE ON shares
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION change_versions_group_shares();
+
+-- files, after an update: restamp user shares per grantee, resync members of group shares
+CREATE OR REPLACE FUNCTION change_versions_files_shares()
+RETURNS TRIGGER AS $$
+DECLARE
+    share_row RECORD;
+BEGIN
+    FOR share_row IN
+        SELECT id, grantee_user_id FROM shares
+        WHERE file_id = NEW.id AND grantee_user_id IS NOT NULL
+        ORDER BY grantee_user_id
+    LOOP
+        UPDATE shares SET change_version = bump_change_version(share_row.grantee_user_id)
+        WHERE id = share_row.id;
+    END LOOP;
+    PERFORM bump_group_change_versions(ARRAY(
+        SELECT grantee_group_id FROM shares WHERE file_id = NEW.id AND grantee_group_id IS NOT NULL
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- group_members: a member gained or lost all of the group's shares (one version row);
+-- groups without shares change no listing
+CREATE OR REPLACE FUNCTION change_versions_group_members()
+RETURNS TRIGGER AS $$
+DECLARE
+    member group_members%ROWTYPE;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        member := NEW;
+    ELSE
+        member := OLD;
+    END IF;
+    IF EXISTS (SELECT 1 FROM shares WHERE grantee_group_id = member.group_id) THEN
+        PERFORM bump_change_versions_resync(ARRAY[member.user_id]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_group_members ON group_members;
+CREATE TRIGGER trigger_change_versions_group_members
+    AFTER INSERT OR DELETE ON group_members
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_group_members();
+
+-- groups, before a delete: resync the members while they are still listed (the
+-- cascades may remove the memberships before the group's shares)
+CREATE OR REPLACE FUNCTION change_versions_groups_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM shares WHERE grantee_group_id = OLD.id) THEN
+        PERFORM bump_group_change_versions(ARRAY[OLD.id]);
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_change_versions_groups_delete ON groups;
+CREATE TRIGGER trigger_change_versions_groups_delete
+    BEFORE DELETE ON groups
+    FOR EACH ROW
+    EXECUTE FUNCTION change_versions_groups_delete();
+
+-- user_stats: shares_received counts shares with the user directly
+CREATE OR REPLACE FUNCTION user_stats_shares_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    file_owner INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT owner_id INTO file_owner FROM files WHERE id = NEW.file_id;
+        IF NEW.grantee_user_id IS NOT NULL THEN
+            PERFORM bump_user_stats(NEW.grantee_user_id, 0, 0, 0, 1);
+        END IF;
+        IF file_owner IS NOT NULL THEN
+            PERFORM bump_user_stats(file_owner, 0, 0, 1, 0);
+            PERFORM bump_user_stats_daily(file_owner, (NOW() AT TIME ZONE 'UTC')::DATE, 0, 0, 0, 0, 1);
+        END IF;
+        RETURN NEW;
+    END IF;
+
+    SELECT owner_id INTO file_owner FROM files WHERE id = OLD.file_id;
+    IF OLD.grantee_user_id IS NOT NULL THEN
+        PERFORM bump_user_stats(OLD.grantee_user_id, 0, 0, 0, -1);
+    END IF;
+    IF file_owner IS NOT NULL THEN
+        PERFORM bump_user_stats(file_owner, 0, 0, -1, 0);
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,9 @@
+-- Migration: Align share permissions with the API
+-- Date: 2025-11-12
+-- Description: The sharing API and UI grant 'full_access' (view and download), which
+-- check_valid_permission rejected, so a multi-row share upsert carrying it failed as a
+-- whole. The constraint now allows the same values as Share.PERMISSIONS in database.py.
+
+ALTER TABLE shares DROP CONSTRAINT IF EXISTS check_valid_permission;
+ALTER TABLE shares ADD CONSTRAINT check_valid_permission
+    CHECK (permission IN ('read', 'write', 'view', 'download', 'edit', 'full_access'));
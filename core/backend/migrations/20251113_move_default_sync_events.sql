@@ -0,0 +1,57 @@
+-- Migration: Create sync_events partitions for days with rows in the default partition
+-- Date: 2025-11-13
+-- Description: When the scheduler lapses, events for a day without a partition land in
+-- sync_events_default, and CREATE TABLE ... PARTITION OF for that day then fails
+-- ("updated partition constraint for default partition would be violated") on every
+-- later run. For such a day the partition is now created as a plain table, the day's
+-- rows are moved into it from the default partition, and it is attached.
+
+CREATE OR REPLACE FUNCTION create_sync_events_partitions(days_ahead INTEGER DEFAULT 7, days_back INTEGER DEFAULT 0)
+RETURNS INTEGER AS $$
+DECLARE
+    day DATE;
+    partition_name TEXT;
+    moved BIGINT;
+    created INTEGER := 0;
+BEGIN
+    FOR day IN
+        SELECT generate_series(CURRENT_DATE - days_back, CURRENT_DATE + days_ahead, INTERVAL '1 day')::DATE
+    LOOP
+        partition_name := 'sync_events_' || to_char(day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            CONTINUE;
+        END IF;
+
+        IF EXISTS (SELECT 1 FROM sync_events_default WHERE created_at >= day AND created_at < day + 1) THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE sync_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name
+            );
+            EXECUTE format(
+                'WITH moved AS (
+                     DELETE FROM sync_events_default
+                     WHERE created_at >= %L AND created_at < %L
+                     RETURNING *
+                 )
+                 INSERT INTO %I SELECT * FROM moved',
+                day, day + 1, partition_name
+            );
+            GET DIAGNOSTICS moved = ROW_COUNT;
+            EXECUTE format(
+                'ALTER TABLE sync_events ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, day, day + 1
+            );
+            RAISE WARNING 'Moved % sync_events rows for % out of the default partition', moved, day;
+        ELSE
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF sync_events FOR VALUES FROM (%L) TO (%L)',
+                partition_name, day, day + 1
+            );
+        END IF;
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION create_sync_events_partitions IS 'Creates missing daily sync_events partitions around the current date, moving rows for those days out of the default partition';
@@ -59,10 +59,58 @@ class File:
         return DBFile.find_by_owner(owner_id)
     
     @staticmethod
-    def find_by_id(file_id):
+    def find_listing_by_owner(owner_id, columns):
+        """Find files by owner, selecting only listing columns"""
+        from database import File as DBFile
+        return DBFile.find_listing_by_owner(owner_id, columns)
+    
+    @staticmethod
+    def iter_by_owner(conn, owner_id, columns=None):
+        """Stream files by owner from a server-side cursor"""
+        from database import File as DBFile
+        return DBFile.iter_by_owner(conn, owner_id, columns)
+    
+    @staticmethod
+    def listing_totals(user_id):
+        """File counts and owned bytes in one aggregate query"""
+        from database import File as DBFile
+        return DBFile.listing_totals(user_id)
+    
+    @staticmethod
+    def find_by_id(file_id, include_deleted=False):
         """Find file by ID"""
         from database import File as DBFile
-        return DBFile.find_by_id(file_id)
+        return DBFile.find_by_id(file_id, include_deleted)
+    
+    @staticmethod
+    def find_deleted_by_owner(owner_id, retention_days):
+        """Find files in a user's trash"""
+        from database import File as DBFile
+        return DBFile.find_deleted_by_owner(owner_id, retention_days)
+    
+    @staticmethod
+    def soft_delete(file_ids, owner_id):
+        """Move files to the trash"""
+        from database import File as DBFile
+        return DBFile.soft_delete(file_ids, owner_id)
+    
+    @staticmethod
+    def restore(file_id, owner_id, retention_days):
+        """Take a file out of the trash"""
+        from database import File as DBFile
+        return DBFile.restore(file_id, owner_id, retention_days)
+    
+    @staticmethod
+    def update_storage_path(file_id, storage_path):
+        """Point a file record at a new storage location"""
+        from database import File as DBFile
+        return DBFile.update_storage_path(file_id, storage_path)
+    
+    @staticmethod
+    def find_owner_status(file_ids):
+        """Owner and status of existing file ids"""
+        from database import File as DBFile
+        return DBFile.find_owner_status(file_ids)
     
     @staticmethod
     def delete_by_id(file_id, owner_id):
@@ -80,6 +128,25 @@ class Share:
         from database import Share as DBShare
         return DBShare.create(file_id, owner_id, grantee_email, encrypted_key_for_grantee, permissions)
     
+    @staticmethod
+    def bulk_upsert(owner_id, file_ids, usernames, permission):
+        """Share files with users in one multi-row upsert"""
+        from database import Share as DBShare
+        return DBShare.bulk_upsert(owner_id, file_ids, usernames, permission)
+    
+    @staticmethod
+    def bulk_revoke(owner_id, file_ids=None, grantee_ids=None, usernames=None, group_ids=None):
+        """Delete the shares chosen by file ids and/or grantees in one statement"""
+        from database import Share as DBShare
+        return DBShare.bulk_revoke(owner_id, file_ids, grantee_ids, usernames, group_ids)
+    
+    @staticmethod
+    def bulk_update_permission(owner_id, permission, file_ids=None, grantee_ids=None, usernames=None,
+                               group_ids=None):
+        """Change the permission of the shares chosen by file ids and/or grantees in one statement"""
+        from database import Share as DBShare
+        return DBShare.bulk_update_permission(owner_id, permission, file_ids, grantee_ids, usernames, group_ids)
+    
     @staticmethod
     def find_shared_with_user(user_id):
         """Find files shared with a user"""
@@ -8,6 +8,9 @@ from .files import files_bp
 from .shares import shares_bp
 from .sync import sync_bp
 from .users import users_bp
+from .analytics import analytics_bp
+from .batch import batch_bp
+from .groups import groups_bp
 from flask import Blueprint
 from middleware.auth import auth_required
 
@@ -15,7 +18,10 @@ from middleware.auth import auth_required
 bulk_bp = Blueprint('bulk', __name__)
 
 # Import bulk controller functions
-from .bulkController import bulk_delete_files, bulk_share_files, bulk_download_info
+from .bulkController import (
+    bulk_delete_files, bulk_share_files, bulk_unshare_files, bulk_update_share_permission,
+    bulk_download_info
+)
 
 # Register bulk routes
 @bulk_bp.route('/api/files/bulk-delete', methods=['POST'])
@@ -28,6 +34,16 @@ def bulk_delete():
 def bulk_share():
     return bulk_share_files()
 
+@bulk_bp.route('/api/files/bulk-unshare', methods=['POST'])
+@auth_required
+def bulk_unshare():
+    return bulk_unshare_files()
+
+@bulk_bp.route('/api/files/bulk-permission', methods=['POST'])
+@auth_required
+def bulk_permission():
+    return bulk_update_share_permission()
+
 @bulk_bp.route('/api/files/bulk-download-info', methods=['POST'])
 @auth_required
 def bulk_download():
@@ -44,6 +60,9 @@ def register_routes(app):
     app.register_blueprint(sync_bp)    # sync_bp has its own /api prefix in routes
     app.register_blueprint(bulk_bp)    # Register bulk operations blueprint
     app.register_blueprint(users_bp)   # Register users blueprint for profile management
+    app.register_blueprint(analytics_bp)  # analytics_bp has its own /api prefix in routes
+    app.register_blueprint(batch_bp)   # batch_bp has its own /api prefix in routes
+    app.register_blueprint(groups_bp)  # groups_bp has its own /api prefix in routes
     
     # Root route for API health check
     @app.route('/api', methods=['GET', 'OPTIONS'])
@@ -0,0 +1,89 @@
+"""
+Analytics Routes
+Serves the per-user analytics rollups used by the dashboard
+"""
+from flask import Blueprint, request, jsonify
+from middleware.auth import auth_required
+from flask import g
+from utils.analytics import get_user_stats, get_usage_history, DEFAULT_ACTIVITY_DAYS, HISTORY_BUCKETS
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# Longest activity window served by /api/analytics/summary
+MAX_ACTIVITY_DAYS = 366
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp, treating naive values as UTC"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+@analytics_bp.route('/api/analytics/summary', methods=['GET'])
+@auth_required
+def get_summary():
+    """
+    Get the current user's totals and daily activity
+
+    Query params:
+    - days: days of activity to include (default 30, max 366)
+    """
+    try:
+        days = request.args.get('days', DEFAULT_ACTIVITY_DAYS, type=int)
+        if days is None or days < 1 or days > MAX_ACTIVITY_DAYS:
+            return jsonify({'error': f'Invalid days. Must be between 1 and {MAX_ACTIVITY_DAYS}.'}), 400
+
+        stats = get_user_stats(g.current_user['id'], days=days)
+        return jsonify({
+            'user_id': g.current_user['id'],
+            'days': days,
+            **stats
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting analytics summary: {e}")
+        return jsonify({'error': 'Failed to retrieve analytics', 'details': str(e)}), 500
+
+@analytics_bp.route('/api/analytics/history', methods=['GET'])
+@auth_required
+def get_history():
+    """
+    Get the current user's usage time series
+
+    Query params:
+    - from: ISO timestamp (default 30 days ago)
+    - to: ISO timestamp (default now)
+    - bucket: hour, day, week or month (default picked from the range)
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        try:
+            end = parse_timestamp(request.args['to']) if request.args.get('to') else now
+            start = parse_timestamp(request.args['from']) if request.args.get('from') else end - timedelta(days=30)
+        except ValueError:
+            return jsonify({'error': 'Invalid timestamp format. Use ISO 8601 format.'}), 400
+
+        if start > end:
+            return jsonify({'error': '"from" must be before "to"'}), 400
+
+        bucket = request.args.get('bucket')
+        if bucket is not None and bucket not in HISTORY_BUCKETS:
+            return jsonify({'error': f'Invalid bucket. Must be one of: {", ".join(HISTORY_BUCKETS)}'}), 400
+
+        bucket, points = get_usage_history(g.current_user['id'], start, end, bucket)
+        return jsonify({
+            'user_id': g.current_user['id'],
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'bucket': bucket,
+            'points': points,
+            'count': len(points)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error getting usage history: {e}")
+        return jsonify({'error': 'Failed to retrieve usage history', 'details': str(e)}), 500
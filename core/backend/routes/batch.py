@@ -0,0 +1,153 @@
+"""
+Batch Routes
+Runs several GET requests of the API in one round trip: the batch is
+authenticated once and every sub-request runs on a single database
+connection, then their responses are returned together.
+"""
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from database import db_manager
+from middleware.auth import auth_required
+from utils.metrics import metrics
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+# Sub-requests accepted in one batch
+MAX_BATCH_REQUESTS = 20
+
+# Request headers passed on to sub-requests (Authorization is taken from the batch)
+FORWARDED_HEADERS = ('If-None-Match', 'Accept', 'Accept-Language')
+
+# Response headers returned for each sub-request
+RETURNED_HEADERS = ('ETag', 'Cache-Control')
+
+# Endpoints returning file contents: their bodies can't be embedded in JSON,
+# and a download would be recorded (file_downloaded event) without reaching the client
+UNBATCHABLE_ENDPOINTS = (
+    'files_v2.download_encrypted_file',
+    'files_v2.download_encrypted_file_alias',
+    'users.get_profile_photo'
+)
+
+def matched_endpoint(app, path):
+    """Endpoint a GET of path is routed to, or None when it matches no route"""
+    try:
+        endpoint, _ = app.url_map.bind('localhost').match(path.split('?', 1)[0], method='GET')
+        return endpoint
+    except HTTPException:
+        return None
+
+def validate_sub_request(app, index, sub):
+    """Error message for an invalid sub-request, or None"""
+    if not isinstance(sub, dict):
+        return f"requests[{index}] must be an object"
+    if sub.get('method', 'GET').upper() != 'GET':
+        return f"requests[{index}]: only GET requests can be batched"
+    path = sub.get('path')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return f"requests[{index}]: path must start with /api/"
+    if path.split('?', 1)[0].rstrip('/') == '/api/batch':
+        return f"requests[{index}]: batches cannot be nested"
+    if not isinstance(sub.get('headers', {}), dict):
+        return f"requests[{index}]: headers must be an object"
+    if matched_endpoint(app, path) in UNBATCHABLE_ENDPOINTS:
+        return f"requests[{index}]: file downloads cannot be batched"
+    return None
+
+def run_sub_request(app, sub, user):
+    """Dispatch one sub-request through the app's routing and return (status, headers, body)"""
+    headers = {
+        name: value for name, value in sub.get('headers', {}).items()
+        if name.title() in FORWARDED_HEADERS
+    }
+    # Routes using flask_jwt_extended still verify the token themselves
+    if request.headers.get('Authorization'):
+        headers['Authorization'] = request.headers['Authorization']
+    path, _, query_string = sub['path'].partition('?')
+    builder = EnvironBuilder(
+        path=path,
+        query_string=query_string,
+        method='GET',
+        headers=headers,
+        base_url=request.host_url
+    )
+    environ = builder.get_environ()
+    builder.close()
+    
+    # A fresh app context gives each sub-request its own g
+    with app.app_context(), app.request_context(environ):
+        g.batch_user = user
+        try:
+            rv = app.preprocess_request()
+            if rv is None:
+                rv = app.dispatch_request()
+        except HTTPException as e:
+            rv = app.handle_http_exception(e)
+        response = app.make_response(rv)
+        try:
+            if response.direct_passthrough or not (response.is_json or response.mimetype.startswith('text/')):
+                return 406, {}, {'error': 'Only JSON and text responses can be batched'}
+            # Read the body here: streamed responses need the request context
+            body = response.get_json(silent=True) if response.is_json else (response.get_data(as_text=True) or None)
+            returned = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+            return response.status_code, returned, body
+        finally:
+            response.close()
+
+@batch_bp.route('/api/batch', methods=['POST'])
+@auth_required
+def run_batch():
+    """
+    Run several GET requests in one round trip
+    
+    Body: {"requests": [{"id": "files", "path": "/api/files/list?include=file_counts",
+                         "headers": {"If-None-Match": "..."}}, ...]}
+    
+    Returns 200 with one entry per sub-request, in order:
+    {"responses": [{"id", "status", "headers", "body", "duration_ms"}], "duration_ms"}
+    A failing sub-request only fails its own entry.
+    """
+    data = request.get_json(silent=True) or {}
+    subs = data.get('requests')
+    if not isinstance(subs, list) or not subs:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(subs) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} requests per batch'}), 400
+    
+    app = current_app._get_current_object()
+    for index, sub in enumerate(subs):
+        error = validate_sub_request(app, index, sub)
+        if error:
+            return jsonify({'error': error}), 400
+    
+    user = g.current_user
+    started = time.perf_counter()
+    responses = []
+    
+    with db_manager.request_connection():
+        for index, sub in enumerate(subs):
+            sub_started = time.perf_counter()
+            try:
+                status, headers, body = run_sub_request(app, sub, user)
+            except Exception as e:
+                logger.error(f"Batch sub-request {sub['path']} failed: {e}")
+                status, headers, body = 500, {}, {'error': 'Sub-request failed'}
+            responses.append({
+                'id': sub.get('id', index),
+                'status': status,
+                'headers': headers,
+                'body': body,
+                'duration_ms': round((time.perf_counter() - sub_started) * 1000, 2)
+            })
+    
+    metrics.incr('batch.requests')
+    metrics.incr('batch.sub_requests', len(subs))
+    return jsonify({
+        'responses': responses,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+    }), 200
@@ -5,18 +5,22 @@ Provides endpoints for bulk delete, share, and other multi-file operations
 """
 from flask import jsonify, g, request
 from models import File, Share
-from database import check_access, User
+from database import check_access, Share as DBShare
 from storage_manager import storage_manager
+from utils.sharing import emit_share_events, emit_unshare_events, share_files
 from datetime import datetime
 import logging
-import os
-from pathlib import Path
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# Permission levels accepted by bulk share and bulk permission changes (the
+# values the shares table accepts, so a valid request never fails in the upsert)
+SHARE_PERMISSIONS = DBShare.PERMISSIONS
+
 def bulk_delete_files():
     """
-    Delete multiple files at once
+    Move multiple files to the trash at once
     
     Request body:
     {
@@ -41,74 +45,55 @@ def bulk_delete_files():
         if not isinstance(file_ids, list) or len(file_ids) == 0:
             return jsonify({'error': 'file_ids must be a non-empty array'}), 400
         
-        deleted_count = 0
         failed = []
+        valid_ids = []
         
-        for file_id in file_ids:
+        for file_id in dict.fromkeys(str(f) for f in file_ids):
             try:
-                # Find file and verify ownership
-                file_record = File.find_by_id(file_id)
-                
-                if not file_record:
-                    failed.append({
-                        'file_id': file_id,
-                        'reason': 'File not found'
-                    })
-                    continue
-                
-                # Check ownership
-                if file_record['owner_id'] != user_id:
-                    failed.append({
-                        'file_id': file_id,
-                        'reason': 'Access denied - not the owner'
-                    })
-                    continue
-                
-                # Store storage_path before deleting from database
-                storage_path = file_record.get('storage_path')
-                
-                # Delete from database
-                deleted_file = File.delete_by_id(file_id, user_id)
-                
-                # Delete physical file from storage if it exists
-                if deleted_file and storage_path:
-                    try:
-                        file_path = Path(storage_path)
-                        if file_path.exists():
-                            os.remove(file_path)
-                            print(f"✅ Physical file deleted: {storage_path}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to delete physical file {storage_path}: {e}")
-                
-                if deleted_file:
-                    deleted_count += 1
-                    
-                    # Emit sync event for real-time dashboard update
-                    try:
-                        from utils.sync_events import emit_sync_event
-                        emit_sync_event(
-                            user_id=user_id,
-                            event_type='file_deleted',
-                            payload={
-                                'file_id': file_id,
-                                'filename': file_record['original_filename']
-                            }
-                        )
-                    except Exception as sync_err:
-                        logger.warning(f"Failed to emit sync event: {sync_err}")
+                valid_ids.append(str(uuid.UUID(file_id)))
+            except ValueError:
+                failed.append({
+                    'file_id': file_id,
+                    'reason': 'File not found'
+                })
+        
+        # One UPDATE for the whole set; storage is moved by the trash job
+        deleted = File.soft_delete(valid_ids, user_id) if valid_ids else []
+        deleted_ids = {str(row['id']) for row in deleted}
+        
+        # Explain the rest with a single lookup
+        leftover = [file_id for file_id in valid_ids if file_id not in deleted_ids]
+        if leftover:
+            existing = File.find_owner_status(leftover)
+            for file_id in leftover:
+                row = existing.get(file_id)
+                if not row:
+                    reason = 'File not found'
+                elif row['owner_id'] != user_id:
+                    reason = 'Access denied - not the owner'
                 else:
-                    failed.append({
-                        'file_id': file_id,
-                        'reason': 'Delete operation failed'
-                    })
-                    
-            except Exception as file_err:
-                logger.error(f"Error deleting file {file_id}: {file_err}")
+                    reason = 'File already deleted'
                 failed.append({
                     'file_id': file_id,
-                    'reason': str(file_err)
+                    'reason': reason
                 })
         
+        # Emit sync events for real-time dashboard update
+        try:
+            from utils.sync_events import emit_sync_event
+            for row in deleted:
+                emit_sync_event(
+                    user_id=user_id,
+                    event_type='file_deleted',
+                    payload={
+                        'file_id': str(row['id']),
+                        'filename': row['original_filename']
+                    }
+                )
+        except Exception as sync_err:
+            logger.warning(f"Failed to emit sync event: {sync_err}")
+        
+        deleted_count = len(deleted)
         return jsonify({
             'success': True,
             'deleted_count': deleted_count,
@@ -129,11 +114,11 @@ def bulk_share_files():
     {
         "file_ids": ["uuid1", "uuid2"],
         "usernames": ["user1", "user2"],
-        "permission": "read"  // "read", "write", or "full_access"
+        "permission": "read"  // One of SHARE_PERMISSIONS, e.g. "read" or "full_access"
     }
     
     Returns:
-        200: {success: true, shares_created: int, failed: []}
+        200: {success: true, shares_created: int, shares_updated: int, failed: []}
         400: Invalid request
         403: Access denied
         500: Server error
@@ -156,114 +141,24 @@ def bulk_share_files():
         if not isinstance(usernames, list) or len(usernames) == 0:
             return jsonify({'error': 'usernames must be a non-empty array'}), 400
         
-        if permission not in ['read', 'write', 'full_access']:
-            return jsonify({'error': 'Invalid permission level'}), 400
+        if permission not in SHARE_PERMISSIONS:
+            return jsonify({'error': f"Invalid permission level. Must be one of: {', '.join(SHARE_PERMISSIONS)}"}), 400
         
-        shares_created = 0
-        failed = []
+        # One multi-row upsert for every file x user pair
+        outcome = share_files(user_id, file_ids, usernames, permission)
+        shares = outcome['shares']
+        failed = outcome['failed_usernames'] + outcome['failed_files']
         
-        # Get grantee user IDs from usernames
-        grantee_ids = []
-        
-        for username in usernames:
-            user = User.find_by_username(username)
-            if not user:
-                failed.append({
-                    'username': username,
-                    'reason': 'User not found'
-                })
-                continue
-            
-            if user['id'] == user_id:
-                failed.append({
-                    'username': username,
-                    'reason': 'Cannot share with yourself'
-                })
-                continue
-            
-            grantee_ids.append(user['id'])
-        
-        # Create shares for each file and each grantee
-        for file_id in file_ids:
-            try:
-                # Verify file exists and user owns it
-                file_record = File.find_by_id(file_id)
-                
-                if not file_record:
-                    failed.append({
-                        'file_id': file_id,
-                        'reason': 'File not found'
-                    })
-                    continue
-                
-                if file_record['owner_id'] != user_id:
-                    failed.append({
-                        'file_id': file_id,
-                        'reason': 'Access denied - not the owner'
-                    })
-                    continue
-                
-                # Create share for each grantee
-                for grantee_id in grantee_ids:
-                    try:
-                        # Check if share already exists
-                        existing_share = Share.find_by_file_and_grantee(file_id, grantee_id)
-                        
-                        if existing_share:
-                            # Update existing share
-                            Share.update_permission(file_id, grantee_id, permission)
-                            shares_created += 1
-                        else:
-                            # Create new share
-                            share = Share.create(
-                                file_id=file_id,
-                                owner_id=user_id,
-                                grantee_id=grantee_id,
-                                permission=permission
-                            )
-                            if share:
-                                shares_created += 1
-                            else:
-                                failed.append({
-                                    'file_id': file_id,
-                                    'grantee_id': grantee_id,
-                                    'reason': 'Failed to create share'
-                                })
-                    except Exception as share_err:
-                        logger.error(f"Error creating share for file {file_id}, grantee {grantee_id}: {share_err}")
-                        failed.append({
-                            'file_id': file_id,
-                            'grantee_id': grantee_id,
-                            'reason': str(share_err)
-                        })
-                
-                # Emit sync event
-                try:
-                    from utils.sync_events import emit_sync_event
-                    emit_sync_event(
-                        user_id=user_id,
-                        event_type='file_shared',
-                        payload={
-                            'file_id': file_id,
-                            'filename': file_record['original_filename'],
-                            'grantee_count': len(grantee_ids)
-                        }
-                    )
-                except Exception as sync_err:
-                    logger.warning(f"Failed to emit sync event: {sync_err}")
-                    
-            except Exception as file_err:
-                logger.error(f"Error sharing file {file_id}: {file_err}")
-                failed.append({
-                    'file_id': file_id,
-                    'reason': str(file_err)
-                })
+        emit_share_events(user_id, shares, permission)
         
+        shares_created = sum(1 for row in shares if row['created'])
+        shares_updated = len(shares) - shares_created
         return jsonify({
             'success': True,
             'shares_created': shares_created,
+            'shares_updated': shares_updated,
             'failed': failed,
-            'message': f'Successfully created {shares_created} share(s)'
+            'message': f'Successfully shared {len(shares)} share(s) ({shares_created} new, {shares_updated} updated)'
         }), 200
         
     except Exception as e:
@@ -271,6 +166,155 @@ def bulk_share_files():
         return jsonify({'error': str(e)}), 500
 
 
+def _parse_share_selection(data):
+    """
+    Shares chosen by a bulk unshare or permission request: file_ids and/or
+    grantees (grantee_user_ids, usernames, group_ids), each an array when given
+
+    Returns:
+        (file_ids, grantee_ids, usernames, group_ids), each None when not given
+
+    Raises:
+        ValueError: for malformed selections
+    """
+    file_ids = data.get('file_ids')
+    grantee_ids = data.get('grantee_user_ids')
+    usernames = data.get('usernames')
+    group_ids = data.get('group_ids')
+    
+    selection = (('file_ids', file_ids), ('grantee_user_ids', grantee_ids),
+                 ('usernames', usernames), ('group_ids', group_ids))
+    for name, value in selection:
+        if value is not None and not isinstance(value, list):
+            raise ValueError(f'{name} must be an array')
+    if all(value is None for _, value in selection):
+        raise ValueError('file_ids, grantee_user_ids, usernames or group_ids is required')
+    
+    if file_ids is not None:
+        valid_ids = []
+        for file_id in dict.fromkeys(str(f) for f in file_ids):
+            try:
+                valid_ids.append(str(uuid.UUID(file_id)))
+            except ValueError:
+                pass  # can't match any file
+        file_ids = valid_ids
+    if grantee_ids is not None:
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in grantee_ids):
+            raise ValueError('grantee_user_ids must be an array of user ids')
+        grantee_ids = list(dict.fromkeys(grantee_ids))
+    if group_ids is not None:
+        if not all(isinstance(i, int) and not isinstance(i, bool) for i in group_ids):
+            raise ValueError('group_ids must be an array of group ids')
+        group_ids = list(dict.fromkeys(group_ids))
+    if usernames is not None:
+        usernames = list(dict.fromkeys(str(name).strip() for name in usernames))
+    return file_ids, grantee_ids, usernames, group_ids
+
+
+def _distinct_grantees(rows, key):
+    """Distinct non-null values of key (grantee_user_id or grantee_group_id) in rows"""
+    return list(dict.fromkeys(row[key] for row in rows if row[key] is not None))
+
+
+def bulk_unshare_files():
+    """
+    Revoke many shares at once: of the given files, with the given users or
+    groups, or both (only grantees: everything shared with those users)
+    
+    Request body:
+    {
+        "file_ids": ["uuid1", "uuid2"],     // Optional
+        "grantee_user_ids": [7, 9],          // Optional
+        "usernames": ["user1"],              // Optional
+        "group_ids": [3]                     // Optional
+    }
+    
+    Returns:
+        200: {success: true, revoked_count: int, file_ids: [], grantee_user_ids: [], group_ids: []}
+        400: Invalid request
+        500: Server error
+    """
+    try:
+        user_id = g.current_user['id']
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        try:
+            file_ids, grantee_ids, usernames, group_ids = _parse_share_selection(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One DELETE for the whole set
+        revoked = Share.bulk_revoke(user_id, file_ids, grantee_ids, usernames, group_ids)
+        emit_unshare_events(user_id, revoked)
+        
+        return jsonify({
+            'success': True,
+            'revoked_count': len(revoked),
+            'file_ids': list(dict.fromkeys(str(row['file_id']) for row in revoked)),
+            'grantee_user_ids': _distinct_grantees(revoked, 'grantee_user_id'),
+            'group_ids': _distinct_grantees(revoked, 'grantee_group_id'),
+            'message': f'Successfully revoked {len(revoked)} share(s)'
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Bulk unshare error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def bulk_update_share_permission():
+    """
+    Change the permission of many shares at once, chosen like bulk_unshare_files
+    
+    Request body:
+    {
+        "permission": "read",                // One of SHARE_PERMISSIONS
+        "file_ids": ["uuid1", "uuid2"],     // Optional
+        "grantee_user_ids": [7, 9],          // Optional
+        "usernames": ["user1"],              // Optional
+        "group_ids": [3]                     // Optional
+    }
+    
+    Returns:
+        200: {success: true, updated_count: int, file_ids: [], grantee_user_ids: [], group_ids: []}
+        400: Invalid request
+        500: Server error
+    """
+    try:
+        user_id = g.current_user['id']
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        permission = data.get('permission')
+        if permission not in SHARE_PERMISSIONS:
+            return jsonify({'error': f"Invalid permission level. Must be one of: {', '.join(SHARE_PERMISSIONS)}"}), 400
+        
+        try:
+            file_ids, grantee_ids, usernames, group_ids = _parse_share_selection(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # One UPDATE for the whole set; shares that already have the permission are skipped
+        updated = Share.bulk_update_permission(user_id, permission, file_ids, grantee_ids, usernames, group_ids)
+        emit_share_events(user_id, updated, permission, event_type='share_updated')
+        
+        return jsonify({
+            'success': True,
+            'updated_count': len(updated),
+            'file_ids': list(dict.fromkeys(str(row['file_id']) for row in updated)),
+            'grantee_user_ids': _distinct_grantees(updated, 'grantee_user_id'),
+            'group_ids': _distinct_grantees(updated, 'grantee_group_id'),
+            'message': f'Successfully updated {len(updated)} share(s)'
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Bulk permission change error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 def bulk_download_info():
     """
     Get download information for multiple files
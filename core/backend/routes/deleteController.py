@@ -1,60 +1,50 @@
 """
-Delete Controller - Handles file deletion for both database and local storage
+Delete Controller - Handles file deletion, the trash and restores
+Deleting only marks the file record as deleted; background jobs move the
+physical file into the user's deleted/ folder and purge it after retention
 """
 from flask import jsonify, g
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from models import File
-from storage_manager import storage_manager
-import os
-from pathlib import Path
+from storage_manager import storage_manager, TRASH_RETENTION_DAYS
+
+def utcnow():
+    """Get current UTC time as timezone-aware datetime"""
+    return datetime.now(timezone.utc)
 
 def delete_file(file_id):
     """
-    Hard delete file - removes file from database AND physical storage.
-    
+    Soft delete file - moves it to the trash; it can be restored for
+    TRASH_RETENTION_DAYS before it is permanently removed.
+
     Args:
         file_id: UUID of the file to delete
-    
+
     Returns:
-        200: {message: 'File deleted successfully'}
+        200: {message, file_id, restorable_until}
         404: File not found or access denied
         500: Server error
     """
     try:
         user_id = g.current_user['id']
         username = g.current_user['username']
-        
+
         # Find file and verify ownership
         file_record = File.find_by_id(file_id)
         if not file_record:
             return jsonify({'error': 'File not found'}), 404
-            
+
         # Check ownership
         if file_record['owner_id'] != user_id:
             return jsonify({'error': 'Access denied - you are not the owner'}), 403
-        
-        # Store storage_path before deleting from database
-        storage_path = file_record.get('storage_path')
-        
-        # Delete from database first
-        deleted_file = File.delete_by_id(file_id, user_id)
-        
-        if not deleted_file:
+
+        # Only the metadata change happens in the request; storage is handled in the background
+        deleted = File.soft_delete([file_id], user_id)
+
+        if not deleted:
             return jsonify({'error': 'File not found or already deleted'}), 404
-        
-        # Delete physical file from storage if it exists
-        if storage_path:
-            try:
-                file_path = Path(storage_path)
-                if file_path.exists():
-                    os.remove(file_path)
-                    print(f"✅ Physical file deleted: {storage_path}")
-                else:
-                    print(f"⚠️ Physical file not found (already deleted?): {storage_path}")
-            except Exception as e:
-                print(f"⚠️ Failed to delete physical file {storage_path}: {e}")
-                # Continue anyway - database record is deleted
-        
+        deleted_file = deleted[0]
+
         # Emit sync event for real-time dashboard update
         try:
             from utils.sync_events import emit_sync_event
@@ -68,11 +58,97 @@ def delete_file(file_id):
             )
         except Exception as e:
             print(f"Warning: Failed to emit sync event: {e}")
-        
-        print(f"✅ File deleted from database: {file_id} (owner: {username})")
-        
-        return jsonify({'message': 'File deleted successfully'}), 200
-        
+
+        print(f"✅ File moved to trash: {file_id} (owner: {username})")
+
+        return jsonify({
+            'message': 'File deleted successfully',
+            'file_id': file_id,
+            'restorable_until': (utcnow() + timedelta(days=TRASH_RETENTION_DAYS)).isoformat()
+        }), 200
+
     except Exception as e:
         print(f"Delete error: {str(e)}")
         return jsonify({'error': 'Failed to delete file'}), 500
+
+def list_trash():
+    """
+    List the current user's deleted files that can still be restored
+
+    Returns:
+        200: {files, count, retention_days}
+        500: Server error
+    """
+    try:
+        user_id = g.current_user['id']
+        files = File.find_deleted_by_owner(user_id, TRASH_RETENTION_DAYS)
+
+        return jsonify({
+            'files': [
+                {
+                    'id': str(f['id']),
+                    'original_filename': f['original_filename'],
+                    'content_type': f['content_type'],
+                    'size_bytes': f['size_bytes'],
+                    'created_at': f['created_at'].isoformat(),
+                    'deleted_at': f['deleted_at'].isoformat(),
+                    'purge_after': f['purge_after'].isoformat()
+                }
+                for f in files
+            ],
+            'count': len(files),
+            'retention_days': TRASH_RETENTION_DAYS
+        }), 200
+
+    except Exception as e:
+        print(f"List trash error: {str(e)}")
+        return jsonify({'error': 'Failed to list deleted files'}), 500
+
+def restore_file(file_id):
+    """
+    Restore a file from the trash
+
+    Args:
+        file_id: UUID of the file to restore
+
+    Returns:
+        200: {message, file_id}
+        404: File not in the trash or retention window expired
+        500: Server error
+    """
+    try:
+        user_id = g.current_user['id']
+        username = g.current_user['username']
+
+        restored = File.restore(file_id, user_id, TRASH_RETENTION_DAYS)
+        if not restored:
+            return jsonify({'error': 'File not found in trash or no longer restorable'}), 404
+
+        # The background job may already have moved the file into deleted/
+        storage_path = restored.get('storage_path')
+        if storage_path and storage_manager.is_in_deleted_folder(storage_path):
+            new_path = storage_manager.restore_from_deleted(storage_path, username)
+            if new_path:
+                File.update_storage_path(file_id, new_path)
+
+        try:
+            from utils.sync_events import emit_sync_event
+            emit_sync_event(
+                user_id=user_id,
+                event_type='file_restored',
+                payload={
+                    'file_id': file_id,
+                    'filename': restored['original_filename'],
+                    'size_bytes': restored['size_bytes']
+                }
+            )
+        except Exception as e:
+            print(f"Warning: Failed to emit sync event: {e}")
+
+        print(f"✅ File restored from trash: {file_id} (owner: {username})")
+
+        return jsonify({'message': 'File restored successfully', 'file_id': file_id}), 200
+
+    except Exception as e:
+        print(f"Restore error: {str(e)}")
+        return jsonify({'error': 'Failed to restore file'}), 500
@@ -44,8 +44,8 @@ def download_encrypted_file(file_id):
         permission = 'read'  # Default for owner
         
         if not is_owner:
-            # Get share permission
-            share = Share.find_by_file_and_grantee(file_id, user_id)
+            # Get share permission (the user's own share, else a group's)
+            share = Share.find_effective(file_id, user_id)
             if share:
                 access_type = 'shared'
                 permission = share.get('permission', 'full_access')
@@ -1,34 +1,26 @@
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context
+from database import db_manager, Share
 from middleware.auth import auth_required
 from middleware.quota import quota_required
+from middleware.etag import etag_by_change_version
 from models import File
 from storage_manager import storage_manager
+from utils.changes import get_changes_since
+from utils.fieldsets import columns_for, make_formatter, parse_fieldset, select_fields
+from utils.serialization import format_timestamp, stream_json_object
 import logging
-from datetime import timezone
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def format_timestamp(dt):
-    """Convert datetime to ISO format with UTC timezone"""
-    if dt is None:
-        return None
-    # If datetime is timezone-aware, convert to UTC
-    if hasattr(dt, 'astimezone'):
-        dt_utc = dt.astimezone(timezone.utc)
-        return dt_utc.isoformat()
-    # If timezone-naive, assume it's UTC and make it explicit
-    if hasattr(dt, 'replace'):
-        dt_utc = dt.replace(tzinfo=timezone.utc)
-        return dt_utc.isoformat()
-    # Fallback to string
-    return str(dt)
-
 # Import separated controllers
 from routes.uploadController import upload_encrypted_file as upload_handler
 from routes.downloadController import download_encrypted_file as download_handler
 from routes.deleteController import delete_file as delete_handler
+from routes.deleteController import list_trash as trash_handler
+from routes.deleteController import restore_file as restore_handler
+from routes.shares import format_grantee
 
 files_bp = Blueprint('files_v2', __name__)
 
@@ -90,12 +82,156 @@ def debug_list_files():
         'username': g.current_user['username']
     }), 200
 
+def query_flag(name):
+    """Boolean query parameter (1/true/yes)"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+# Top-level sections of the /list response, selectable with ?include=
+LIST_SECTIONS = ('files', 'owned_files', 'shared_files', 'owned_storage', 'storage_info', 'file_counts')
+TOTAL_SECTIONS = ('owned_storage', 'storage_info', 'file_counts')
+
+# Entry fields selectable with ?fields=: name -> (columns read, value from the row)
+OWNED_FIELDS = {
+    'id': (('id',), lambda r: str(r['id'])),
+    'original_filename': (('original_filename',), lambda r: r['original_filename']),
+    'content_type': (('content_type',), lambda r: r['content_type']),
+    'size_bytes': (('size_bytes',), lambda r: r['size_bytes']),
+    'algo': (('algo',), lambda r: r['algo']),
+    'created_at': (('created_at',), lambda r: format_timestamp(r['created_at'])),
+    'updated_at': (('updated_at',), lambda r: format_timestamp(r['updated_at'])),
+    'access_type': ((), lambda r: 'owner')
+}
+SHARED_FIELDS = {
+    'id': (('file_id',), lambda r: str(r['file_id'])),
+    'original_filename': (('original_filename',), lambda r: r['original_filename']),
+    'content_type': (('content_type',), lambda r: r['content_type']),
+    'size_bytes': (('size_bytes',), lambda r: r['size_bytes']),
+    'created_at': (('file_created_at',), lambda r: format_timestamp(r['file_created_at'])),
+    'shared_at': (('shared_at',), lambda r: format_timestamp(r['shared_at'])),
+    'access_type': ((), lambda r: 'shared'),
+    'permission': (('permission',), lambda r: r['permission']),
+    'owner': (('owner_id', 'owner_username', 'owner_name'), lambda r: {
+        'id': r['owner_id'],
+        'username': r['owner_username'],
+        'name': r['owner_name']
+    })
+}
+ENTRY_FIELDS = tuple(dict.fromkeys([*OWNED_FIELDS, *SHARED_FIELDS]))
+
+# Listing entries with every field
+format_owned_file = make_formatter(OWNED_FIELDS)
+format_shared_file = make_formatter(SHARED_FIELDS)
+
+def storage_info(owned_total_size):
+    """Quota figures for the listing (only owned files count toward quota)"""
+    quota_bytes = USER_QUOTA_BYTES
+    remaining_bytes = max(0, quota_bytes - owned_total_size)
+    usage_percentage = (owned_total_size / quota_bytes) * 100 if quota_bytes > 0 else 0
+    return {
+        'used_bytes': owned_total_size,
+        'used_mb': round(owned_total_size / (1024 * 1024), 2),
+        'quota_bytes': quota_bytes,
+        'quota_mb': round(quota_bytes / (1024 * 1024)),
+        'remaining_bytes': remaining_bytes,
+        'remaining_mb': round(remaining_bytes / (1024 * 1024), 2),
+        'usage_percentage': round(usage_percentage, 2)
+    }
+
+def total_section(name, totals):
+    """owned_storage, storage_info or file_counts from owned_count, owned_size and shared_count"""
+    if name == 'owned_storage':
+        return {'total_size': totals['owned_size']}
+    if name == 'storage_info':
+        return storage_info(totals['owned_size'])
+    return {
+        'owned': totals['owned_count'],
+        'shared_with_me': totals['shared_count'],
+        'total': totals['owned_count'] + totals['shared_count']
+    }
+
+class ListingPlan:
+    """What a /list request asked for, and the columns each query has to read"""
+    
+    def __init__(self, include, fields, compact):
+        self.sections = [name for name in LIST_SECTIONS if include is None or name in include]
+        if compact and 'owned_files' in self.sections:
+            self.sections.remove('owned_files')
+        self.want_owned = 'files' in self.sections or 'owned_files' in self.sections
+        self.want_shared = 'shared_files' in self.sections
+        self.want_totals = any(name in self.sections for name in TOTAL_SECTIONS)
+        
+        # Totals come from the listed rows when those lists are read anyway,
+        # otherwise from one aggregate query
+        self.aggregate_totals = (
+            (self.want_totals and not self.want_owned)
+            or ('file_counts' in self.sections and not self.want_shared)
+        )
+        
+        owned_fields = select_fields(OWNED_FIELDS, fields)
+        shared_fields = select_fields(SHARED_FIELDS, fields)
+        self.format_owned = make_formatter(OWNED_FIELDS, owned_fields)
+        self.format_shared = make_formatter(SHARED_FIELDS, shared_fields)
+        
+        self.owned_columns = columns_for(OWNED_FIELDS, owned_fields)
+        if self.want_totals and not self.aggregate_totals and 'size_bytes' not in self.owned_columns:
+            self.owned_columns.append('size_bytes')
+        self.shared_columns = columns_for(SHARED_FIELDS, shared_fields) or ['file_id']
+        self.owned_columns = self.owned_columns or ['id']
+
+def stream_user_files(user_id, plan):
+    """
+    Generate the /list response from server-side cursors, one entry at a time
+    Memory stays flat however many files the user has; all listing queries read one snapshot.
+    """
+    counts = File.listing_totals(user_id) if plan.aggregate_totals else {
+        'owned_count': 0, 'owned_size': 0, 'shared_count': 0
+    }
+    
+    with db_manager.read_snapshot() as conn:
+        # Rows are counted only when the totals don't come from the aggregate query
+        count_rows = plan.want_totals and not plan.aggregate_totals
+        
+        def owned_files(count):
+            for file_record in File.iter_by_owner(conn, user_id, plan.owned_columns):
+                if count:
+                    counts['owned_count'] += 1
+                    counts['owned_size'] += file_record['size_bytes']
+                yield plan.format_owned(file_record)
+        
+        def shared_files():
+            for shared_record in Share.iter_shared_with_user(conn, user_id, plan.shared_columns):
+                if count_rows:
+                    counts['shared_count'] += 1
+                yield plan.format_shared(shared_record)
+        
+        fields = []
+        owned_counted = False
+        for name in plan.sections:
+            if name == 'files' or name == 'owned_files':
+                # The first owned list is counted; a duplicate is read again rather than held in memory
+                fields.append((name, owned_files(count_rows and not owned_counted)))
+                owned_counted = True
+            elif name == 'shared_files':
+                fields.append((name, shared_files()))
+            else:
+                fields.append((name, lambda name=name: total_section(name, counts)))
+        yield from stream_json_object(fields)
+
 @files_bp.route('/list', methods=['GET'])
-@auth_required  
+@auth_required
+@etag_by_change_version
 def list_user_files():
     """
     List all files accessible by the authenticated user
     Includes both owned files and files shared with the user
+    
+    Query params:
+    - include: comma-separated sections to return (default: all of LIST_SECTIONS);
+      e.g. include=file_counts,storage_info runs a single aggregate query
+    - fields: comma-separated entry fields (default: all); only their columns are read
+    - compact: omit 'owned_files' (same list as 'files')
+    - stream: stream the response from the database with constant memory
+      (for very large vaults; counts and storage figures come last)
     """
     try:
         logger.info("DEBUG: list_user_files called")
@@ -106,81 +242,51 @@ def list_user_files():
         
         print(f"DEBUG: user_id = {user_id}, username = {username}")
         
-        # Get user's owned files from database
-        owned_files = File.find_by_owner(user_id)
+        try:
+            plan = ListingPlan(
+                parse_fieldset('include', LIST_SECTIONS),
+                parse_fieldset('fields', ENTRY_FIELDS),
+                query_flag('compact')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Get files shared with user
-        from database import Share
-        shared_files = Share.find_shared_with_user(user_id)
+        if query_flag('stream'):
+            # Errors after the first chunk can only cut the response short
+            return Response(
+                stream_with_context(stream_user_files(user_id, plan)),
+                status=200,
+                mimetype='application/json'
+            )
         
-        # Format owned files for response
-        formatted_owned_files = []
-        owned_total_size = 0
+        # Get user's owned files and files shared with user from database
+        owned_files = File.find_listing_by_owner(user_id, plan.owned_columns) if plan.want_owned else []
+        shared_files = Share.find_listing(user_id, 'received', plan.shared_columns) if plan.want_shared else []
         
-        if owned_files:
-            for file_record in owned_files:
-                file_info = {
-                    'id': str(file_record['id']),
-                    'original_filename': file_record['original_filename'],
-                    'content_type': file_record['content_type'],
-                    'size_bytes': file_record['size_bytes'],
-                    'algo': file_record['algo'],
-                    'created_at': format_timestamp(file_record['created_at']),
-                    'updated_at': format_timestamp(file_record['updated_at']),
-                    'access_type': 'owner'
-                }
-                formatted_owned_files.append(file_info)
-                owned_total_size += file_record['size_bytes']
-        
-        # Format shared files for response
-        formatted_shared_files = []
-        
-        if shared_files:
-            for shared_record in shared_files:
-                file_info = {
-                    'id': str(shared_record['file_id']),
-                    'original_filename': shared_record['original_filename'],
-                    'content_type': shared_record['content_type'],
-                    'size_bytes': shared_record['size_bytes'],
-                    'created_at': format_timestamp(shared_record['file_created_at']),
-                    'shared_at': format_timestamp(shared_record['shared_at']),
-                    'access_type': 'shared',
-                    'permission': shared_record['permission'],
-                    'owner': {
-                        'id': shared_record['owner_id'],
-                        'username': shared_record['owner_username'],
-                        'name': shared_record['owner_name']
-                    }
-                }
-                formatted_shared_files.append(file_info)
+        totals = None
+        if plan.aggregate_totals:
+            totals = File.listing_totals(user_id)
+        elif plan.want_totals:
+            totals = {
+                'owned_count': len(owned_files),
+                'owned_size': sum(file_record['size_bytes'] for file_record in owned_files),
+                'shared_count': len(shared_files)
+            }
         
-        # Calculate storage statistics (only owned files count toward quota)
-        quota_bytes = USER_QUOTA_BYTES
-        remaining_bytes = max(0, quota_bytes - owned_total_size)
-        usage_percentage = (owned_total_size / quota_bytes) * 100 if quota_bytes > 0 else 0
+        # Format files for response
+        formatted_owned_files = [plan.format_owned(file_record) for file_record in owned_files]
+        formatted_shared_files = [plan.format_shared(shared_record) for shared_record in shared_files]
         
-        response = {
-            'files': formatted_owned_files,  # For FilesPage compatibility
-            'owned_files': formatted_owned_files,  # For Dashboard compatibility
-            'shared_files': formatted_shared_files,
-            'owned_storage': {
-                'total_size': owned_total_size
-            },
-            'storage_info': {
-                'used_bytes': owned_total_size,
-                'used_mb': round(owned_total_size / (1024 * 1024), 2),
-                'quota_bytes': quota_bytes,
-                'quota_mb': round(quota_bytes / (1024 * 1024)),
-                'remaining_bytes': remaining_bytes,
-                'remaining_mb': round(remaining_bytes / (1024 * 1024), 2),
-                'usage_percentage': round(usage_percentage, 2)
-            },
-            'file_counts': {
-                'owned': len(formatted_owned_files),
-                'shared_with_me': len(formatted_shared_files),
-                'total': len(formatted_owned_files) + len(formatted_shared_files)
-            }
-        }
+        response = {}
+        for name in plan.sections:
+            if name == 'files':
+                response['files'] = formatted_owned_files  # For FilesPage compatibility
+            elif name == 'owned_files':
+                response['owned_files'] = formatted_owned_files  # For Dashboard compatibility
+            elif name == 'shared_files':
+                response['shared_files'] = formatted_shared_files
+            else:
+                response[name] = total_section(name, totals)
         
         print(f"DEBUG: Returning {len(formatted_owned_files)} owned + {len(formatted_shared_files)} shared files for user {username}")
         return jsonify(response), 200
@@ -214,6 +320,7 @@ def get_user_quota2():
 
 @files_bp.route('/quota', methods=['GET'])
 @auth_required
+@etag_by_change_version
 def get_user_quota():
     """Get current user's storage quota and usage"""
     try:
@@ -239,6 +346,97 @@ def get_user_quota():
     except Exception as e:
         return jsonify({'error': 'Failed to get quota information'}), 500
 
+@files_bp.route('/changes', methods=['GET'])
+@auth_required
+def list_file_changes():
+    """
+    Files and shares that changed since a change version
+    
+    Query params:
+    - since: version from the previous response (0 or omitted: everything)
+    
+    Items have the same shape as /list and /api/shared; deleted files and
+    revoked shares are listed by id under 'deleted'. When 'resync' is true the
+    client must reload its listings and continue from the returned version.
+    """
+    try:
+        user_id = g.current_user['id']
+        since = request.args.get('since', 0, type=int)
+        if since < 0:
+            return jsonify({'error': 'since must be a non-negative version'}), 400
+        
+        changes = get_changes_since(user_id, since)
+        if changes['resync']:
+            return jsonify({'version': changes['version'], 'since': since, 'resync': True}), 200
+        
+        files = []
+        shared_files = []
+        sent_shares = []
+        deleted = {'files': [], 'shared_files': [], 'sent_shares': []}
+        
+        for f in changes['files']:
+            if f['status'] != 'active':
+                deleted['files'].append(str(f['id']))
+                continue
+            files.append(format_owned_file(f))
+        
+        for s in changes['shared_files']:
+            if s['status'] != 'active':
+                deleted['shared_files'].append(str(s['file_id']))
+                continue
+            shared_files.append(format_shared_file(s))
+        
+        for s in changes['sent_shares']:
+            if s['status'] != 'active':
+                deleted['sent_shares'].append(str(s['share_id']))
+                continue
+            sent_shares.append({
+                'share_id': str(s['share_id']),
+                'file_id': str(s['file_id']),
+                'filename': s['original_filename'],
+                'permission': s['permission'],
+                'shared_at': format_timestamp(s['shared_at']),
+                'shared_with': format_grantee(s)
+            })
+        
+        for t in changes['tombstones']:
+            if t['kind'] == 'file':
+                deleted['files'].append(t['file_id'])
+            else:
+                # The same tombstone kind serves both sides of a share
+                deleted['shared_files'].append(t['file_id'])
+                deleted['sent_shares'].append(t['share_id'])
+        
+        # A file can be tombstoned and recreated (restored) within one delta - the live row wins
+        live_files = {f['id'] for f in files}
+        live_shared = {f['id'] for f in shared_files}
+        live_sent = {s['share_id'] for s in sent_shares}
+        deleted = {
+            'files': sorted(set(deleted['files']) - live_files),
+            'shared_files': sorted(set(deleted['shared_files']) - live_shared),
+            'sent_shares': sorted(set(deleted['sent_shares']) - live_sent)
+        }
+        
+        return jsonify({
+            'version': changes['version'],
+            'since': since,
+            'resync': False,
+            'files': files,
+            'shared_files': shared_files,
+            'sent_shares': sent_shares,
+            'deleted': deleted
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"List changes error: {e}")
+        return jsonify({'error': 'Failed to list changes', 'details': str(e)}), 500
+
+@files_bp.route('/trash', methods=['GET'])
+@auth_required
+def list_trash():
+    """Trash listing - delegates to deleteController"""
+    return trash_handler()
+
 # Parameterized routes come after named routes
 @files_bp.route('/', methods=['POST'])
 @auth_required
@@ -264,4 +462,10 @@ def download_encrypted_file_alias(file_id):
 @auth_required
 def delete_file(file_id):
     """Delete endpoint - delegates to deleteController"""
-    return delete_handler(file_id)
\ No newline at end of file
+    return delete_handler(file_id)
+
+@files_bp.route('/<file_id>/restore', methods=['POST'])
+@auth_required
+def restore_file(file_id):
+    """Restore endpoint - delegates to deleteController"""
+    return restore_handler(file_id)
@@ -0,0 +1,237 @@
+"""
+Group Routes
+Groups let an owner share files with many users as one grantee: sharing a file
+with a group writes one share row, and members reach it through their
+membership, so adding a member later is one row instead of one per file.
+"""
+from flask import Blueprint, request, jsonify, g
+from database import Group, Share
+from middleware.auth import auth_required
+from routes.bulkController import SHARE_PERMISSIONS
+from utils.serialization import format_timestamp
+from utils.sharing import emit_share_events
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+groups_bp = Blueprint('groups', __name__)
+
+def validate_group_name(name):
+    """Validate group name"""
+    return isinstance(name, str) and 0 < len(name.strip()) <= 100
+
+def format_group(group):
+    """Convert a groups row into the API shape"""
+    return {
+        'id': group['id'],
+        'name': group['name'],
+        'member_count': group.get('member_count', 0),
+        'created_at': format_timestamp(group['created_at'])
+    }
+
+def parse_usernames(data):
+    """Usernames of a request body (a list, or a single string)"""
+    usernames = data.get('usernames', [])
+    if isinstance(usernames, str):
+        usernames = [usernames]
+    if not isinstance(usernames, list):
+        raise ValueError('usernames must be an array')
+    return list(dict.fromkeys(str(name).strip() for name in usernames if str(name).strip()))
+
+@groups_bp.route('/api/groups', methods=['GET'])
+@auth_required
+def list_groups():
+    """List the current user's groups with their member counts"""
+    try:
+        groups = Group.find_by_owner(g.current_user['id'])
+        return jsonify({'groups': [format_group(group) for group in groups]}), 200
+    except Exception as e:
+        logger.error(f"List groups error: {e}")
+        return jsonify({'error': 'Failed to list groups', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups', methods=['POST'])
+@auth_required
+def create_group():
+    """
+    Create a group, optionally with its first members
+
+    Request body:
+    {
+        "name": "Design team",
+        "usernames": ["alice", "bob"]   // Optional
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        name = data.get('name')
+        if not validate_group_name(name):
+            return jsonify({'error': 'name must be 1-100 characters'}), 400
+        try:
+            usernames = parse_usernames(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        group = Group.create(g.current_user['id'], name.strip())
+        if not group:
+            return jsonify({'error': f'You already have a group named {name.strip()}'}), 409
+
+        added = Group.add_members(group['id'], g.current_user['id'], usernames) if usernames else []
+        group['member_count'] = len(added)
+        return jsonify({
+            'group': format_group(group),
+            'added': [member['username'] for member in added]
+        }), 201
+
+    except Exception as e:
+        logger.error(f"Create group error: {e}")
+        return jsonify({'error': 'Failed to create group', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups/<int:group_id>', methods=['GET'])
+@auth_required
+def get_group(group_id):
+    """A group of the current user with its members"""
+    try:
+        group = Group.find_owned(group_id, g.current_user['id'])
+        if not group:
+            return jsonify({'error': 'Group not found'}), 404
+
+        members = Group.find_members(group_id)
+        return jsonify({
+            'group': format_group(group),
+            'members': [{
+                'user_id': member['user_id'],
+                'username': member['username'],
+                'name': member['name'],
+                'added_at': format_timestamp(member['added_at'])
+            } for member in members]
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Get group error: {e}")
+        return jsonify({'error': 'Failed to get group', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups/<int:group_id>', methods=['DELETE'])
+@auth_required
+def delete_group(group_id):
+    """Delete a group; its members lose access to the files shared with it"""
+    try:
+        deleted = Group.delete(group_id, g.current_user['id'])
+        if not deleted:
+            return jsonify({'error': 'Group not found'}), 404
+        return jsonify({'message': 'Group deleted', 'group_id': group_id}), 200
+    except Exception as e:
+        logger.error(f"Delete group error: {e}")
+        return jsonify({'error': 'Failed to delete group', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups/<int:group_id>/members', methods=['POST'])
+@auth_required
+def add_group_members(group_id):
+    """
+    Add users to a group: one membership row each, and they gain every file
+    already shared with the group
+
+    Request body:
+    {
+        "usernames": ["carol"]
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        try:
+            usernames = parse_usernames(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not usernames:
+            return jsonify({'error': 'At least one username is required'}), 400
+
+        if not Group.find_owned(group_id, g.current_user['id']):
+            return jsonify({'error': 'Group not found'}), 404
+
+        added = Group.add_members(group_id, g.current_user['id'], usernames)
+        added_names = {member['username'] for member in added}
+        return jsonify({
+            'group_id': group_id,
+            'added': [member['username'] for member in added],
+            # Unknown or inactive users, the owner, and existing members
+            'not_added': [name for name in usernames if name not in added_names]
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Add group members error: {e}")
+        return jsonify({'error': 'Failed to add group members', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups/<int:group_id>/members/<int:user_id>', methods=['DELETE'])
+@auth_required
+def remove_group_member(group_id, user_id):
+    """Remove a user from a group"""
+    try:
+        if not Group.find_owned(group_id, g.current_user['id']):
+            return jsonify({'error': 'Group not found'}), 404
+
+        removed = Group.remove_member(group_id, user_id)
+        if not removed:
+            return jsonify({'error': 'User is not a member of this group'}), 404
+        return jsonify({'message': 'Member removed', 'group_id': group_id, 'user_id': user_id}), 200
+
+    except Exception as e:
+        logger.error(f"Remove group member error: {e}")
+        return jsonify({'error': 'Failed to remove group member', 'details': str(e)}), 500
+
+@groups_bp.route('/api/groups/<int:group_id>/share', methods=['POST'])
+@auth_required
+def share_with_group(group_id):
+    """
+    Share files with a group: one share row per file, whatever the group's size
+
+    Request body:
+    {
+        "file_ids": ["uuid1", "uuid2"],
+        "permission": "read"   // One of SHARE_PERMISSIONS
+    }
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        file_ids = data.get('file_ids', [])
+        permission = data.get('permission', 'read')
+        if not isinstance(file_ids, list) or len(file_ids) == 0:
+            return jsonify({'error': 'file_ids must be a non-empty array'}), 400
+        if permission not in SHARE_PERMISSIONS:
+            return jsonify({'error': f"Invalid permission level. Must be one of: {', '.join(SHARE_PERMISSIONS)}"}), 400
+
+        if not Group.find_owned(group_id, g.current_user['id']):
+            return jsonify({'error': 'Group not found'}), 404
+
+        requested = list(dict.fromkeys(str(f) for f in file_ids))
+        valid_ids = []
+        for file_id in requested:
+            try:
+                valid_ids.append(str(uuid.UUID(file_id)))
+            except ValueError:
+                pass  # reported as failed below
+
+        # One multi-row upsert, one row per file
+        shares = Share.bulk_upsert_group(g.current_user['id'], valid_ids, group_id, permission) if valid_ids else []
+        emit_share_events(g.current_user['id'], shares, permission)
+
+        shared_ids = {str(row['file_id']) for row in shares}
+        shares_created = sum(1 for row in shares if row['created'])
+        return jsonify({
+            'group_id': group_id,
+            'shares_created': shares_created,
+            'shares_updated': len(shares) - shares_created,
+            # Files that don't exist, aren't yours, or are in the trash
+            'failed': [file_id for file_id in requested if file_id not in shared_ids]
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Share with group error: {e}")
+        return jsonify({'error': 'Failed to share with group', 'details': str(e)}), 500
@@ -1,5 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from datetime import datetime, timezone
+import hmac
+import os
 
 health_bp = Blueprint('health', __name__)
 
@@ -34,6 +36,31 @@ def cors_test():
         'method': request.method
     }), 200
 
+# Callers allowed to read /metrics without METRICS_TOKEN
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+def metrics_authorized():
+    """Bearer METRICS_TOKEN when configured, otherwise requests from this host only"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        header = request.headers.get('Authorization', '')
+        return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+    return request.remote_addr in LOCAL_ADDRESSES
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics_snapshot():
+    """Expose in-process counters and gauges for this worker (job internals: not public)"""
+    from utils.metrics import metrics
+    
+    if not metrics_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    
+    return jsonify({
+        'pid': os.getpid(),
+        'timestamp': utcnow().isoformat(),
+        **metrics.snapshot()
+    }), 200
+
 @health_bp.route('/system-status', methods=['GET', 'OPTIONS'])
 def system_status():
     """Get comprehensive system status for all services"""
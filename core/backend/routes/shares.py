@@ -7,26 +7,15 @@ from flask import Blueprint, request, jsonify, g
 import re
 from database import User, File, Share, check_access
 from middleware.auth import auth_required
-from datetime import datetime, timezone
+from middleware.etag import etag_by_change_version
+from utils.fieldsets import columns_for, make_formatter, parse_fieldset, select_fields
+from utils.serialization import format_timestamp
+from utils.sharing import emit_share_events, share_files
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-def format_timestamp(dt):
-    """Convert datetime to ISO format with UTC timezone"""
-    if dt is None:
-        return None
-    # If datetime is timezone-aware, convert to UTC
-    if hasattr(dt, 'astimezone'):
-        dt_utc = dt.astimezone(timezone.utc)
-        return dt_utc.isoformat()
-    # If timezone-naive, assume it's UTC and make it explicit
-    if hasattr(dt, 'replace'):
-        dt_utc = dt.replace(tzinfo=timezone.utc)
-        return dt_utc.isoformat()
-    # Fallback to string
-    return str(dt)
-
 shares_bp = Blueprint('shares', __name__)
 
 def validate_username(username):
@@ -39,8 +28,7 @@ def validate_username(username):
 
 def validate_permission(permission):
     """Validate permission level"""
-    valid_permissions = ['full_access', 'view', 'download']
-    return permission in valid_permissions
+    return permission in Share.PERMISSIONS
 
 @shares_bp.route('/api/files/<file_id>/share', methods=['POST'])
 @auth_required
@@ -89,113 +77,46 @@ def share_file(file_id):
             return jsonify({'error': 'At least one file ID is required'}), 400
         
         if not validate_permission(permission):
-            return jsonify({'error': f'Invalid permission. Must be one of: read, view, download'}), 400
+            return jsonify({'error': f"Invalid permission. Must be one of: {', '.join(Share.PERMISSIONS)}"}), 400
         
         # Validate all usernames
         for username in usernames:
             if not validate_username(username.strip()):
                 return jsonify({'error': f'Invalid username format: {username}'}), 400
         
+        # One multi-row upsert for every file x user pair
+        outcome = share_files(g.current_user['id'], file_ids, usernames, permission)
+        
         results = {
             'created': [],
             'updated': [],
             'failed': [],
             'skipped': []
         }
-        
-        # Process each file
-        for fid in file_ids:
-            # Check if file exists and current user is the owner
-            file = File.find_by_id(fid)
-            if not file or file['owner_id'] != g.current_user['id']:
+        for row in outcome['shares']:
+            results['created' if row['created'] else 'updated'].append({
+                'file_id': str(row['file_id']),
+                'filename': row['original_filename'],
+                'username': row['grantee_username'],
+                'grantee_user_id': row['grantee_user_id'],
+                'permission': row['permission']
+            })
+        for item in outcome['failed_files']:
+            results['failed'].append({
+                'file_id': item['file_id'],
+                'error': item['reason']
+            })
+        for item in outcome['failed_usernames']:
+            if item['reason'] == 'Cannot share with yourself':
+                results['skipped'].append(item)
+            else:
                 results['failed'].append({
-                    'file_id': fid,
-                    'error': 'File not found or you are not the owner'
+                    'username': item['username'],
+                    'error': item['reason']
                 })
-                continue
-            
-            # Process each username
-            for username in usernames:
-                username = username.strip()
-                
-                # Find grantee user by username
-                grantee_user = User.find_by_username(username)
-                if not grantee_user:
-                    results['failed'].append({
-                        'file_id': fid,
-                        'username': username,
-                        'error': 'User not found'
-                    })
-                    continue
-                
-                # Prevent sharing with self
-                if grantee_user['id'] == g.current_user['id']:
-                    results['skipped'].append({
-                        'file_id': fid,
-                        'username': username,
-                        'reason': 'Cannot share with yourself'
-                    })
-                    continue
-                
-                # Check if file is already shared with this user
-                existing_share = Share.find_by_file_and_grantee(fid, grantee_user['id'])
-                if existing_share:
-                    # Update handled by ON CONFLICT in Share.create
-                    share = Share.create(fid, grantee_user['id'], permission)
-                    if share:
-                        results['updated'].append({
-                            'file_id': fid,
-                            'filename': file['original_filename'],
-                            'username': username,
-                            'grantee_user_id': grantee_user['id'],
-                            'permission': permission
-                        })
-                    else:
-                        results['failed'].append({
-                            'file_id': fid,
-                            'username': username,
-                            'error': 'Failed to update share'
-                        })
-                else:
-                    # Create new share
-                    share = Share.create(fid, grantee_user['id'], permission)
-                    if share:
-                        results['created'].append({
-                            'file_id': fid,
-                            'filename': file['original_filename'],
-                            'username': username,
-                            'grantee_user_id': grantee_user['id'],
-                            'permission': permission
-                        })
-                    else:
-                        results['failed'].append({
-                            'file_id': fid,
-                            'username': username,
-                            'error': 'Failed to create share'
-                        })
-        
-        # Emit sync events for file sharing
-        if len(results['created']) > 0 or len(results['updated']) > 0:
-            try:
-                from utils.sync_events import emit_sync_event
-                # Get all unique grantee user IDs
-                grantee_user_ids = list(set(
-                    [item['grantee_user_id'] for item in results['created']] +
-                    [item['grantee_user_id'] for item in results['updated']]
-                ))
-                
-                # Emit event to owner
-                emit_sync_event(
-                    user_id=g.current_user['id'],
-                    event_type='file_shared',
-                    payload={
-                        'file_ids': file_ids,
-                        'shared_with_user_ids': grantee_user_ids,
-                        'permission': permission
-                    }
-                )
-            except Exception as e:
-                logger.warning(f"Failed to emit file_shared event: {e}")
+        
+        # Emit sync events for file sharing (owner and each grantee)
+        emit_share_events(g.current_user['id'], outcome['shares'], permission)
         
         # Build response message
         total_success = len(results['created']) + len(results['updated'])
@@ -289,8 +210,44 @@ def revoke_file_share(file_id, grantee_user_id):
         return jsonify({'error': 'Share revocation failed', 'details': str(e)}), 500
 
 
+# Sections of the /api/shared response, selectable with ?include= ('view' is always returned)
+SHARED_LIST_SECTIONS = ('shared_files', 'pagination')
+
+# Entry fields selectable with ?fields=: name -> (columns read, value from the row)
+SHARE_ENTRY_FIELDS = {
+    'share_id': (('share_id',), lambda r: r['share_id']),
+    'file_id': (('file_id',), lambda r: r['file_id']),
+    'filename': (('original_filename',), lambda r: r['original_filename']),
+    'size_bytes': (('size_bytes',), lambda r: r['size_bytes']),
+    'content_type': (('content_type',), lambda r: r['content_type']),
+    'permission': (('permission',), lambda r: r['permission']),
+    'shared_at': (('shared_at',), lambda r: format_timestamp(r['shared_at'])),
+    'file_created_at': (('file_created_at',), lambda r: format_timestamp(r['file_created_at']))
+}
+def format_grantee(r):
+    """The user or group a share was made with"""
+    if r.get('grantee_group_id') is not None:
+        return {'group_id': r['grantee_group_id'], 'name': r['grantee_group_name']}
+    return {'user_id': r['grantee_user_id'], 'username': r['grantee_username'], 'name': r['grantee_name']}
+
+SHARE_VIEW_FIELDS = {
+    # For sent view, show who we shared with (a user or a group)
+    'sent': {**SHARE_ENTRY_FIELDS, 'shared_with': (
+        ('grantee_user_id', 'grantee_username', 'grantee_name', 'grantee_group_id', 'grantee_group_name'),
+        format_grantee
+    )},
+    # For received view, show who shared with us
+    'received': {**SHARE_ENTRY_FIELDS, 'shared_by': (('owner_id', 'owner_username', 'owner_name'), lambda r: {
+        'user_id': r['owner_id'],
+        'username': r['owner_username'],
+        'name': r['owner_name']
+    })}
+}
+SHARE_FIELD_NAMES = tuple(dict.fromkeys([*SHARE_VIEW_FIELDS['received'], *SHARE_VIEW_FIELDS['sent']]))
+
 @shares_bp.route('/api/shared', methods=['GET'])
 @auth_required
+@etag_by_change_version
 def list_shared_files():
     """
     List files shared with or by the current user
@@ -298,74 +255,50 @@ def list_shared_files():
     - view: 'received' (default) or 'sent'
     - page: page number (default: 1)
     - per_page: items per page (default: 20, max: 100)
+    - include: comma-separated sections (shared_files, pagination; default: both)
+    - fields: comma-separated entry fields (default: all); only their columns are read
     """
     try:
         # Get optional query parameters
         view = request.args.get('view', 'received').lower()
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        if view != 'sent':
+            # Files shared WITH current user (as grantee) - default
+            view = 'received'
         
-        if view == 'sent':
-            # Files shared BY current user (as owner)
-            all_shares = Share.find_by_owner(g.current_user['id'])
-        else:
-            # Files shared WITH current user (as grantee) - default  
-            all_shares = Share.find_shared_with_user(g.current_user['id'])
-        
-        # Manual pagination
-        total = len(all_shares)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        shares_page = all_shares[start_idx:end_idx]
-        
-        # Build response with file and user details
-        shares_list = []
-        for share in shares_page:
-            share_info = {
-                'share_id': share['share_id'],
-                'file_id': share['file_id'],
-                'filename': share['original_filename'],
-                'size_bytes': share['size_bytes'],
-                'content_type': share['content_type'],
-                'permission': share['permission'],
-                'shared_at': format_timestamp(share['shared_at']),
-                'file_created_at': format_timestamp(share['file_created_at'])
-            }
-            
-            if view == 'sent':
-                # For sent view, show who we shared with
-                share_info['shared_with'] = {
-                    'user_id': share['grantee_user_id'],
-                    'username': share['grantee_username'],
-                    'name': share['grantee_name']
-                }
-            else:
-                # For received view, show who shared with us
-                share_info['shared_by'] = {
-                    'user_id': share['owner_id'],
-                    'username': share['owner_username'],
-                    'name': share['owner_name']
-                }
-            
-            shares_list.append(share_info)
-        
-        # Calculate pagination info
-        total_pages = (total + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
+        spec = SHARE_VIEW_FIELDS[view]
+        try:
+            include = parse_fieldset('include', SHARED_LIST_SECTIONS) or SHARED_LIST_SECTIONS
+            fields = select_fields(spec, parse_fieldset('fields', SHARE_FIELD_NAMES))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        response = {'view': view}
+        
+        if 'shared_files' in include:
+            # Paginate in SQL, reading only the requested columns
+            format_share = make_formatter(spec, fields)
+            shares_page = Share.find_listing(
+                g.current_user['id'], view, columns_for(spec, fields) or ['share_id'],
+                limit=per_page, offset=max(0, (page - 1) * per_page)
+            )
+            response['shared_files'] = [format_share(share) for share in shares_page]
         
-        return jsonify({
-            'view': view,
-            'shared_files': shares_list,
-            'pagination': {
+        if 'pagination' in include:
+            # Calculate pagination info
+            total = Share.count_listing(g.current_user['id'], view)
+            total_pages = (total + per_page - 1) // per_page
+            response['pagination'] = {
                 'page': page,
                 'per_page': per_page,
                 'total': total,
                 'pages': total_pages,
-                'has_next': has_next,
-                'has_prev': has_prev
+                'has_next': page < total_pages,
+                'has_prev': page > 1
             }
-        }), 200
+        
+        return jsonify(response), 200
         
     except Exception as e:
         logger.error(f"List shared files error: {e}")
@@ -391,8 +324,9 @@ def list_file_shares(file_id):
                 'share_id': share['share_id'],
                 'user_id': share['grantee_user_id'],
                 'username': share['grantee_username'],
-                'name': share['grantee_name'],
+                'name': share['grantee_name'] or share['grantee_group_name'],
                 'email': share['grantee_email'],
+                'group_id': share['grantee_group_id'],
                 'permission': share['permission'],
                 'shared_at': format_timestamp(share['shared_at'])
             })
@@ -414,18 +348,19 @@ def list_file_shares(file_id):
 def get_sharing_stats():
     """Get sharing statistics for the current user"""
     try:
-        # Files shared by current user (as owner)
-        files_shared_by_user = len(Share.find_by_owner(g.current_user['id']))
+        # Shares of the current user's files (with users and with groups)
+        shares_sent = Share.find_by_owner(g.current_user['id'])
+        files_shared_by_user = len(shares_sent)
         
-        # Files shared with current user (as grantee)
-        files_shared_with_user = len(Share.find_shared_with_user(g.current_user['id']))
+        # Files shared with current user (directly or through a group)
+        shares_received = Share.find_shared_with_user(g.current_user['id'])
+        files_shared_with_user = len(shares_received)
         
-        # Count unique users - sent
-        shares_sent = Share.find_by_owner(g.current_user['id'])
-        unique_grantees = len(set(share['grantee_user_id'] for share in shares_sent))
+        # Count unique grantees - sent
+        unique_grantees = len(set(share['grantee_user_id'] for share in shares_sent if share['grantee_user_id'] is not None))
+        unique_groups = len(set(share['grantee_group_id'] for share in shares_sent if share['grantee_group_id'] is not None))
         
         # Count unique users - received
-        shares_received = Share.find_shared_with_user(g.current_user['id'])
         unique_sharers = len(set(share['owner_id'] for share in shares_received))
         
         return jsonify({
@@ -433,7 +368,8 @@ def get_sharing_stats():
                 'files_you_shared': files_shared_by_user,
                 'files_shared_with_you': files_shared_with_user,
                 'users_who_shared_with_you': unique_sharers,
-                'users_you_shared_with': unique_grantees
+                'users_you_shared_with': unique_grantees,
+                'groups_you_shared_with': unique_groups
             }
         }), 200
         
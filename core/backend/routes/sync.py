@@ -6,7 +6,7 @@ Includes polling fallback when WebSocket is not available
 from flask import Blueprint, request, jsonify
 from middleware.auth import auth_required
 from flask import g
-from utils.sync_events import get_sync_events_since
+from utils.sync_events import get_sync_events_since, get_sync_events_after
 from datetime import datetime, timezone
 import logging
 
@@ -26,9 +26,28 @@ def get_updates():
     Used as polling fallback when WebSocket is unavailable
     
     Query params:
-    - since: ISO timestamp (required)
+    - since: ISO timestamp (required unless last_seq is given)
+    - last_seq: sequence number of the last processed event
     """
     try:
+        last_seq_param = request.args.get('last_seq')
+        if last_seq_param is not None:
+            try:
+                last_seq = int(last_seq_param)
+            except ValueError:
+                return jsonify({'error': 'Invalid last_seq. Must be an integer.'}), 400
+            
+            events, resync_reason = get_sync_events_after(g.current_user['id'], last_seq=last_seq)
+            return jsonify({
+                'events': events,
+                'count': len(events),
+                # Where the next poll resumes: the newest event returned, else the caller's position
+                'last_seq': events[-1]['seq'] if events else last_seq,
+                'resync_required': resync_reason is not None,
+                'resync_reason': resync_reason,
+                'server_time': utcnow().isoformat()
+            }), 200
+        
         since_param = request.args.get('since')
         
         if not since_param:
@@ -83,16 +83,15 @@ def upload_encrypted_file():
         
         # Quota is enforced by middleware; continue
         
-        # Read encrypted file content (ciphertext)
-        ciphertext_buffer = file.read()
-        
         # Generate unique file ID and storage path using username
         file_id = str(uuid.uuid4())
         storage_path = storage_manager.generate_storage_path(username, original_filename)
         
-        # Save encrypted file to local filesystem
-        if not storage_manager.save_encrypted_file(ciphertext_buffer, storage_path):
+        # Stream encrypted file (ciphertext) to local filesystem, hashing it on the way
+        saved = storage_manager.save_encrypted_stream(file.stream, storage_path)
+        if not saved:
             return jsonify({'error': 'Failed to save encrypted file'}), 500
+        file_size, checksum_sha256 = saved
         
         # Create file record in database using direct PostgreSQL
         new_file = File.create(
@@ -102,7 +101,8 @@ def upload_encrypted_file():
             content_type=file.content_type or 'application/octet-stream',
             algo=algo,
             iv=iv_base64,
-            storage_path=storage_path  # Store local filesystem path
+            storage_path=storage_path,  # Store local filesystem path
+            checksum_sha256=checksum_sha256
         )
         
         if not new_file:
@@ -111,11 +111,27 @@ def upload_encrypted_file():
         # Log safe metadata only (no plaintext or keys)
         print(f"✅ Encrypted file stored locally: {new_file['id']} (size: {file_size} bytes, path: {storage_path})")
         
+        # Emit sync event for real-time dashboard update
+        try:
+            from utils.sync_events import emit_sync_event
+            emit_sync_event(
+                user_id=user_id,
+                event_type='file_uploaded',
+                payload={
+                    'file_id': str(new_file['id']),
+                    'filename': new_file['original_filename'],
+                    'size_bytes': new_file['size_bytes']
+                }
+            )
+        except Exception as e:
+            print(f"Warning: Failed to emit sync event: {e}")
+        
         return jsonify({
             'message': 'File uploaded successfully',
             'id': new_file['id'],
             'original_filename': new_file['original_filename'],
             'size_bytes': new_file['size_bytes'],
+            'checksum_sha256': new_file['checksum_sha256'],
             'created_at': new_file['created_at'].isoformat()
         }), 201
         
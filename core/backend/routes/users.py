@@ -2,14 +2,19 @@
 User Profile Management Routes
 Handles user profile updates, photo uploads, and account deletion
 """
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import os
 import logging
 from werkzeug.utils import secure_filename
-from PIL import Image
-import io
+from PIL import UnidentifiedImageError
 from database import db_manager, User
+from utils.images import (
+    PHOTO_FORMATS, PHOTO_SIZES, PhotoQueueFull, content_version, pick_size, process_photo,
+    remove_variants, save_variants, variant_filename
+)
+from utils.photo_cache import photo_cache, current_version, invalidate_photo, photo_url as versioned_photo_url
+from jobs.account_deletion import request_account_deletion, get_account_deletion, format_deletion
 
 logger = logging.getLogger(__name__)
 
@@ -34,31 +39,6 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def optimize_image(image_data, max_size=(400, 400)):
-    """Optimize and resize profile photo"""
-    try:
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Convert RGBA to RGB if necessary
-        if image.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-        
-        # Resize maintaining aspect ratio
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        # Save to bytes
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        return output.read()
-    except Exception as e:
-        logger.error(f"Error optimizing image: {e}")
-        raise
-
 @users_bp.route('/api/users/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
@@ -217,23 +197,20 @@ def upload_profile_photo():
         if file_size > MAX_FILE_SIZE:
             return jsonify({'message': 'File too large. Maximum size: 5MB'}), 400
         
-        # Read and optimize image
+        # Render every size and format in the photo process pool
         image_data = file.read()
-        optimized_data = optimize_image(image_data)
+        try:
+            variants = process_photo(image_data)
+        except PhotoQueueFull as e:
+            return jsonify({'message': str(e)}), 503
+        except UnidentifiedImageError:
+            return jsonify({'message': 'File is not a readable image'}), 400
         
-        # Create profile photos directory if it doesn't exist
         profile_dir = os.path.join(os.path.dirname(__file__), '..', PROFILE_PHOTO_DIR)
-        os.makedirs(profile_dir, exist_ok=True)
+        save_variants(profile_dir, user_id, variants)
         
-        # Save file with user_id as filename
-        filename = f"user_{user_id}.jpg"
-        filepath = os.path.join(profile_dir, filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(optimized_data)
-        
-        # Update user record with photo path
-        photo_url = f"/api/users/profile/photo/{user_id}"
+        # Update user record with photo path; the content version makes the URL cacheable forever
+        photo_url = versioned_photo_url(user_id, content_version(variants))
         query = """
         UPDATE users 
         SET profile_photo = %s, updated_at = %s
@@ -246,6 +223,7 @@ def upload_profile_photo():
         if not result:
             return jsonify({'message': 'Failed to update profile photo'}), 500
         
+        invalidate_photo(user_id)
         logger.info(f"Profile photo uploaded for user {user_id}")
         
         return jsonify({
@@ -257,18 +235,64 @@ def upload_profile_photo():
         logger.error(f"Error uploading profile photo: {e}")
         return jsonify({'message': 'Failed to upload photo', 'error': str(e)}), 500
 
+def load_photo_variant(user_id, version, size, webp):
+    """Read the best stored variant of a photo from disk into a cache entry (None if missing)"""
+    profile_dir = os.path.join(os.path.dirname(__file__), '..', PROFILE_PHOTO_DIR)
+    
+    # WebP when the client accepts it, JPEG otherwise
+    candidates = [(fmt, variant_filename(user_id, size, fmt)) for fmt in (['webp', 'jpeg'] if webp else ['jpeg'])]
+    # Photos uploaded before variants existed
+    candidates.append(('jpeg', f"user_{user_id}.jpg"))
+    
+    for fmt, filename in candidates:
+        try:
+            with open(os.path.join(profile_dir, filename), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            continue
+        return {
+            'version': version,
+            'data': data,
+            'mimetype': PHOTO_FORMATS[fmt][2],
+            'etag': f"{version}-{size}-{fmt}"
+        }
+    return None
+
 @users_bp.route('/api/users/profile/photo/<int:user_id>', methods=['GET'])
-def get_profile_photo(user_id):
-    """Get user profile photo"""
+@users_bp.route('/api/users/profile/photo/<int:user_id>/<version>', methods=['GET'])
+def get_profile_photo(user_id, version=None):
+    """
+    Get user profile photo
+    Versioned URLs (as stored in users.profile_photo) are cacheable forever;
+    unversioned ones must be revalidated with If-None-Match
+    
+    Query params:
+        size: Displayed size in pixels; the smallest variant at least this large is served
+    """
     try:
-        profile_dir = os.path.join(os.path.dirname(__file__), '..', PROFILE_PHOTO_DIR)
-        filename = f"user_{user_id}.jpg"
-        filepath = os.path.join(profile_dir, filename)
-        
-        if not os.path.exists(filepath):
+        current = current_version(user_id, expected=version)
+        if current is None:
             return jsonify({'message': 'Photo not found'}), 404
         
-        return send_file(filepath, mimetype='image/jpeg')
+        size = pick_size(request.args.get('size', PHOTO_SIZES[-1], type=int))
+        webp = bool(request.accept_mimetypes['image/webp'])
+        
+        key = (user_id, size, webp)
+        entry = photo_cache.get(key)
+        if entry is None or entry['version'] != current:
+            entry = load_photo_variant(user_id, current, size, webp)
+            if entry is None:
+                return jsonify({'message': 'Photo not found'}), 404
+            photo_cache.put(key, entry)
+        
+        response = Response(entry['data'], mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        response.vary.add('Accept')
+        if version == current:
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         logger.error(f"Error fetching profile photo: {e}")
         return jsonify({'message': 'Failed to fetch photo', 'error': str(e)}), 500
@@ -283,13 +307,9 @@ def delete_profile_photo():
         if isinstance(user_id, str):
             user_id = int(user_id)
         
-        # Delete file from disk
+        # Delete every variant from disk
         profile_dir = os.path.join(os.path.dirname(__file__), '..', PROFILE_PHOTO_DIR)
-        filename = f"user_{user_id}.jpg"
-        filepath = os.path.join(profile_dir, filename)
-        
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        remove_variants(profile_dir, user_id)
         
         # Update user record
         query = """
@@ -299,6 +319,7 @@ def delete_profile_photo():
         """
         from datetime import datetime, timezone
         db_manager.execute_query(query, (datetime.now(timezone.utc), user_id))
+        invalidate_photo(user_id)
         
         logger.info(f"Profile photo deleted for user {user_id}")
         
@@ -367,7 +388,11 @@ def update_preferences():
 @users_bp.route('/api/users/account', methods=['DELETE'])
 @jwt_required()
 def delete_account():
-    """Delete user account and all associated data"""
+    """
+    Delete user account and all associated data
+    The account is deactivated immediately; files, shares, storage and sync
+    events are removed by the background account deletion job
+    """
     try:
         user_id = get_jwt_identity()
         # Convert to int if it's a string (JWT stores as string)
@@ -376,58 +401,31 @@ def delete_account():
         
         logger.info(f"Account deletion initiated for user {user_id}")
         
-        # Start transaction
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                # Delete user's shares (both owned and received)
-                cursor.execute("DELETE FROM shares WHERE owner_id = %s OR grantee_id = %s", (user_id, user_id))
-                shares_deleted = cursor.rowcount
-                
-                # Delete user's files
-                cursor.execute("DELETE FROM files WHERE owner_id = %s", (user_id,))
-                files_deleted = cursor.rowcount
-                
-                # Delete sync events
-                cursor.execute("DELETE FROM sync_events WHERE user_id = %s", (user_id,))
-                
-                # Soft delete user account
-                from datetime import datetime, timezone
-                cursor.execute(
-                    "UPDATE users SET is_active = FALSE, updated_at = %s WHERE id = %s",
-                    (datetime.now(timezone.utc), user_id)
-                )
-                
-                conn.commit()
-        
-        # Delete user's files from storage
-        try:
-            from storage_manager import storage_manager
-            user = User.find_by_id(user_id)
-            if user:
-                storage_manager.delete_user_folders(user['username'], user_id)
-        except Exception as e:
-            logger.error(f"Error deleting user storage: {e}")
-        
-        # Delete profile photo
-        try:
-            profile_dir = os.path.join(os.path.dirname(__file__), '..', PROFILE_PHOTO_DIR)
-            filename = f"user_{user_id}.jpg"
-            filepath = os.path.join(profile_dir, filename)
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        except Exception as e:
-            logger.error(f"Error deleting profile photo: {e}")
-        
-        logger.info(f"Account deleted successfully for user {user_id}: {files_deleted} files, {shares_deleted} shares")
+        deletion = request_account_deletion(user_id)
         
         return jsonify({
             'success': True,
-            'message': 'Account deleted successfully',
-            'deleted': {
-                'files': files_deleted,
-                'shares': shares_deleted
-            }
-        }), 200
+            'message': 'Account deletion started',
+            'deletion': format_deletion(deletion)
+        }), 202
     except Exception as e:
         logger.error(f"Error deleting account: {e}")
         return jsonify({'message': 'Failed to delete account', 'error': str(e)}), 500
+
+@users_bp.route('/api/users/account/deletion', methods=['GET'])
+@jwt_required()
+def get_account_deletion_status():
+    """Progress of the user's account deletion"""
+    try:
+        user_id = get_jwt_identity()
+        if isinstance(user_id, str):
+            user_id = int(user_id)
+        
+        deletion = get_account_deletion(user_id)
+        if not deletion:
+            return jsonify({'message': 'No account deletion requested'}), 404
+        
+        return jsonify({'deletion': format_deletion(deletion)}), 200
+    except Exception as e:
+        logger.error(f"Error getting account deletion status: {e}")
+        return jsonify({'message': 'Failed to get account deletion status', 'error': str(e)}), 500
@@ -10,10 +10,13 @@ from typing import Tuple, Optional, Union
 import uuid
 from datetime import datetime
 
+from utils.checksums import sha256_stream
+
 # Storage configuration
 STORAGE_ROOT = os.path.join(os.path.dirname(__file__), "storage")  # Relative to this file's directory
 USER_QUOTA_BYTES = 512 * 1024 * 1024  # 512 MB per user
 MAX_FILE_SIZE = 100 * 1024 * 1024     # 100MB per file
+TRASH_RETENTION_DAYS = int(os.environ.get('TRASH_RETENTION_DAYS', 30))  # Days deleted files can be restored
 
 class StorageManager:
     """Manages local filesystem storage for encrypted files"""
@@ -91,6 +94,32 @@ class StorageManager:
             print(f"❌ Failed to save encrypted file {storage_path}: {e}")
             return False
     
+    def save_encrypted_stream(self, stream, storage_path: str) -> Optional[Tuple[int, str]]:
+        """
+        Stream encrypted data to the specified path, hashing it on the way
+        Data is written to a .part file and renamed into place once complete
+        Returns: (size_bytes, sha256 hex digest), or None if failed
+        """
+        file_path = Path(storage_path)
+        part_path = file_path.with_name(file_path.name + '.part')
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with open(part_path, 'wb') as f:
+                checksum, size = sha256_stream(stream, sink=f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(part_path, file_path)
+            
+            print(f"✅ Encrypted file saved: {storage_path} ({size} bytes, sha256 {checksum[:12]}…)")
+            return size, checksum
+            
+        except Exception as e:
+            print(f"❌ Failed to save encrypted file {storage_path}: {e}")
+            if part_path.exists():
+                part_path.unlink()
+            return None
+    
     def read_encrypted_file(self, storage_path: str) -> Optional[bytes]:
         """
         Read encrypted file data from the specified path
@@ -146,6 +175,45 @@ class StorageManager:
             print(f"❌ Failed to move file to deleted folder: {e}")
             return None
     
+    def restore_from_deleted(self, storage_path: str, username: str) -> Optional[str]:
+        """
+        Move a file from the deleted folder back to uploads (undo move_to_deleted)
+        Args:
+            storage_path: Current path of the file in the deleted folder
+            username: User's username
+        Returns: new storage path in uploads folder, or None if failed
+        """
+        try:
+            source_path = Path(storage_path)
+            if not source_path.exists():
+                print(f"❌ Deleted file not found for restore: {storage_path}")
+                return None
+            
+            # Strip the "YYYYMMDD_HHMMSS_" prefix added by move_to_deleted
+            uploads_folder, _ = self.get_user_folders(username)
+            name = source_path.name
+            parts = name.split('_', 2)
+            if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                name = parts[2]
+            restored_path = uploads_folder / name
+            if restored_path.exists():
+                restored_path = uploads_folder / f"{uuid.uuid4()}{source_path.suffix}"
+            
+            uploads_folder.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(source_path), str(restored_path))
+            
+            relative_restored_path = str(restored_path.relative_to(Path.cwd()))
+            print(f"✅ File restored from deleted folder: {storage_path} → {relative_restored_path}")
+            return relative_restored_path
+            
+        except Exception as e:
+            print(f"❌ Failed to restore file from deleted folder: {e}")
+            return None
+    
+    def is_in_deleted_folder(self, storage_path: str) -> bool:
+        """Check whether a storage path points into a user's deleted folder"""
+        return Path(storage_path).parent.name == "deleted"
+    
     def get_folder_size(self, folder_path: Path) -> int:
         """Calculate total size of all files in a folder"""
         total_size = 0
@@ -218,5 +286,28 @@ class StorageManager:
         except Exception as e:
             print(f"❌ Error during cleanup for user {username}: {e}")
 
+    def delete_user_folders(self, username: str, user_id: int = None) -> int:
+        """
+        Remove a user's whole storage folder (uploads and deleted) for account deletion
+        Args:
+            username: User's username (folder name)
+            user_id: Optional user ID for logging
+        Returns: bytes freed
+        """
+        user_folder = (self.storage_root / username).resolve()
+        # Never follow a crafted username outside the storage root (or onto the root itself)
+        if not username or username.startswith('.') or user_folder.parent != self.storage_root.resolve():
+            print(f"❌ Refusing to delete storage folder for username {username!r}")
+            return 0
+        if not user_folder.exists():
+            return 0
+
+        freed = self.get_folder_size(user_folder)
+        shutil.rmtree(user_folder)
+
+        user_info = f"user {username}" + (f" (ID: {user_id})" if user_id else "")
+        print(f"🗑️ Deleted storage folders for {user_info} ({freed} bytes)")
+        return freed
+
 # Global storage manager instance
 storage_manager = StorageManager()
\ No newline at end of file
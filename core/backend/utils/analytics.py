@@ -0,0 +1,293 @@
+"""
+User Analytics Rollups
+Reads and maintains user_stats / user_stats_daily and the usage history. File
+and share counters are kept current by database triggers; downloads have no row
+of their own and, like the hourly usage history, are recorded here from the
+sync event pipeline.
+"""
+from datetime import datetime, timedelta, timezone
+import logging
+
+from database import db_manager
+from utils.batching import batched_delete
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Days of activity returned by default
+DEFAULT_ACTIVITY_DAYS = 30
+
+# Sync events that feed the usage history
+USAGE_EVENTS = ('file_uploaded', 'file_downloaded', 'file_shared', 'file_deleted')
+
+# Hourly usage rows older than this are dropped after being compacted into days
+HOURLY_RETENTION_DAYS = 14
+
+# History bucket sizes; 'hour' is only available inside the hourly retention window
+HISTORY_BUCKETS = ('hour', 'day', 'week', 'month')
+
+# Target upper bound of points when the bucket is chosen automatically
+HISTORY_MAX_POINTS = 400
+
+def _activity_deltas(event_type, payload):
+    """Usage counters implied by one delivered sync event, or None if it has none"""
+    if event_type not in USAGE_EVENTS:
+        return None
+
+    deltas = {'uploads': 0, 'bytes_uploaded': 0, 'downloads': 0, 'bytes_downloaded': 0, 'shares': 0}
+    if event_type == 'file_uploaded':
+        deltas['uploads'] = 1
+        deltas['bytes_uploaded'] = payload.get('size_bytes') or 0
+    elif event_type == 'file_downloaded':
+        # Coalesced events carry a count and summed size, so a burst is one write
+        deltas['downloads'] = payload.get('count', 1) if payload.get('coalesced') else 1
+        deltas['bytes_downloaded'] = payload.get('size_bytes') or 0
+    elif event_type == 'file_shared':
+        # Only the owner's event counts, and only shares it created (re-sharing
+        # an already shared file just updates its permission)
+        deltas['shares'] = payload.get('created_count', 0)
+    # file_deleted only refreshes bytes_stored
+    return deltas
+
+def record_sync_activity(user_id, event_type, payload):
+    """
+    Add a delivered sync event to the hourly usage history and, for downloads,
+    to the daily activity rollup (uploads and shares are counted there by triggers)
+    """
+    deltas = _activity_deltas(event_type, payload)
+    if deltas is None:
+        return
+
+    hourly_query = """
+    INSERT INTO user_usage_hourly
+        (user_id, bucket, uploads, bytes_uploaded, downloads, bytes_downloaded, shares, bytes_stored)
+    VALUES (%s, date_trunc('hour', NOW()), %s, %s, %s, %s, %s,
+            COALESCE((SELECT total_bytes FROM user_stats WHERE user_id = %s), 0))
+    ON CONFLICT (user_id, bucket) DO UPDATE SET
+        uploads = user_usage_hourly.uploads + EXCLUDED.uploads,
+        bytes_uploaded = user_usage_hourly.bytes_uploaded + EXCLUDED.bytes_uploaded,
+        downloads = user_usage_hourly.downloads + EXCLUDED.downloads,
+        bytes_downloaded = user_usage_hourly.bytes_downloaded + EXCLUDED.bytes_downloaded,
+        shares = user_usage_hourly.shares + EXCLUDED.shares,
+        bytes_stored = EXCLUDED.bytes_stored
+    """
+    daily_query = """
+    SELECT bump_user_stats_daily(%s, (NOW() AT TIME ZONE 'UTC')::DATE, 0, 0, %s, %s)
+    """
+    try:
+        with db_manager.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(hourly_query, (
+                    user_id, deltas['uploads'], deltas['bytes_uploaded'], deltas['downloads'],
+                    deltas['bytes_downloaded'], deltas['shares'], user_id
+                ))
+                if deltas['downloads']:
+                    cursor.execute(daily_query, (user_id, deltas['downloads'], deltas['bytes_downloaded']))
+                conn.commit()
+    except Exception as e:
+        # Analytics must never break event delivery; drift repair does not cover
+        # activity history, so count what was lost
+        metrics.incr('analytics.activity_dropped')
+        logger.error(f"Error recording {event_type} activity for user {user_id}: {e}")
+
+def get_user_stats(user_id, days=DEFAULT_ACTIVITY_DAYS):
+    """
+    Get a user's totals and daily activity
+
+    Args:
+        user_id: User ID
+        days: Number of most recent days of activity to include
+
+    Returns:
+        dict with totals and a per-day activity list (oldest first)
+    """
+    totals = db_manager.execute_one(
+        """
+        SELECT file_count, total_bytes, shares_given, shares_received, updated_at
+        FROM user_stats WHERE user_id = %s
+        """,
+        (user_id,)
+    )
+
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date()
+    activity = db_manager.execute_query(
+        """
+        SELECT day, uploads, bytes_uploaded, downloads, bytes_downloaded, shares_created
+        FROM user_stats_daily
+        WHERE user_id = %s AND day >= %s
+        ORDER BY day
+        """,
+        (user_id, since),
+        fetch=True
+    )
+
+    return {
+        'totals': {
+            'file_count': totals['file_count'] if totals else 0,
+            'total_bytes': totals['total_bytes'] if totals else 0,
+            'shares_given': totals['shares_given'] if totals else 0,
+            'shares_received': totals['shares_received'] if totals else 0,
+            'updated_at': totals['updated_at'].isoformat() if totals else None
+        },
+        'activity': [
+            {
+                'day': row['day'].isoformat(),
+                'uploads': row['uploads'],
+                'bytes_uploaded': row['bytes_uploaded'],
+                'downloads': row['downloads'],
+                'bytes_downloaded': row['bytes_downloaded'],
+                'shares_created': row['shares_created']
+            }
+            for row in activity
+        ]
+    }
+
+def repair_user_stats():
+    """
+    Recompute totals from files and shares and fix rows that drifted
+    Only rows whose values differ are written
+
+    Returns:
+        Number of users whose totals were corrected
+    """
+    query = """
+    INSERT INTO user_stats (user_id, file_count, total_bytes, shares_given, shares_received, updated_at)
+    SELECT u.id,
+           COALESCE(f.file_count, 0),
+           COALESCE(f.total_bytes, 0),
+           COALESCE(g.shares_given, 0),
+           COALESCE(r.shares_received, 0),
+           NOW()
+    FROM users u
+    LEFT JOIN (
+        SELECT owner_id, COUNT(*) AS file_count, SUM(size_bytes) AS total_bytes
+        FROM files WHERE status = 'active' GROUP BY owner_id
+    ) f ON f.owner_id = u.id
+    LEFT JOIN (
+        SELECT f.owner_id, COUNT(*) AS shares_given
+        FROM shares s JOIN files f ON s.file_id = f.id GROUP BY f.owner_id
+    ) g ON g.owner_id = u.id
+    LEFT JOIN (
+        SELECT grantee_user_id, COUNT(*) AS shares_received
+        FROM shares GROUP BY grantee_user_id
+    ) r ON r.grantee_user_id = u.id
+    ON CONFLICT (user_id) DO UPDATE SET
+        file_count = EXCLUDED.file_count,
+        total_bytes = EXCLUDED.total_bytes,
+        shares_given = EXCLUDED.shares_given,
+        shares_received = EXCLUDED.shares_received,
+        updated_at = NOW()
+    WHERE (user_stats.file_count, user_stats.total_bytes, user_stats.shares_given, user_stats.shares_received)
+        IS DISTINCT FROM
+        (EXCLUDED.file_count, EXCLUDED.total_bytes, EXCLUDED.shares_given, EXCLUDED.shares_received)
+    """
+    repaired = db_manager.execute_query(query)
+    metrics.incr('analytics.drift_repaired', repaired)
+    if repaired:
+        logger.warning(f"Repaired analytics drift for {repaired} users")
+    return repaired
+
+def compact_usage_history(retention_days=HOURLY_RETENTION_DAYS):
+    """
+    Copy end-of-day bytes_stored from hourly buckets into user_stats_daily for
+    completed days, then drop hourly rows older than retention_days
+
+    Returns:
+        Number of hourly rows dropped
+    """
+    # Idempotent: recent completed days are rewritten each run until their hours expire
+    snapshot_query = """
+    INSERT INTO user_stats_daily (user_id, day, bytes_stored)
+    SELECT DISTINCT ON (user_id, day) user_id, day, bytes_stored
+    FROM (
+        SELECT user_id, (bucket AT TIME ZONE 'UTC')::DATE AS day, bucket, bytes_stored
+        FROM user_usage_hourly
+        WHERE bucket < date_trunc('day', NOW() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    ) hours
+    ORDER BY user_id, day, bucket DESC
+    ON CONFLICT (user_id, day) DO UPDATE SET bytes_stored = EXCLUDED.bytes_stored
+    """
+    days_written = db_manager.execute_query(snapshot_query)
+
+    select_ids = """
+    SELECT ctid FROM user_usage_hourly
+    WHERE bucket < date_trunc('day', NOW()) - make_interval(days => %s)
+    """
+    stats = batched_delete('compact_usage_history', 'user_usage_hourly', select_ids,
+                           (retention_days,), key='ctid')
+    logger.info(f"Compacted usage history: {days_written} daily snapshots, {stats['rows']} hourly rows dropped")
+    return stats['rows']
+
+def pick_history_bucket(start, end):
+    """Smallest bucket that keeps a range under HISTORY_MAX_POINTS points"""
+    hours = (end - start).total_seconds() / 3600
+    if hours <= HISTORY_MAX_POINTS and start >= datetime.now(timezone.utc) - timedelta(days=HOURLY_RETENTION_DAYS):
+        return 'hour'
+    days = hours / 24
+    if days <= HISTORY_MAX_POINTS:
+        return 'day'
+    if days / 7 <= HISTORY_MAX_POINTS:
+        return 'week'
+    return 'month'
+
+def get_usage_history(user_id, start, end, bucket=None):
+    """
+    Usage time series for a user, downsampled to the requested bucket
+
+    Args:
+        user_id: User ID
+        start: Range start (aware datetime, inclusive)
+        end: Range end (aware datetime, inclusive)
+        bucket: 'hour', 'day', 'week' or 'month'; chosen from the range when None
+
+    Returns:
+        (bucket, points) - points are ordered oldest first; bytes_stored is carried
+        forward through buckets without activity
+    """
+    bucket = bucket or pick_history_bucket(start, end)
+    if bucket not in HISTORY_BUCKETS:
+        raise ValueError(f"Invalid bucket: {bucket}")
+
+    if bucket == 'hour':
+        query = """
+        SELECT bucket AS period, uploads, bytes_uploaded, downloads, bytes_downloaded,
+               shares, bytes_stored
+        FROM user_usage_hourly
+        WHERE user_id = %s AND bucket >= date_trunc('hour', %s::TIMESTAMPTZ) AND bucket <= %s
+        ORDER BY bucket
+        """
+        params = (user_id, start, end)
+    else:
+        # Counters are summed; bytes_stored is the last known value in each bucket
+        query = """
+        SELECT date_trunc(%s, day)::DATE AS period,
+               SUM(uploads) AS uploads,
+               SUM(bytes_uploaded) AS bytes_uploaded,
+               SUM(downloads) AS downloads,
+               SUM(bytes_downloaded) AS bytes_downloaded,
+               SUM(shares_created) AS shares,
+               (ARRAY_AGG(bytes_stored ORDER BY day DESC) FILTER (WHERE bytes_stored IS NOT NULL))[1] AS bytes_stored
+        FROM user_stats_daily
+        WHERE user_id = %s AND day >= %s AND day <= %s
+        GROUP BY 1
+        ORDER BY 1
+        """
+        params = (bucket, user_id, start.astimezone(timezone.utc).date(), end.astimezone(timezone.utc).date())
+
+    rows = db_manager.execute_query(query, params, fetch=True)
+
+    points = []
+    bytes_stored = None
+    for row in rows:
+        if row['bytes_stored'] is not None:
+            bytes_stored = row['bytes_stored']
+        points.append({
+            'period': row['period'].isoformat(),
+            'uploads': int(row['uploads']),
+            'bytes_uploaded': int(row['bytes_uploaded']),
+            'downloads': int(row['downloads']),
+            'bytes_downloaded': int(row['bytes_downloaded']),
+            'shares': int(row['shares']),
+            'bytes_stored': bytes_stored
+        })
+    return bucket, points
@@ -0,0 +1,117 @@
+"""
+Batched Maintenance Deletes
+Deletes a bounded number of rows per transaction and pauses between batches so
+cleanup jobs never hold long locks or saturate IO while the API is serving
+"""
+import os
+import time
+import logging
+
+from psycopg2 import errors, sql
+
+from database import db_manager
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rows deleted per transaction
+BATCH_SIZE = int(os.environ.get('MAINTENANCE_BATCH_SIZE', 1000))
+# Seconds to sleep between batches (the IO budget)
+BATCH_PAUSE = float(os.environ.get('MAINTENANCE_BATCH_PAUSE', 0.2))
+# Stop a run after this many seconds; the next run continues where it left off
+MAX_RUNTIME = float(os.environ.get('MAINTENANCE_MAX_RUNTIME', 300))
+# Give up on a batch instead of queueing behind API transactions
+LOCK_TIMEOUT = os.environ.get('MAINTENANCE_LOCK_TIMEOUT', '2s')
+# Consecutive lock timeouts before a run gives up
+MAX_LOCK_RETRIES = 3
+
+def batched_delete(name, table, select_ids, params=(), batch_size=None, pause=None,
+                   max_runtime=None, key='id'):
+    """
+    Delete rows chosen by select_ids in small transactions
+
+    Args:
+        name: Metric name prefix, e.g. 'cleanup_orphaned_shares'
+        table: Table to delete from
+        select_ids: SELECT returning the key column of rows to delete, without
+            LIMIT/FOR UPDATE (added here so locked rows are skipped, not waited on)
+        params: Parameters for select_ids
+        batch_size: Rows per transaction
+        pause: Seconds to sleep between batches
+        max_runtime: Seconds after which the run stops early
+        key: Column matched against select_ids
+
+    Returns:
+        dict with rows, batches, seconds, rows_per_second, lock_timeouts and
+        completed (False when stopped by max_runtime)
+    """
+    batch_size = batch_size or BATCH_SIZE
+    pause = BATCH_PAUSE if pause is None else pause
+    max_runtime = max_runtime or MAX_RUNTIME
+
+    delete_query = sql.SQL("""
+    DELETE FROM {table}
+    WHERE {key} IN ({select_ids} LIMIT %s FOR UPDATE SKIP LOCKED)
+    """).format(
+        table=sql.Identifier(table),
+        key=sql.Identifier(key),
+        select_ids=sql.SQL(select_ids)
+    )
+
+    stats = {
+        'rows': 0,
+        'batches': 0,
+        'seconds': 0.0,
+        'rows_per_second': 0.0,
+        'lock_timeouts': 0,
+        'completed': False
+    }
+    started = time.monotonic()
+
+    consecutive_timeouts = 0
+    while time.monotonic() - started < max_runtime:
+        with db_manager.get_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    # Locked rows are skipped, so only table-level locks (DDL) can make
+                    # a batch wait; those time out instead of queueing
+                    cursor.execute("SET LOCAL lock_timeout = %s", (LOCK_TIMEOUT,))
+                    cursor.execute(delete_query, tuple(params) + (batch_size,))
+                    deleted = cursor.rowcount
+                conn.commit()
+            except errors.LockNotAvailable:
+                conn.rollback()
+                deleted = None
+
+        if deleted is None:
+            stats['lock_timeouts'] += 1
+            consecutive_timeouts += 1
+            if consecutive_timeouts >= MAX_LOCK_RETRIES:
+                logger.warning(f"{name}: {table} stayed locked, giving up until the next run")
+                break
+            time.sleep(pause * 2 ** consecutive_timeouts)
+            continue
+
+        consecutive_timeouts = 0
+        stats['rows'] += deleted
+        stats['batches'] += 1
+        if deleted < batch_size:
+            stats['completed'] = True
+            break
+
+        time.sleep(pause)
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    if stats['seconds'] > 0:
+        stats['rows_per_second'] = round(stats['rows'] / stats['seconds'], 1)
+
+    metrics.incr(f'jobs.{name}.rows_deleted', stats['rows'])
+    metrics.incr(f'jobs.{name}.lock_timeouts', stats['lock_timeouts'])
+    metrics.set_gauge(f'jobs.{name}.rows_per_second', stats['rows_per_second'])
+    metrics.set_gauge(f'jobs.{name}.last_run_seconds', stats['seconds'])
+
+    logger.info(
+        f"{name}: deleted {stats['rows']} rows from {table} in {stats['batches']} batches "
+        f"({stats['rows_per_second']} rows/s, {stats['lock_timeouts']} lock timeouts)"
+    )
+    return stats
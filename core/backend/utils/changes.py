@@ -0,0 +1,133 @@
+"""
+Change Tracking
+Every user has a listing version (user_change_versions) that triggers on
+files and shares bump whenever something the user can list changes. Rows
+are stamped with the version at which they last changed and hard deletes
+leave tombstones, so clients can fetch only what changed since a version.
+"""
+from datetime import timedelta
+import logging
+
+import psycopg2.extras
+
+from database import db_manager
+from utils.batching import batched_delete
+
+logger = logging.getLogger(__name__)
+
+# Rows returned per kind before the client is told to resync instead
+MAX_CHANGES = 1000
+
+def get_change_version(user_id):
+    """Current listing version of a user (0 before their first change)"""
+    result = db_manager.execute_one(
+        "SELECT version FROM user_change_versions WHERE user_id = %s", (user_id,)
+    )
+    return result['version'] if result else 0
+
+def get_changes_since(user_id, since, limit=MAX_CHANGES):
+    """
+    Files and shares a user can list that changed after version `since`
+
+    Everything is read in one REPEATABLE READ snapshot together with the
+    version, so the returned version covers exactly the returned rows.
+
+    Returns:
+        dict with version, resync (True when the delta can't be built and the
+        client must reload its listings), files, shared_files, sent_shares
+        and tombstones - or only version and resync when resync is True
+    """
+    with db_manager.read_snapshot() as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.execute(
+                "SELECT version, resync_below FROM user_change_versions WHERE user_id = %s",
+                (user_id,)
+            )
+            row = cursor.fetchone()
+            version = row['version'] if row else 0
+            resync_below = row['resync_below'] if row else 0
+
+            # Tombstones before resync_below are gone; a version from the future
+            # means the client's state came from somewhere else (e.g. a restore)
+            if since < resync_below or since > version:
+                return {'version': version, 'resync': True}
+
+            changes = {'version': version, 'resync': False}
+            queries = {
+                'files': """
+                SELECT id, original_filename, content_type, size_bytes, algo, status,
+                       created_at, updated_at, change_version
+                FROM files
+                WHERE owner_id = %s AND change_version > %s
+                ORDER BY change_version
+                LIMIT %s
+                """,
+                'shared_files': """
+                SELECT s.id AS share_id, s.file_id, s.permission, s.created_at AS shared_at,
+                       s.change_version, f.original_filename, f.content_type, f.size_bytes,
+                       f.status, f.created_at AS file_created_at,
+                       u.id AS owner_id, u.username AS owner_username, u.name AS owner_name
+                FROM shares s
+                JOIN files f ON f.id = s.file_id
+                JOIN users u ON u.id = f.owner_id
+                WHERE s.grantee_user_id = %s AND s.change_version > %s
+                ORDER BY s.change_version
+                LIMIT %s
+                """,
+                'sent_shares': """
+                SELECT s.id AS share_id, s.file_id, s.permission, s.created_at AS shared_at,
+                       s.owner_change_version AS change_version, f.original_filename,
+                       f.status, s.grantee_user_id, u.username AS grantee_username,
+                       u.name AS grantee_name, s.grantee_group_id, gr.name AS grantee_group_name
+                FROM shares s
+                JOIN files f ON f.id = s.file_id
+                LEFT JOIN users u ON u.id = s.grantee_user_id
+                LEFT JOIN groups gr ON gr.id = s.grantee_group_id
+                WHERE f.owner_id = %s AND s.owner_change_version > %s
+                ORDER BY s.owner_change_version
+                LIMIT %s
+                """,
+                'tombstones': """
+                SELECT kind, file_id, share_id, change_version
+                FROM change_tombstones
+                WHERE user_id = %s AND change_version > %s
+                ORDER BY change_version
+                LIMIT %s
+                """
+            }
+            for key, query in queries.items():
+                cursor.execute(query, (user_id, since, limit + 1))
+                rows = cursor.fetchall()
+                if len(rows) > limit:
+                    # Too much changed - a full reload is cheaper than a huge delta
+                    return {'version': version, 'resync': True}
+                changes[key] = [dict(r) for r in rows]
+            return changes
+
+def prune_change_tombstones(days):
+    """
+    Delete tombstones older than `days` (the sync event retention)
+
+    Each user's resync_below is raised past their pruned tombstones first, so
+    clients asking for a delta from before them are told to resync.
+    """
+    cutoff = db_manager.execute_one("SELECT NOW() - %s AS cutoff", (timedelta(days=days),))['cutoff']
+    db_manager.execute_query(
+        """
+        UPDATE user_change_versions u
+        SET resync_below = GREATEST(u.resync_below, t.max_version)
+        FROM (
+            SELECT user_id, MAX(change_version) AS max_version
+            FROM change_tombstones
+            WHERE created_at < %s
+            GROUP BY user_id
+        ) t
+        WHERE u.user_id = t.user_id
+        """,
+        (cutoff,)
+    )
+    stats = batched_delete(
+        'prune_change_tombstones', 'change_tombstones',
+        "SELECT id FROM change_tombstones WHERE created_at < %s", (cutoff,)
+    )
+    return stats['rows']
@@ -0,0 +1,92 @@
+"""
+Ciphertext Checksums
+SHA-256 helpers shared by uploads, the integrity scrubber and verify_storage.py
+Kept free of database imports so process pool workers can use them cheaply
+"""
+import hashlib
+import os
+import time
+
+# Bytes read per chunk when hashing
+CHUNK_SIZE = 1024 * 1024
+
+class RateLimiter:
+    """Sleeps just enough to keep throughput under bytes_per_second"""
+
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = bytes_per_second
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, nbytes):
+        """Account for nbytes read and block if running ahead of the budget"""
+        if not self.bytes_per_second:
+            return
+        self.consumed += nbytes
+        ahead = self.consumed / self.bytes_per_second - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+def sha256_stream(stream, chunk_size=CHUNK_SIZE, sink=None, limiter=None):
+    """
+    Hash a binary stream chunk by chunk
+
+    Args:
+        stream: Readable binary file object
+        chunk_size: Bytes per read
+        sink: Optional writable file object receiving every chunk
+        limiter: Optional RateLimiter throttling reads
+
+    Returns:
+        (hex digest, total bytes)
+    """
+    digest = hashlib.sha256()
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        total += len(chunk)
+        if sink is not None:
+            sink.write(chunk)
+        if limiter is not None:
+            limiter.consume(len(chunk))
+    return digest.hexdigest(), total
+
+def sha256_file(path, chunk_size=CHUNK_SIZE, limiter=None):
+    """Hash a file on disk. Returns (hex digest, size in bytes)"""
+    with open(path, 'rb') as f:
+        return sha256_stream(f, chunk_size=chunk_size, limiter=limiter)
+
+def verify_stored_file(path, expected_size, expected_checksum=None, limiter=None, hash_file=True):
+    """
+    Check a stored object's existence, size and checksum
+
+    Args:
+        path: Path of the stored ciphertext
+        expected_size: files.size_bytes
+        expected_checksum: files.checksum_sha256 (None when never recorded)
+        limiter: Optional RateLimiter throttling reads
+        hash_file: False to stop after the existence and size checks
+
+    Returns:
+        (status, sha256 or None, bytes read) - status is 'ok', 'missing',
+        'mismatch', or 'unverified' when there was no checksum to compare with
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return 'missing', None, 0
+
+    if size != expected_size:
+        # Truncated or overwritten - no need to hash to know it's wrong
+        return 'mismatch', None, 0
+
+    if not hash_file:
+        return ('ok' if expected_checksum else 'unverified'), None, 0
+
+    checksum, read = sha256_file(path, limiter=limiter)
+    if expected_checksum is None:
+        return 'unverified', checksum, read
+    return ('ok' if checksum == expected_checksum else 'mismatch'), checksum, read
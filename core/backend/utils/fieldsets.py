@@ -0,0 +1,60 @@
+"""
+Sparse Fieldsets
+List endpoints accept ?include= (top-level sections of the response) and
+?fields= (keys of each listed entry). Entry fields are declared together with
+the columns they are built from, so the SQL only selects what was asked for.
+"""
+from flask import request
+
+def parse_fieldset(name, allowed):
+    """
+    Comma-separated values of query parameter `name`
+
+    Returns:
+        list of values in request order, or None when the parameter is absent
+
+    Raises:
+        ValueError: for values not in allowed
+    """
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    values = []
+    for value in raw.split(','):
+        value = value.strip()
+        if value and value not in values:
+            values.append(value)
+    unknown = [value for value in values if value not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return values
+
+def select_fields(spec, fields=None):
+    """Fields of spec that were requested, in spec order (all of them when fields is None)"""
+    if fields is None:
+        return list(spec)
+    return [name for name in spec if name in fields]
+
+def columns_for(spec, fields):
+    """Columns needed to build the given fields of spec, each listed once"""
+    columns = []
+    for name in fields:
+        for column in spec[name][0]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def make_formatter(spec, fields=None):
+    """
+    Function turning a row into an entry with the given fields
+
+    Args:
+        spec: dict of field name -> (columns read, function of the row)
+        fields: field names to output (all of spec when None)
+    """
+    getters = [(name, spec[name][1]) for name in select_fields(spec, fields)]
+
+    def format_row(row):
+        return {name: get(row) for name, get in getters}
+
+    return format_row
@@ -0,0 +1,170 @@
+"""
+Profile Photo Processing
+Decoding, resizing and encoding run in a small process pool so Pillow work
+doesn't hold the GIL in request threads. Every upload is rendered once into
+all avatar sizes, as JPEG and (when Pillow supports it) WebP.
+Kept free of Flask and database imports so pool workers start cheaply.
+"""
+import atexit
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# Square bounding boxes rendered for every photo, smallest first
+PHOTO_SIZES = (32, 64, 128, 400)
+
+# Output formats: name -> (Pillow format, file extension, mimetype)
+PHOTO_FORMATS = {
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+}
+
+WEBP_SUPPORTED = features.check('webp')
+
+# Worker processes rendering photos
+PHOTO_WORKERS = int(os.environ.get('PHOTO_WORKERS', 2))
+
+# Photos queued or being rendered at once; further uploads are turned away
+PHOTO_MAX_PENDING = int(os.environ.get('PHOTO_MAX_PENDING', 8))
+
+# Seconds an upload waits for a free slot, then for its result
+PHOTO_QUEUE_TIMEOUT = 5
+PHOTO_RENDER_TIMEOUT = 30
+
+class PhotoQueueFull(Exception):
+    """Raised when the processing pool already has PHOTO_MAX_PENDING photos"""
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PHOTO_MAX_PENDING)
+
+def output_formats():
+    """Formats rendered for each size on this installation"""
+    return [name for name in PHOTO_FORMATS if name != 'webp' or WEBP_SUPPORTED]
+
+def variant_filename(user_id, size, fmt):
+    """File name of one rendered variant, e.g. user_7_64.webp"""
+    return f"user_{user_id}_{size}.{PHOTO_FORMATS[fmt][1]}"
+
+def content_version(variants):
+    """Short content hash identifying one upload, used in its immutable URL"""
+    digest = hashlib.sha256()
+    for key in sorted(variants):
+        digest.update(variants[key])
+    return digest.hexdigest()[:16]
+
+def pick_size(requested):
+    """Smallest rendered size at least as large as requested (the largest if none is)"""
+    for size in PHOTO_SIZES:
+        if size >= requested:
+            return size
+    return PHOTO_SIZES[-1]
+
+def render_variants(image_data):
+    """
+    Decode an uploaded image once and encode every size and format
+
+    Runs in a pool worker.
+
+    Returns:
+        dict mapping (size, format name) to encoded bytes
+    """
+    image = Image.open(io.BytesIO(image_data))
+
+    # Convert RGBA to RGB if necessary
+    if image.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode in ('RGBA', 'LA') else None)
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    variants = {}
+    # Largest first: each smaller size is resampled from the previous one,
+    # which is much cheaper than going back to the full-resolution original
+    for size in reversed(PHOTO_SIZES):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in output_formats():
+            pillow_format = PHOTO_FORMATS[fmt][0]
+            output = io.BytesIO()
+            if pillow_format == 'JPEG':
+                image.save(output, format='JPEG', quality=85, optimize=True)
+            else:
+                image.save(output, format='WEBP', quality=80, method=4)
+            variants[(size, fmt)] = output.getvalue()
+    return variants
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs server and database threads is unsafe;
+            # app.py keeps its startup under __main__ so workers don't rerun it
+            _pool = ProcessPoolExecutor(
+                max_workers=PHOTO_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def process_photo(image_data):
+    """
+    Render all variants of an uploaded photo in the process pool
+
+    Raises:
+        PhotoQueueFull: when PHOTO_MAX_PENDING photos are already being processed
+        Exception: whatever Pillow raised for an unreadable image
+    """
+    if not _slots.acquire(timeout=PHOTO_QUEUE_TIMEOUT):
+        raise PhotoQueueFull("Photo processing is busy, try again shortly")
+    try:
+        return _get_pool().submit(render_variants, image_data).result(timeout=PHOTO_RENDER_TIMEOUT)
+    finally:
+        _slots.release()
+
+def save_variants(directory, user_id, variants):
+    """Write rendered variants, each replaced atomically so readers never see partial files"""
+    os.makedirs(directory, exist_ok=True)
+    for (size, fmt), data in variants.items():
+        path = os.path.join(directory, variant_filename(user_id, size, fmt))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    # Superseded by the variants
+    try:
+        os.remove(os.path.join(directory, f"user_{user_id}.jpg"))
+    except FileNotFoundError:
+        pass
+
+def remove_variants(directory, user_id):
+    """Remove every stored variant of a user's photo, including the legacy single JPEG"""
+    paths = [os.path.join(directory, f"user_{user_id}.jpg")]
+    paths += [
+        os.path.join(directory, variant_filename(user_id, size, fmt))
+        for size in PHOTO_SIZES for fmt in PHOTO_FORMATS
+    ]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def shutdown_pool():
+    """Stop the worker processes (registered to run at exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+atexit.register(shutdown_pool)
@@ -0,0 +1,49 @@
+"""
+In-Process Metrics
+Thread-safe counters and gauges for the sync pipeline and background jobs
+Values are per process - scrape every worker to get cluster totals
+"""
+import threading
+from collections import defaultdict
+
+class MetricsRegistry:
+    """Minimal counter/gauge registry keyed by dotted metric names"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+
+    def incr(self, name, value=1):
+        """Increase a counter by value"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name, value):
+        """Record the latest value of a gauge"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name, default=0):
+        """Read a counter or gauge"""
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name]
+            return self._gauges.get(name, default)
+
+    def snapshot(self):
+        """Return a copy of all current values"""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges)
+            }
+
+    def reset(self):
+        """Clear all values"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+# Global metrics registry
+metrics = MetricsRegistry()
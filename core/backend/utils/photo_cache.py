@@ -0,0 +1,128 @@
+"""
+Profile Photo Cache
+Avatars are fetched constantly (navbar, share lists) but change rarely.
+Encoded variants are kept in a bounded in-memory LRU keyed by the photo's
+content version, and each user's current version is remembered for a short
+time, so repeated fetches cost neither filesystem calls nor queries.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import db_manager
+from utils.metrics import metrics
+
+# Bytes of encoded variants kept in memory per process
+PHOTO_CACHE_BYTES = int(os.environ.get('PHOTO_CACHE_BYTES', 32 * 1024 * 1024))
+
+# Seconds a user's current photo version is trusted before re-reading it; only
+# unversioned URLs depend on this (a versioned URL newer than the cached
+# version triggers an immediate re-read)
+PHOTO_VERSION_TTL = 30
+
+# Minimum seconds between re-reads triggered by a version mismatch (old URLs)
+PHOTO_VERSION_RECHECK = 1
+
+# Users whose current version is remembered
+PHOTO_VERSION_ENTRIES = 10000
+
+# Version of photos uploaded before URLs carried one
+LEGACY_VERSION = 'legacy'
+
+PHOTO_URL_PREFIX = '/api/users/profile/photo/'
+
+class PhotoCache:
+    """Thread-safe LRU of encoded photo variants, bounded by total bytes"""
+
+    def __init__(self, max_bytes=PHOTO_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Cached entry for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        metrics.incr('photo_cache.hits' if entry is not None else 'photo_cache.misses')
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry ({'data': bytes, ...}), evicting least recently used ones"""
+        nbytes = len(entry['data'])
+        if nbytes > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old['data'])
+            self.entries[key] = entry
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted['data'])
+                metrics.incr('photo_cache.evictions')
+
+    def invalidate_user(self, user_id):
+        """Drop every cached variant of a user's photo"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                self.size -= len(self.entries.pop(key)['data'])
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes}
+
+# Global cache instances
+photo_cache = PhotoCache()
+_versions = OrderedDict()
+_versions_lock = threading.Lock()
+
+def photo_url(user_id, version):
+    """Immutable URL of one version of a user's photo"""
+    return f"{PHOTO_URL_PREFIX}{user_id}/{version}"
+
+def _version_from_url(user_id, url):
+    """Version embedded in users.profile_photo, LEGACY_VERSION for old URLs, None for no photo"""
+    if not url:
+        return None
+    prefix = f"{PHOTO_URL_PREFIX}{user_id}/"
+    return url[len(prefix):] if url.startswith(prefix) else LEGACY_VERSION
+
+def current_version(user_id, expected=None):
+    """
+    Current photo version of a user (None when they have no photo)
+
+    Args:
+        user_id: User whose photo is requested
+        expected: Version from the requested URL; a mismatch re-reads the
+            database at once, since another process may have just stored it
+    """
+    now = time.monotonic()
+    with _versions_lock:
+        cached = _versions.get(user_id)
+    if cached:
+        version, fetched_at = cached
+        age = now - fetched_at
+        if age < PHOTO_VERSION_TTL and (expected in (None, version) or age < PHOTO_VERSION_RECHECK):
+            return version
+
+    result = db_manager.execute_one(
+        "SELECT profile_photo FROM users WHERE id = %s AND is_active = TRUE", (user_id,)
+    )
+    version = _version_from_url(user_id, result['profile_photo'] if result else None)
+    with _versions_lock:
+        _versions[user_id] = (version, now)
+        _versions.move_to_end(user_id)
+        while len(_versions) > PHOTO_VERSION_ENTRIES:
+            _versions.popitem(last=False)
+    return version
+
+def invalidate_photo(user_id):
+    """Forget a user's cached photo after it was replaced or removed in this process"""
+    with _versions_lock:
+        _versions.pop(user_id, None)
+    photo_cache.invalidate_user(user_id)
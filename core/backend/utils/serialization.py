@@ -0,0 +1,154 @@
+"""
+JSON Serialization
+Every jsonify() response goes through the app's JSON provider. When orjson is
+installed it encodes responses (several times faster than the json module and
+without the intermediate str); otherwise the standard library is used. Both
+backends produce the same JSON for the same data.
+"""
+from collections.abc import Iterator
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import logging
+import uuid
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Values accepted by the JSON_SERIALIZER setting
+SERIALIZERS = ('auto', 'orjson', 'stdlib')
+
+# Characters buffered before a streamed JSON response yields a chunk
+STREAM_CHUNK_SIZE = 65536
+
+def format_timestamp(dt):
+    """Convert datetime to ISO format with UTC timezone"""
+    if dt is None:
+        return None
+    # Already UTC (TIMESTAMPTZ read in a UTC session): nothing to convert
+    if getattr(dt, 'tzinfo', None) is timezone.utc:
+        return dt.isoformat()
+    # If datetime is timezone-aware, convert to UTC
+    if hasattr(dt, 'astimezone'):
+        dt_utc = dt.astimezone(timezone.utc)
+        return dt_utc.isoformat()
+    # If timezone-naive, assume it's UTC and make it explicit
+    if hasattr(dt, 'replace'):
+        dt_utc = dt.replace(tzinfo=timezone.utc)
+        return dt_utc.isoformat()
+    # Fallback to string
+    return str(dt)
+
+def _default(o):
+    """Encode values neither backend handles the same way natively"""
+    if isinstance(o, datetime):
+        return format_timestamp(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's json-module provider, with the shared encoding of dates and timestamps"""
+    default = staticmethod(_default)
+    # Clients never depend on key order, and sorting costs time on large listings
+    sort_keys = False
+
+class OrjsonProvider(StdlibJSONProvider):
+    """JSON provider backed by orjson; loads and dumps fall back to json for options it lacks"""
+
+    def _options(self):
+        # datetimes go through _default so they match the stdlib backend exactly
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build the response body straight from orjson's bytes"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._options() | orjson.OPT_APPEND_NEWLINE
+        # Pretty-printed like Flask's default provider in debug mode
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=_default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def stream_json_object(fields):
+    """
+    Encode a JSON object incrementally, for responses too large to build in memory
+    (wrap in stream_with_context; encodes with the app's JSON provider)
+
+    Args:
+        fields: iterable of (key, value) pairs. Iterators (e.g. generators) are
+            written as arrays one element at a time, callables are called when
+            their key is reached (for totals known only after earlier arrays),
+            anything else is encoded whole.
+
+    Yields:
+        str chunks of roughly STREAM_CHUNK_SIZE characters
+    """
+    dumps = current_app.json.dumps
+    chunk = ['{']
+    size = 1
+    for index, (key, value) in enumerate(fields):
+        if callable(value):
+            value = value()
+        prefix = f"{',' if index else ''}{dumps(key)}:"
+        if isinstance(value, Iterator):
+            chunk.append(prefix + '[')
+            size += len(prefix) + 1
+            for position, item in enumerate(value):
+                text = dumps(item)
+                chunk.append(f",{text}" if position else text)
+                size += len(text) + 1
+                if size >= STREAM_CHUNK_SIZE:
+                    yield ''.join(chunk)
+                    chunk = []
+                    size = 0
+            chunk.append(']')
+            size += 1
+        else:
+            text = prefix + dumps(value)
+            chunk.append(text)
+            size += len(text)
+    chunk.append('}\n')
+    yield ''.join(chunk)
+
+def get_json_provider_class(name='auto'):
+    """
+    JSON provider class for the JSON_SERIALIZER setting
+
+    Args:
+        name: 'orjson', 'stdlib', or 'auto' (orjson when installed)
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"JSON_SERIALIZER must be one of {', '.join(SERIALIZERS)}")
+    if name == 'stdlib':
+        return StdlibJSONProvider
+    if orjson is None:
+        if name == 'orjson':
+            logger.warning("JSON_SERIALIZER=orjson but orjson is not installed, using the json module")
+        return StdlibJSONProvider
+    return OrjsonProvider
@@ -0,0 +1,135 @@
+"""
+Set-Based Sharing
+Shares any number of files with any number of users in one multi-row upsert
+(a single round-trip however large the request), then explains whatever was
+left out with one lookup per kind - only when something was.
+"""
+import logging
+import uuid
+
+from database import File, Group, Share, User
+from utils.sync_events import emit_sync_event
+
+logger = logging.getLogger(__name__)
+
+def share_files(owner_id, file_ids, usernames, permission):
+    """
+    Share files of owner_id with users, creating new shares and updating the
+    permission of existing ones
+
+    Args:
+        file_ids: file ids (duplicates and malformed ids are tolerated)
+        usernames: grantee usernames
+        permission: permission of every written share (validated by the caller)
+
+    Returns:
+        dict with shares (rows from Share.bulk_upsert), failed_files
+        ([{file_id, reason}]) and failed_usernames ([{username, reason}])
+    """
+    failed_files = []
+    valid_ids = []
+    for file_id in dict.fromkeys(str(f) for f in file_ids):
+        try:
+            valid_ids.append(str(uuid.UUID(file_id)))
+        except ValueError:
+            failed_files.append({'file_id': file_id, 'reason': 'File not found'})
+    names = list(dict.fromkeys(str(name).strip() for name in usernames if str(name).strip()))
+
+    shares = Share.bulk_upsert(owner_id, valid_ids, names, permission) if valid_ids and names else []
+    failed_usernames = []
+
+    # Every owned active file is shared with every valid grantee, so a short
+    # result means some ids or usernames didn't qualify
+    if len(shares) < len(valid_ids) * len(names):
+        shared_ids = {str(row['file_id']) for row in shares}
+        leftover = [file_id for file_id in valid_ids if file_id not in shared_ids]
+        existing = File.find_owner_status(leftover) if leftover else {}
+        for file_id in leftover:
+            row = existing.get(file_id)
+            if not row:
+                reason = 'File not found'
+            elif row['owner_id'] != owner_id:
+                reason = 'Access denied - not the owner'
+            elif row['status'] != 'active':
+                reason = 'File is in the trash'
+            else:
+                continue  # shareable, but no grantee was
+            failed_files.append({'file_id': file_id, 'reason': reason})
+
+        granted = {row['grantee_username'] for row in shares}
+        leftover = [name for name in names if name not in granted]
+        users = User.find_by_usernames(leftover) if leftover else {}
+        for name in leftover:
+            user = users.get(name)
+            if not user:
+                reason = 'User not found'
+            elif user['id'] == owner_id:
+                reason = 'Cannot share with yourself'
+            else:
+                continue  # valid grantee, but no file was shareable
+            failed_usernames.append({'username': name, 'reason': reason})
+
+    return {'shares': shares, 'failed_files': failed_files, 'failed_usernames': failed_usernames}
+
+def _emit_per_grantee(owner_id, event_type, rows, grantees_key, extra, owner_extra=None):
+    """
+    One event for the owner listing every file and grantee in rows, and one per
+    grantee listing its files (not one per file and user). Members of a group
+    grantee are notified like user grantees
+    """
+    if not rows:
+        return
+    group_ids = list(dict.fromkeys(row['grantee_group_id'] for row in rows if row.get('grantee_group_id')))
+    try:
+        members = Group.find_member_ids(group_ids) if group_ids else {}
+        files_by_grantee = {}
+        for row in rows:
+            if row.get('grantee_group_id'):
+                recipients = members.get(row['grantee_group_id'], [])
+            else:
+                recipients = [row['grantee_user_id']]
+            for recipient in recipients:
+                files = files_by_grantee.setdefault(recipient, [])
+                if str(row['file_id']) not in files:
+                    files.append(str(row['file_id']))
+        
+        payload = {
+            'file_ids': list(dict.fromkeys(str(row['file_id']) for row in rows)),
+            grantees_key: list(dict.fromkeys(
+                row['grantee_user_id'] for row in rows if not row.get('grantee_group_id')
+            )),
+            **extra,
+            **(owner_extra or {})
+        }
+        if group_ids:
+            payload['group_ids'] = group_ids
+        emit_sync_event(user_id=owner_id, event_type=event_type, payload=payload)
+        for grantee_id, grantee_file_ids in files_by_grantee.items():
+            emit_sync_event(
+                user_id=grantee_id,
+                event_type=event_type,
+                payload={
+                    'file_ids': grantee_file_ids,
+                    'owner_id': owner_id,
+                    **extra
+                }
+            )
+    except Exception as e:
+        logger.warning(f"Failed to emit {event_type} events: {e}")
+
+def emit_share_events(owner_id, shares, permission, event_type='file_shared'):
+    """
+    Batched events for written shares: file_shared when files are shared,
+    share_updated when only the permission of existing shares changed.
+    The owner's file_shared event carries created_count, the shares that are
+    new (the rest only had their permission updated)
+    """
+    owner_extra = None
+    if event_type == 'file_shared':
+        owner_extra = {'created_count': sum(1 for row in shares if row.get('created'))}
+    _emit_per_grantee(owner_id, event_type, shares, 'shared_with_user_ids', {'permission': permission},
+                      owner_extra)
+
+def emit_unshare_events(owner_id, revoked):
+    """Batched file_unshared events for revoked shares"""
+    _emit_per_grantee(owner_id, 'file_unshared', revoked, 'grantee_user_ids', {})
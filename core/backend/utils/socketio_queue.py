@@ -0,0 +1,138 @@
+"""
+Socket.IO Message Queue Backends
+Shares Socket.IO rooms between server processes so sync events reach a user
+no matter which worker their WebSocket is connected to
+"""
+import json
+import logging
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+import socketio
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+NOTIFY_PAYLOAD_LIMIT = 7999
+
+# Seconds to block in select() before re-checking the LISTEN connection
+LISTEN_POLL_TIMEOUT = 5
+
+class PostgresNotifyManager(socketio.PubSubManager):
+    """
+    Socket.IO client manager that relays messages over PostgreSQL LISTEN/NOTIFY
+    Stand-in for Redis when only the application database is available
+    """
+    name = 'postgres-notify'
+
+    def __init__(self, url, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self.publish_conn = None
+        self.publish_lock = threading.Lock()
+
+    def _connect(self):
+        """Open an autocommit connection so NOTIFY/LISTEN take effect immediately"""
+        conn = psycopg2.connect(self.url)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    def _publish(self, data):
+        """Send a message to every server listening on the channel"""
+        try:
+            payload = json.dumps(data)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Socket.IO message is not JSON serializable ({e}), not relayed")
+            return
+        if len(payload.encode('utf-8')) > NOTIFY_PAYLOAD_LIMIT:
+            logger.error(f"Socket.IO message too large for NOTIFY ({len(payload)} bytes), not relayed")
+            return
+
+        with self.publish_lock:
+            for attempt in range(2):
+                try:
+                    if self.publish_conn is None or self.publish_conn.closed:
+                        self.publish_conn = self._connect()
+                    with self.publish_conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except psycopg2.Error as e:
+                    # Connection may have been dropped by the server - reconnect once
+                    self.publish_conn = None
+                    if attempt:
+                        logger.error(f"Failed to publish Socket.IO message: {e}")
+
+    def _listen(self):
+        """Yield raw payloads received on the channel, reconnecting on failure"""
+        retry_sleep = 1
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                logger.info(f"Listening for Socket.IO messages on channel {self.channel}")
+                retry_sleep = 1
+
+                while True:
+                    if select.select([conn], [], [], LISTEN_POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        yield conn.notifies.pop(0).payload
+            except psycopg2.Error as e:
+                logger.error(f"Socket.IO LISTEN connection lost: {e}, retrying in {retry_sleep}s")
+                time.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 60)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+def is_postgres_url(url):
+    """Check whether a message queue URL points at PostgreSQL"""
+    return url.startswith(('postgres://', 'postgresql://'))
+
+def get_socketio_queue_options(url, channel):
+    """
+    Build SocketIO() keyword arguments for the configured message queue
+
+    Args:
+        url: Message queue URL (redis://, kombu URLs, or postgresql://)
+        channel: Channel name shared by every worker in the cluster
+
+    Returns:
+        dict of keyword arguments, empty when no queue is configured
+    """
+    if not url:
+        return {}
+
+    if is_postgres_url(url):
+        return {'client_manager': PostgresNotifyManager(url, channel=channel)}
+
+    # Redis and Kombu backends are built by Flask-SocketIO from the URL
+    return {'message_queue': url, 'channel': channel}
+
+def get_external_emitter(url, channel):
+    """
+    Build a write-only Socket.IO manager for processes without a Socket.IO server
+    (e.g. the standalone job worker) so their sync events reach connected clients
+
+    Args:
+        url: Message queue URL shared with the web workers
+        channel: Channel name shared by every worker in the cluster
+
+    Returns:
+        Manager exposing emit(event, data, room=..., namespace=...), or None
+    """
+    if not url:
+        return None
+
+    if is_postgres_url(url):
+        return PostgresNotifyManager(url, channel=channel, write_only=True)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel, write_only=True)
+    return socketio.KombuManager(url, channel=channel, write_only=True)
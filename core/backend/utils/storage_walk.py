@@ -0,0 +1,83 @@
+"""
+Storage Tree Walk
+Lists the encrypted files under the storage root in the same order as
+ORDER BY storage_path COLLATE "C" and merge-joins them against rows read in
+that order. Kept free of database imports.
+"""
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def storage_key(path):
+    """Format a path the way storage_path is stored (relative to the working directory)"""
+    try:
+        return str(Path(path).relative_to(Path.cwd()))
+    except ValueError:
+        return str(path)
+
+def iter_storage_files(root, after=None):
+    """
+    Yield (key, path) for every file under root in byte order of key
+
+    A directory sorts as name + separator, which is where its children fall in
+    the full-path order used by ORDER BY storage_path COLLATE "C". Only one
+    directory listing is held in memory at a time.
+    """
+    def walk(directory, is_root):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            logger.warning(f"Cannot list {directory}: {e}")
+            return
+
+        keyed = []
+        for entry in entries:
+            if is_root and entry.name.startswith('.'):
+                # Quarantine and other housekeeping folders
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            keyed.append((entry.name + os.sep if is_dir else entry.name, entry, is_dir))
+        keyed.sort(key=lambda item: item[0])
+
+        for _, entry, is_dir in keyed:
+            key = storage_key(entry.path)
+            if is_dir:
+                prefix = key + os.sep
+                # Skip subtrees that were completely processed before the checkpoint
+                if after is not None and prefix < after and not after.startswith(prefix):
+                    continue
+                yield from walk(entry.path, False)
+            elif entry.is_file(follow_symlinks=False):
+                if after is not None and key <= after:
+                    continue
+                yield key, entry.path
+
+    yield from walk(root, True)
+
+def merge_join(files, rows):
+    """
+    Pair files with the rows pointing at them
+
+    Args:
+        files: (key, path) tuples in byte order of key (iter_storage_files)
+        rows: (storage_path, id) tuples in the same order
+
+    Yields:
+        (file, row) for matching keys, (file, None) for a file without a row
+        and (None, row) for a row without a file
+    """
+    file = next(files, None)
+    row = next(rows, None)
+    while file is not None or row is not None:
+        if row is None or (file is not None and file[0] < row[0]):
+            yield file, None
+            file = next(files, None)
+        elif file is None or row[0] < file[0]:
+            yield None, row
+            row = next(rows, None)
+        else:
+            yield file, row
+            file = next(files, None)
+            row = next(rows, None)
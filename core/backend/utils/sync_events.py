@@ -3,8 +3,14 @@ Sync Events System
 Real-time event emission for dashboard synchronization
 """
 import uuid
+import atexit
+import threading
 from datetime import datetime, timezone
+from psycopg2 import sql
 from database import db_manager
+from utils.metrics import metrics
+from utils.batching import batched_delete
+from utils.analytics import record_sync_activity
 import logging
 import json
 
@@ -14,17 +20,153 @@ def utcnow():
     """Get current UTC time as timezone-aware datetime"""
     return datetime.now(timezone.utc)
 
+# Sync events are kept this many days (one partition per day)
+SYNC_EVENT_RETENTION_DAYS = 7
+PARTITION_DAYS_AHEAD = 7
+
+# Reconnecting clients missing more events than this refetch their listing instead
+REPLAY_LIMIT = 500
+
 # Global SocketIO instance (will be set by app.py)
 socketio_instance = None
 
+# Coalescing policies per event type
+# window: seconds after an event during which further events are collected into
+#   one summarized event (the first event of a quiet period is delivered at once)
+# max_ids: affected ids kept in the summary (extra ids are counted as dropped)
+# id_field: payload key holding the affected id
+DEFAULT_EVENT_POLICIES = {
+    'file_downloaded': {'window': 5.0, 'max_ids': 100, 'id_field': 'file_id'},
+}
+
+event_policies = dict(DEFAULT_EVENT_POLICIES)
+
 def set_socketio(socketio):
     """Set the global SocketIO instance"""
     global socketio_instance
     socketio_instance = socketio
 
+def set_event_policies(overrides=None):
+    """
+    Apply per-event-type coalescing policies on top of the defaults
+    Each override is merged into its type's default policy; a policy of None, or
+    one whose merged window is missing or <= 0, disables coalescing for that type
+    """
+    global event_policies
+    policies = dict(DEFAULT_EVENT_POLICIES)
+    for event_type, policy in (overrides or {}).items():
+        # Keys the override leaves out (including window) keep their default
+        merged = {**DEFAULT_EVENT_POLICIES.get(event_type, {}), **(policy or {})}
+        if policy is None or (merged.get('window') or 0) <= 0:
+            policies.pop(event_type, None)
+        else:
+            policies[event_type] = merged
+    event_policies = policies
+
+class SyncEventCoalescer:
+    """
+    Merges bursts of one event type for one user into a single summarized event
+    The first event is delivered immediately and opens a window; only events
+    following it within the window are held and summarized when it closes
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # (user_id, event_type) -> burst state
+    
+    def add(self, user_id, event_type, payload, policy):
+        """
+        Deliver an event at once when no window is open for the user, otherwise
+        add it to the open window's burst
+
+        Returns:
+            event_id when delivered now, None when held for the summary
+        """
+        key = (user_id, event_type)
+        id_field = policy.get('id_field', 'file_id')
+        max_ids = policy.get('max_ids', 100)
+        
+        with self.lock:
+            burst = self.pending.get(key)
+            if burst is None:
+                # Quiet until now: deliver this event, collect the ones that follow
+                self.pending[key] = {
+                    'count': 0,
+                    'ids': [],
+                    'dropped_ids': 0,
+                    'size_bytes': 0,
+                    'first_payload': None,
+                    'first_at': None,
+                    'id_field': id_field
+                }
+                timer = threading.Timer(policy['window'], self.flush, args=(key,))
+                timer.daemon = True
+                timer.start()
+            else:
+                if burst['count'] == 0:
+                    burst['first_payload'] = payload
+                    burst['first_at'] = utcnow()
+                else:
+                    metrics.incr('sync_events.merged')
+                    metrics.incr(f'sync_events.merged.{event_type}')
+                
+                burst['count'] += 1
+                burst['size_bytes'] += payload.get('size_bytes') or 0
+                affected_id = payload.get(id_field)
+                if affected_id is not None:
+                    if len(burst['ids']) < max_ids:
+                        if affected_id not in burst['ids']:
+                            burst['ids'].append(affected_id)
+                    else:
+                        burst['dropped_ids'] += 1
+                        metrics.incr('sync_events.dropped')
+                        metrics.incr(f'sync_events.dropped.{event_type}')
+        
+        if burst is None:
+            return _deliver_sync_event(user_id, event_type, payload)
+        return None
+    
+    def flush(self, key):
+        """Emit the summarized event for a burst whose window has closed"""
+        with self.lock:
+            burst = self.pending.pop(key, None)
+        if not burst or burst['count'] == 0:
+            # Nothing followed the event that opened the window
+            return
+        
+        user_id, event_type = key
+        if burst['count'] == 1:
+            # A single follower - deliver it unchanged
+            summary = burst['first_payload']
+        else:
+            summary = {
+                'coalesced': True,
+                'count': burst['count'],
+                f"{burst['id_field']}s": burst['ids'],
+                'ids_truncated': burst['dropped_ids'],
+                'size_bytes': burst['size_bytes'],
+                'first_at': burst['first_at'].isoformat(),
+                'last_at': utcnow().isoformat()
+            }
+        _deliver_sync_event(user_id, event_type, summary)
+    
+    def flush_all(self):
+        """Emit every open burst immediately (used at shutdown)"""
+        with self.lock:
+            keys = list(self.pending.keys())
+        for key in keys:
+            self.flush(key)
+
+# Global coalescer instance
+event_coalescer = SyncEventCoalescer()
+atexit.register(event_coalescer.flush_all)
+
 def emit_sync_event(user_id, event_type, payload):
     """
     Emit a sync event to affected users via WebSocket and store in DB
+    Event types with a coalescing policy are delivered at once when the user
+    had none recently; events following within the window are merged and
+    emitted once it closes
     
     Args:
         user_id: The primary user affected by this event
@@ -36,10 +178,25 @@ def emit_sync_event(user_id, event_type, payload):
         - file_deleted
         - file_shared
         - file_unshared
+        - share_updated
         - file_downloaded
         - metadata_updated
         - analytics_updated
+    
+    Returns:
+        event_id, or None when the event was queued for coalescing
     """
+    policy = event_policies.get(event_type)
+    if policy:
+        try:
+            return event_coalescer.add(user_id, event_type, payload, policy)
+        except Exception as e:
+            logger.error(f"Error coalescing sync event: {e}")
+    
+    return _deliver_sync_event(user_id, event_type, payload)
+
+def _deliver_sync_event(user_id, event_type, payload):
+    """Store a sync event and push it to connected sockets"""
     try:
         event_id = str(uuid.uuid4())
         timestamp = utcnow()
@@ -52,8 +209,10 @@ def emit_sync_event(user_id, event_type, payload):
             'payload': payload
         }
         
-        # Store event in database for polling fallback
-        store_sync_event(event_id, user_id, event_type, payload, timestamp)
+        # Store event in database for polling fallback and session resume
+        event_data['seq'] = store_sync_event(event_id, user_id, event_type, payload, timestamp)
+        metrics.incr('sync_events.emitted')
+        record_sync_activity(user_id, event_type, payload)
         
         # Emit via WebSocket if available
         if socketio_instance:
@@ -65,19 +224,8 @@ def emit_sync_event(user_id, event_type, payload):
                 namespace='/'
             )
             logger.info(f"Emitted {event_type} event to user:{user_id}")
-            
-            # If it's a sharing event, also emit to recipient(s)
-            if event_type == 'file_shared' and 'shared_with_user_ids' in payload:
-                for recipient_id in payload['shared_with_user_ids']:
-                    recipient_event = event_data.copy()
-                    recipient_event['user_id'] = recipient_id
-                    socketio_instance.emit(
-                        'sync_event',
-                        recipient_event,
-                        room=f'user:{recipient_id}',
-                        namespace='/'
-                    )
-                    logger.info(f"Emitted {event_type} event to recipient user:{recipient_id}")
+            # Grantees of a share get their own file_shared event (see utils.sharing),
+            # stored for replay like any other
         
         return event_id
         
@@ -86,11 +234,17 @@ def emit_sync_event(user_id, event_type, payload):
         return None
 
 def store_sync_event(event_id, user_id, event_type, payload, timestamp):
-    """Store sync event in database for polling fallback"""
+    """
+    Store sync event in database for polling fallback
+    
+    Returns:
+        The event's sequence number, or None if it could not be stored
+    """
     try:
         query = """
         INSERT INTO sync_events (id, user_id, event_type, payload, created_at)
         VALUES (%s, %s, %s, %s, %s)
+        RETURNING seq
         """
         params = (
             event_id,
@@ -99,10 +253,23 @@ def store_sync_event(event_id, user_id, event_type, payload, timestamp):
             json.dumps(payload),
             timestamp
         )
-        db_manager.execute_query(query, params)
+        result = db_manager.execute_one(query, params)
         logger.debug(f"Stored sync event {event_id} in database")
+        return result['seq'] if result else None
     except Exception as e:
         logger.error(f"Error storing sync event: {e}")
+        return None
+
+def _format_event_row(row):
+    """Convert a sync_events row into the event shape sent to clients"""
+    return {
+        'event_id': str(row['id']),
+        'seq': row['seq'],
+        'user_id': row['user_id'],
+        'type': row['event_type'],
+        'payload': json.loads(row['payload']) if isinstance(row['payload'], str) else row['payload'],
+        'timestamp': row['created_at'].isoformat() if hasattr(row['created_at'], 'isoformat') else row['created_at']
+    }
 
 def get_sync_events_since(user_id, since_timestamp):
     """
@@ -111,38 +278,181 @@ def get_sync_events_since(user_id, since_timestamp):
     """
     try:
         query = """
-        SELECT id, user_id, event_type, payload, created_at
+        SELECT id, seq, user_id, event_type, payload, created_at
         FROM sync_events
         WHERE user_id = %s AND created_at > %s
         ORDER BY created_at ASC
         """
         results = db_manager.execute_query(query, (user_id, since_timestamp), fetch=True)
         
-        events = []
-        for row in results:
-            events.append({
-                'event_id': row['id'],
-                'user_id': row['user_id'],
-                'type': row['event_type'],
-                'payload': json.loads(row['payload']) if isinstance(row['payload'], str) else row['payload'],
-                'timestamp': row['created_at'].isoformat() if hasattr(row['created_at'], 'isoformat') else row['created_at']
-            })
-        
-        return events
+        return [_format_event_row(row) for row in results]
     except Exception as e:
         logger.error(f"Error retrieving sync events: {e}")
         return []
 
-def cleanup_old_events(days=7):
-    """Delete sync events older than specified days"""
+def get_sync_events_after(user_id, last_event_id=None, last_seq=None, limit=REPLAY_LIMIT):
+    """
+    Get the events a client missed after the last event it processed
+    Used to resume a WebSocket session after a reconnect
+    
+    Args:
+        user_id: User whose events are replayed
+        last_event_id: ID of the last event the client saw
+        last_seq: Sequence number of the last event the client saw (preferred)
+        limit: Maximum number of events to replay
+    
+    Returns:
+        (events, resync_reason) - resync_reason is None when the replay is complete,
+        otherwise the client has to refetch its full listing
+    """
     try:
+        if last_seq is None:
+            result = db_manager.execute_one(
+                "SELECT seq FROM sync_events WHERE id = %s AND user_id = %s",
+                (last_event_id, user_id)
+            )
+            if not result:
+                return [], 'last_event_expired'
+            last_seq = result['seq']
+        
+        # Retention drops the oldest events first: while one of the user's events at or
+        # before last_seq is retained, nothing after it was dropped (an index lookup
+        # on the user's events, not a scan of every partition)
+        horizon = db_manager.execute_one(
+            "SELECT MIN(seq) AS seq FROM sync_events WHERE user_id = %s",
+            (user_id,)
+        )
+        if not horizon or horizon['seq'] is None or last_seq < horizon['seq']:
+            return [], 'gap_exceeds_retention'
+        
         query = """
-        DELETE FROM sync_events
-        WHERE created_at < NOW() - INTERVAL '%s days'
+        SELECT id, seq, user_id, event_type, payload, created_at
+        FROM sync_events
+        WHERE user_id = %s AND seq > %s
+        ORDER BY seq ASC
+        LIMIT %s
+        """
+        results = db_manager.execute_query(query, (user_id, last_seq, limit + 1), fetch=True)
+        if len(results) > limit:
+            return [], 'too_many_missed_events'
+        
+        return [_format_event_row(row) for row in results], None
+    except Exception as e:
+        logger.error(f"Error retrieving missed sync events: {e}")
+        return [], 'replay_failed'
+
+def is_sync_events_partitioned():
+    """Check whether sync_events has been converted to a partitioned table"""
+    try:
+        result = db_manager.execute_one(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('sync_events')"
+        )
+        return bool(result) and result['relkind'] == 'p'
+    except Exception as e:
+        logger.error(f"Error checking sync_events partitioning: {e}")
+        return False
+
+def ensure_sync_event_partitions(days_ahead=PARTITION_DAYS_AHEAD):
+    """
+    Create the daily partitions for the upcoming days if they are missing
+    Rows that landed in the default partition for one of those days (the
+    scheduler lapsed) are moved into the new partition
+    """
+    try:
+        stray = db_manager.execute_query(
+            """
+            SELECT created_at::date AS day, COUNT(*) AS count
+            FROM sync_events_default
+            WHERE created_at >= CURRENT_DATE
+            GROUP BY 1
+            ORDER BY 1
+            """,
+            fetch=True
+        )
+        for row in stray:
+            logger.warning(
+                f"{row['count']} sync events for {row['day']} are in the default partition; "
+                f"moving them into a new day partition"
+            )
+        result = db_manager.execute_one(
+            "SELECT create_sync_events_partitions(%s) AS created", (days_ahead,)
+        )
+        created = result['created'] if result else 0
+        if created:
+            logger.info(f"Created {created} sync_events partitions")
+        return created
+    except Exception as e:
+        logger.error(f"Error creating sync_events partitions: {e}")
+        return 0
+
+def drop_expired_sync_event_partitions(days=SYNC_EVENT_RETENTION_DAYS):
+    """
+    Detach and drop day partitions that lie entirely before the retention cutoff
+    Each partition is handled in its own short transaction with a lock timeout,
+    so a busy parent table just defers the drop to the next run
+    """
+    query = """
+    SELECT c.relname AS partition_name
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'sync_events'::regclass
+      AND c.relname ~ '^sync_events_[0-9]{8}$'
+      AND to_date(substring(c.relname FROM 13), 'YYYYMMDD') + 1 <= (NOW() - make_interval(days => %s))::date
+    ORDER BY c.relname
+    """
+    dropped = 0
+    try:
+        expired = db_manager.execute_query(query, (days,), fetch=True)
+    except Exception as e:
+        logger.error(f"Error listing sync_events partitions: {e}")
+        return 0
+    
+    for row in expired:
+        partition_name = row['partition_name']
+        try:
+            with db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '5s'")
+                    cursor.execute(
+                        sql.SQL("ALTER TABLE sync_events DETACH PARTITION {}").format(sql.Identifier(partition_name))
+                    )
+                    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition_name)))
+                conn.commit()
+            dropped += 1
+            logger.info(f"Dropped expired sync_events partition {partition_name}")
+        except Exception as e:
+            logger.warning(f"Could not drop sync_events partition {partition_name}, will retry next run: {e}")
+    
+    return dropped
+
+def cleanup_old_events(days=SYNC_EVENT_RETENTION_DAYS):
+    """
+    Remove sync events older than specified days
+    Partitioned tables drop whole expired partitions and only DELETE the few
+    stray rows that landed in the default partition
+    
+    Returns:
+        Rows deleted plus partitions dropped
+    """
+    try:
+        if is_sync_events_partitioned():
+            ensure_sync_event_partitions()
+            partitions_dropped = drop_expired_sync_event_partitions(days)
+            select_ids = """
+            SELECT id FROM sync_events_default
+            WHERE created_at < NOW() - make_interval(days => %s)
+            """
+            stats = batched_delete('cleanup_sync_events', 'sync_events_default', select_ids, (days,))
+            logger.info(f"Dropped {partitions_dropped} sync_events partitions, deleted {stats['rows']} stray rows")
+            return stats['rows'] + partitions_dropped
+        
+        # Unpartitioned table: delete in small batches to keep locks short
+        select_ids = """
+        SELECT id FROM sync_events
+        WHERE created_at < NOW() - make_interval(days => %s)
         """
-        rows_deleted = db_manager.execute_query(query, (days,))
-        logger.info(f"Cleaned up {rows_deleted} old sync events")
-        return rows_deleted
+        stats = batched_delete('cleanup_sync_events', 'sync_events', select_ids, (days,))
+        return stats['rows']
     except Exception as e:
         logger.error(f"Error cleaning up old events: {e}")
         return 0
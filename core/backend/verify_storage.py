@@ -1,76 +1,218 @@
 """
-Verify database state - check files with storage_blob vs storage_path
+Verify Storage - check every stored object against its files row
+Existence, size and SHA-256 are checked for each file with a storage_path;
+hashing runs in a process pool so large volumes use every core and disk.
+
+Usage:
+    python verify_storage.py                         # verify everything
+    python verify_storage.py --workers 8 --io-concurrency 32
+    python verify_storage.py --no-checksum           # existence and size only
+    python verify_storage.py --update --json summary.json
 """
-from database import db_manager
-
-print("=" * 70)
-print("CryptoVault File Storage Analysis")
-print("=" * 70)
-
-with db_manager.get_connection() as conn:
-    cursor = conn.cursor()
-    
-    # Check total files
-    cursor.execute("SELECT COUNT(*) FROM files")
-    total_files = cursor.fetchone()[0]
-    print(f"\n📊 Total Files: {total_files}")
-    
-    # Check files with storage_blob (old system)
-    cursor.execute("SELECT COUNT(*) FROM files WHERE storage_blob IS NOT NULL")
-    blob_files = cursor.fetchone()[0]
-    print(f"   🗄️  Files with storage_blob (old): {blob_files}")
-    
-    # Check files with storage_path (new system)
-    cursor.execute("SELECT COUNT(*) FROM files WHERE storage_path IS NOT NULL")
-    path_files = cursor.fetchone()[0]
-    print(f"   📁 Files with storage_path (new): {path_files}")
-    
-    # Check files with both
-    cursor.execute("SELECT COUNT(*) FROM files WHERE storage_blob IS NOT NULL AND storage_path IS NOT NULL")
-    both_files = cursor.fetchone()[0]
-    print(f"   🔄 Files with both: {both_files}")
-    
-    # Check files with neither (should be 0!)
-    cursor.execute("SELECT COUNT(*) FROM files WHERE storage_blob IS NULL AND storage_path IS NULL")
-    neither_files = cursor.fetchone()[0]
-    print(f"   ⚠️  Files with neither: {neither_files}")
-    
-    if neither_files > 0:
-        print(f"\n⚠️  WARNING: {neither_files} files have no storage method!")
-        cursor.execute("""
-            SELECT id, original_filename, owner_id, created_at 
-            FROM files 
-            WHERE storage_blob IS NULL AND storage_path IS NULL
-            LIMIT 5
-        """)
-        orphaned = cursor.fetchall()
-        print("\nOrphaned files:")
-        for file in orphaned:
-            print(f"  - {file[1]} (ID: {file[0]}, Owner: {file[2]}, Created: {file[3]})")
-    
-    # Show recent files
-    print(f"\n📋 Recent Files (last 5):")
-    cursor.execute("""
-        SELECT 
-            id, 
-            original_filename, 
-            size_bytes,
-            CASE 
-                WHEN storage_path IS NOT NULL AND storage_blob IS NOT NULL THEN 'BOTH'
-                WHEN storage_path IS NOT NULL THEN 'LOCAL'
-                WHEN storage_blob IS NOT NULL THEN 'DATABASE'
-                ELSE 'NONE'
-            END as storage_type,
-            created_at
-        FROM files 
-        ORDER BY created_at DESC 
-        LIMIT 5
-    """)
-    recent = cursor.fetchall()
-    for file in recent:
-        print(f"   • {file[1]}")
-        print(f"     Size: {file[2]} bytes | Storage: {file[3]} | Created: {file[4]}")
-    
-print("\n" + "=" * 70)
-print("✅ Analysis Complete")
-print("=" * 70)
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.checksums import verify_stored_file
+
+# Problems listed individually in the summary
+MAX_REPORTED = 100
+
+def verify_object(file_id, storage_path, size_bytes, checksum_sha256, hash_file):
+    """Process pool task: verify one object (no database access in workers)"""
+    try:
+        status, checksum, read = verify_stored_file(storage_path, size_bytes, checksum_sha256, hash_file=hash_file)
+        return file_id, storage_path, status, checksum, read, None
+    except OSError as e:
+        return file_id, storage_path, 'error', None, 0, str(e)
+
+def count_storage_methods(db_manager):
+    """Row counts per storage method (database blob vs local file)"""
+    query = """
+    SELECT
+        COUNT(*) AS total_files,
+        COUNT(*) FILTER (WHERE storage_blob IS NOT NULL) AS blob_files,
+        COUNT(*) FILTER (WHERE storage_path IS NOT NULL) AS path_files,
+        COUNT(*) FILTER (WHERE storage_blob IS NOT NULL AND storage_path IS NOT NULL) AS both_files,
+        COUNT(*) FILTER (WHERE storage_blob IS NULL AND storage_path IS NULL) AS neither_files
+    FROM files
+    """
+    return dict(db_manager.execute_one(query))
+
+def iter_stored_files(db_manager, include_deleted=False):
+    """Stream (id, storage_path, size_bytes, checksum_sha256) with a server-side cursor"""
+    query = """
+    SELECT id, storage_path, size_bytes, checksum_sha256
+    FROM files
+    WHERE storage_path IS NOT NULL
+    """
+    if not include_deleted:
+        query += " AND status = 'active'"
+    with db_manager.get_connection() as conn:
+        with conn.cursor(name='verify_storage') as cursor:
+            cursor.itersize = 2000
+            cursor.execute(query)
+            for row in cursor:
+                yield row
+        conn.commit()
+
+def record_results(db_manager, results):
+    """Write integrity_status (and baseline checksums) back to the files rows"""
+    for file_id, status, checksum in results:
+        if status == 'error':
+            continue
+        db_manager.execute_query(
+            """
+            UPDATE files
+            SET integrity_status = %s,
+                checksum_sha256 = COALESCE(checksum_sha256, %s),
+                checksum_verified_at = NOW()
+            WHERE id = %s
+            """,
+            (status, checksum, file_id)
+        )
+
+def verify_storage(workers=None, io_concurrency=None, hash_files=True, update=False,
+                   include_deleted=False, quiet=False):
+    """
+    Verify all stored objects
+
+    Args:
+        workers: Hashing processes (default: CPU count)
+        io_concurrency: Files read at once across all workers (default: 2 x workers)
+        hash_files: False to check existence and size only
+        update: Record results on the files rows
+        include_deleted: Also verify soft-deleted files
+        quiet: Don't print problems as they are found
+
+    Returns:
+        Summary dict
+    """
+    from database import db_manager
+
+    workers = workers or os.cpu_count() or 1
+    io_concurrency = max(io_concurrency or workers * 2, workers)
+
+    summary = {
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'workers': workers,
+        'io_concurrency': io_concurrency,
+        'checksums': hash_files,
+        'rows': count_storage_methods(db_manager),
+        'verified': 0,
+        'bytes_hashed': 0,
+        'ok': 0,
+        'unverified': 0,
+        'mismatch': 0,
+        'missing': 0,
+        'error': 0,
+        'problems': []
+    }
+    started = time.monotonic()
+    pending_updates = []
+
+    def collect(future):
+        file_id, storage_path, status, checksum, read, error = future.result()
+        summary['verified'] += 1
+        summary['bytes_hashed'] += read
+        summary[status] += 1
+        if status in ('mismatch', 'missing', 'error'):
+            if len(summary['problems']) < MAX_REPORTED:
+                summary['problems'].append({
+                    'file_id': str(file_id),
+                    'storage_path': storage_path,
+                    'status': status,
+                    'error': error
+                })
+            if not quiet:
+                print(f"   ❌ {status.upper()}: {storage_path} (file {file_id}){f' - {error}' if error else ''}")
+        if update:
+            pending_updates.append((file_id, status, checksum))
+            if len(pending_updates) >= 500:
+                record_results(db_manager, pending_updates)
+                pending_updates.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for file_id, storage_path, size_bytes, checksum_sha256 in iter_stored_files(db_manager, include_deleted):
+            # Bound the number of files being read at once (and memory for queued rows)
+            if len(in_flight) >= io_concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            in_flight.add(pool.submit(
+                verify_object, str(file_id), storage_path, size_bytes, checksum_sha256, hash_files
+            ))
+        for future in wait(in_flight).done:
+            collect(future)
+
+    if pending_updates:
+        record_results(db_manager, pending_updates)
+
+    elapsed = time.monotonic() - started
+    summary['seconds'] = round(elapsed, 3)
+    summary['bytes_per_second'] = round(summary['bytes_hashed'] / elapsed) if elapsed else 0
+    summary['healthy'] = summary['mismatch'] == 0 and summary['missing'] == 0 and summary['error'] == 0
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify stored files against the database')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Hashing processes (default: CPU count)')
+    parser.add_argument('--io-concurrency', type=int, default=None,
+                        help='Files read at the same time (default: 2 x workers)')
+    parser.add_argument('--no-checksum', action='store_true',
+                        help='Only check existence and size')
+    parser.add_argument('--update', action='store_true',
+                        help='Record integrity_status on the files rows')
+    parser.add_argument('--include-deleted', action='store_true',
+                        help='Also verify soft-deleted files')
+    parser.add_argument('--json', metavar='PATH',
+                        help="Write the JSON summary to PATH ('-' prints only the JSON)")
+    args = parser.parse_args(argv)
+
+    json_only = args.json == '-'
+    if not json_only:
+        print("=" * 70)
+        print("CryptoVault Storage Verification")
+        print("=" * 70)
+
+    summary = verify_storage(
+        workers=args.workers,
+        io_concurrency=args.io_concurrency,
+        hash_files=not args.no_checksum,
+        update=args.update,
+        include_deleted=args.include_deleted,
+        quiet=json_only
+    )
+
+    if json_only:
+        print(json.dumps(summary, indent=2, default=str))
+    else:
+        rows = summary['rows']
+        print(f"\n📊 Total Files: {rows['total_files']}")
+        print(f"   🗄️  Files with storage_blob (old): {rows['blob_files']}")
+        print(f"   📁 Files with storage_path (new): {rows['path_files']}")
+        print(f"   ⚠️  Files with neither: {rows['neither_files']}")
+        print(f"\n🔍 Verified {summary['verified']} objects in {summary['seconds']}s "
+              f"({summary['bytes_per_second']} bytes/s, {summary['workers']} workers)")
+        print(f"   ✅ OK: {summary['ok']}  ❔ No checksum: {summary['unverified']}")
+        print(f"   ❌ Mismatch: {summary['mismatch']}  Missing: {summary['missing']}  Errors: {summary['error']}")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2, default=str)
+            print(f"\n📝 JSON summary written to {args.json}")
+        print("\n" + "=" * 70)
+
+    return 0 if summary['healthy'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -111,7 +111,7 @@ const ProfileDropdown: React.FC<ProfileDropdownProps> = ({
       >
         <Avatar className="w-8 h-8">
           {photoUrl ? (
-            <AvatarImage src={`${API_URL}${photoUrl}?t=${Date.now()}`} alt={username} />
+            <AvatarImage src={`${API_URL}${photoUrl}?size=64`} alt={username} />
           ) : (
             <AvatarFallback className="bg-indigo-600 text-white text-sm">
               {userInitials}
@@ -146,7 +146,7 @@ const ProfileDropdown: React.FC<ProfileDropdownProps> = ({
               <div className="flex items-center gap-3">
                 <Avatar className="w-10 h-10">
                   {photoUrl ? (
-                    <AvatarImage src={`${API_URL}${photoUrl}?t=${Date.now()}`} alt={username} />
+                    <AvatarImage src={`${API_URL}${photoUrl}?size=128`} alt={username} />
                   ) : (
                     <AvatarFallback className="bg-indigo-600 text-white">
                       {userInitials}
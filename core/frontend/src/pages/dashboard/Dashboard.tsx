@@ -164,7 +164,8 @@ const Dashboard: React.FC = () => {
 
       // Fetch all data in parallel for faster loading
       const [filesResponse, sharingResponse, storageResponse, sharedWithMeResponse, sharedByMeResponse] = await Promise.allSettled([
-        apiRequest('/files/list'),
+        // Only the owned files' fields the widgets show (shared files come from /shared)
+        apiRequest('/files/list?include=owned_files,owned_storage&fields=id,original_filename,size_bytes,algo,created_at,access_type'),
         apiRequest('/shares/stats'),
         apiRequest('/files/quota'),
         apiRequest('/shared?view=received&page=1&per_page=2'),
@@ -467,18 +468,25 @@ const Dashboard: React.FC = () => {
       console.log('💾 Storage changed - refreshing dashboard...');
       fetchDashboardData();
     };
+    
+    const handleResyncRequired = () => {
+      console.log('🔄 Missed updates - reloading dashboard...');
+      fetchDashboardData();
+    };
 
     // Listen to multiple events
     window.addEventListener('fileUploaded', handleFileUploaded);
     window.addEventListener('fileDeleted', handleFileDeleted);
     window.addEventListener('fileShared', handleFileShared);
     window.addEventListener('storageChanged', handleStorageChange);
+    window.addEventListener('resyncRequired', handleResyncRequired);
     
     return () => {
       window.removeEventListener('fileUploaded', handleFileUploaded);
       window.removeEventListener('fileDeleted', handleFileDeleted);
       window.removeEventListener('fileShared', handleFileShared);
       window.removeEventListener('storageChanged', handleStorageChange);
+      window.removeEventListener('resyncRequired', handleResyncRequired);
     };
   }, []);
 
@@ -162,10 +162,18 @@ const FilesPage: React.FC = () => {
       fetchFiles(); // Refresh the files list when a new file is uploaded
     };
 
+    // Updates were missed (e.g. offline past the replay window): reload the whole list
+    const handleResyncRequired = () => {
+      console.log('🔄 Missed updates, reloading list...');
+      fetchFiles();
+    };
+
     window.addEventListener('fileUploaded', handleFileUploaded);
+    window.addEventListener('resyncRequired', handleResyncRequired);
     
     return () => {
       window.removeEventListener('fileUploaded', handleFileUploaded);
+      window.removeEventListener('resyncRequired', handleResyncRequired);
     };
   }, []);
 
@@ -388,11 +388,12 @@ const Profile: React.FC = () => {
         },
       });
 
-      if (response.data.success) {
+      // 202: the account is deactivated now, files and shares are removed in the background
+      if (response.data.success && response.data.deletion) {
         // Clear all data
         localStorage.clear();
 
-        toast.success('Your account has been deleted successfully.');
+        toast.success('Your account has been deleted. Your files are being removed in the background.');
 
         // Redirect to login after a short delay
         setTimeout(() => {
@@ -411,7 +412,7 @@ const Profile: React.FC = () => {
   const getProfilePhotoUrl = () => {
     if (previewPhoto) return previewPhoto;
     if (profileData.profilePhoto) {
-      return `${API_URL}${profileData.profilePhoto}?t=${Date.now()}`;
+      return `${API_URL}${profileData.profilePhoto}`;
     }
     return null;
   };
@@ -47,6 +47,13 @@ const SharedFiles: React.FC = () => {
     loadSharedFiles();
   }, [viewMode, page]);
 
+  // Updates were missed (e.g. offline past the replay window): reload the current view
+  useEffect(() => {
+    const handleResyncRequired = () => loadSharedFiles();
+    window.addEventListener('resyncRequired', handleResyncRequired);
+    return () => window.removeEventListener('resyncRequired', handleResyncRequired);
+  }, [viewMode, page]);
+
   const loadSharedFiles = async () => {
     setLoading(true);
     setError('');
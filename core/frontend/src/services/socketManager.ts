@@ -13,15 +13,24 @@ const RECONNECT_DELAY = 3000; // 3 seconds
 export type SyncEventType = 
   | 'file_uploaded'
   | 'file_deleted'
+  | 'file_restored'
   | 'file_shared'
   | 'file_unshared'
+  | 'share_updated'
   | 'file_downloaded'
   | 'metadata_updated'
-  | 'analytics_updated';
+  | 'analytics_updated'
+  | 'account_deletion_progress';
 
 export interface SyncEventPayload {
   file_id?: string;
+  // Bulk events, and bursts merged by the server (coalesced: true)
   file_ids?: string[];
+  coalesced?: boolean;
+  count?: number;
+  ids_truncated?: number;
+  first_at?: string;
+  last_at?: string;
   filename?: string;
   size_bytes?: number;
   content_type?: string;
@@ -35,20 +44,40 @@ export interface SyncEventPayload {
 
 export interface SyncEvent {
   event_id: string;
+  seq?: number;
   type: SyncEventType;
   user_id: number;
   timestamp: string;
   payload: SyncEventPayload;
 }
 
+export interface ResyncRequest {
+  reason: string;
+  server_time: string;
+}
+
 type EventHandler = (event: SyncEvent) => void;
 
+/**
+ * Files an event is about: `file_id` for single events, `file_ids` for bulk
+ * and coalesced ones (a coalesced burst may list fewer ids than its `count`)
+ */
+export function eventFileIds(event: SyncEvent): string[] {
+  const { file_id, file_ids } = event.payload;
+  if (Array.isArray(file_ids)) return file_ids;
+  return file_id ? [file_id] : [];
+}
+type ResyncHandler = (request: ResyncRequest) => void;
+
 class SocketManager {
   private socket: Socket | null = null;
   private token: string | null = null;
   private eventHandlers: Map<SyncEventType | 'any', EventHandler[]> = new Map();
   private pollingInterval: number | null = null;
   private lastSyncTimestamp: string | null = null;
+  private lastSeq: number | null = null;
+  private lastEventId: string | null = null;
+  private resyncHandlers: ResyncHandler[] = [];
   private reconnectAttempts = 0;
   private isConnecting = false;
   private processedEventIds = new Set<string>();
@@ -56,6 +85,9 @@ class SocketManager {
   constructor() {
     // Load last sync timestamp from localStorage
     this.lastSyncTimestamp = localStorage.getItem('lastSyncTimestamp') || new Date().toISOString();
+    const storedSeq = localStorage.getItem('lastSyncSeq');
+    this.lastSeq = storedSeq ? Number(storedSeq) : null;
+    this.lastEventId = localStorage.getItem('lastSyncEventId');
   }
   
   /**
@@ -72,7 +104,12 @@ class SocketManager {
     
     try {
       this.socket = io(SOCKET_URL, {
-        auth: { token },
+        // Evaluated on every (re)connect so the server can replay what we missed
+        auth: (cb) => cb({
+          token: this.token,
+          last_seq: this.lastSeq,
+          last_event_id: this.lastEventId,
+        }),
         transports: ['websocket', 'polling'],
         reconnection: true,
         reconnectionAttempts: RECONNECT_ATTEMPTS,
@@ -101,8 +138,11 @@ class SocketManager {
       this.reconnectAttempts = 0;
       this.stopPolling();
       
-      // Fetch missed events since last connection
-      this.fetchMissedEvents();
+      // The server replays missed events when it knows our last sequence;
+      // otherwise fall back to fetching by timestamp
+      if (this.lastSeq === null) {
+        this.fetchMissedEvents();
+      }
     });
     
     this.socket.on('disconnect', (reason) => {
@@ -130,7 +170,20 @@ class SocketManager {
     this.socket.on('reconnect', (attemptNumber) => {
       console.log(`SocketManager: Reconnected after ${attemptNumber} attempts`);
       this.reconnectAttempts = 0;
-      this.fetchMissedEvents();
+      if (this.lastSeq === null) {
+        this.fetchMissedEvents();
+      }
+    });
+    
+    // Missed events were replayed after a reconnect
+    this.socket.on('replay_complete', (data: { count: number; last_seq: number | null }) => {
+      console.log(`SocketManager: Replayed ${data.count} missed events`);
+    });
+    
+    // Gap is too large to replay - listings must be refetched in full
+    this.socket.on('resync_required', (request: ResyncRequest) => {
+      console.log('SocketManager: Full resync required:', request.reason);
+      this.handleResyncRequired(request);
     });
     
     // Listen for sync events
@@ -162,6 +215,14 @@ class SocketManager {
     this.lastSyncTimestamp = event.timestamp;
     localStorage.setItem('lastSyncTimestamp', event.timestamp);
     
+    // Track the last sequence seen so a reconnect can resume from it
+    if (typeof event.seq === 'number' && (this.lastSeq === null || event.seq > this.lastSeq)) {
+      this.lastSeq = event.seq;
+      this.lastEventId = event.event_id;
+      localStorage.setItem('lastSyncSeq', String(event.seq));
+      localStorage.setItem('lastSyncEventId', event.event_id);
+    }
+    
     // Call event-specific handlers
     const specificHandlers = this.eventHandlers.get(event.type) || [];
     specificHandlers.forEach(handler => {
@@ -189,6 +250,39 @@ class SocketManager {
     }
   }
   
+  /**
+   * Notify listeners that their cached listings are stale, then fetch whatever
+   * the event log still holds since our last timestamp
+   */
+  private handleResyncRequired(request: ResyncRequest): void {
+    // Sequences are no longer usable; fall back to timestamps until the next event
+    this.lastSeq = null;
+    this.lastEventId = null;
+    localStorage.removeItem('lastSyncSeq');
+    localStorage.removeItem('lastSyncEventId');
+    
+    this.resyncHandlers.forEach(handler => {
+      try {
+        handler(request);
+      } catch (error) {
+        console.error('SocketManager: Error in resync handler:', error);
+      }
+    });
+    
+    // Views listen for this like 'fileUploaded' and reload their listings in full,
+    // which covers the events past the replay horizon
+    window.dispatchEvent(new CustomEvent('resyncRequired', { detail: request }));
+    
+    this.fetchMissedEvents();
+  }
+  
+  /**
+   * Register a handler called when the full listing must be refetched
+   */
+  onResyncRequired(handler: ResyncHandler): void {
+    this.resyncHandlers.push(handler);
+  }
+  
   /**
    * Register event handler
    */
@@ -0,0 +1,134 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Shared helpers for the tests that run against a live backend:
+test users, encrypted-looking uploads and result recording.
+"""
+
+import requests
+import json
+import base64
+import os
+import time
+
+BASE_URL = "http://localhost:5000/api"
+
+class LiveApiTest:
+    """Base class for live-backend test suites"""
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def headers(self, user):
+        """Authorization header for a logged-in test user."""
+        return {'Authorization': f"Bearer {user['token']}"}
+
+    def register_and_login(self, prefix):
+        """Register and log in a test user; returns {username, token, id} or None."""
+        suffix = f"{int(time.time())}_{os.urandom(3).hex()}"
+        user_data = {
+            "username": f"{prefix}_{suffix}",
+            "email": f"{prefix}_{suffix}@test.com",
+            "password": "Test@1234"
+        }
+
+        response = self.session.post(f"{BASE_URL}/auth/register", json=user_data)
+        if response.status_code != 201:
+            print(f"  ✗ Registration failed: {response.status_code}")
+            return None
+
+        login_response = self.session.post(f"{BASE_URL}/auth/login", json={
+            "email": user_data["email"],
+            "password": user_data["password"]
+        })
+        if login_response.status_code != 200:
+            print(f"  ✗ Login failed: {login_response.status_code}")
+            return None
+
+        data = login_response.json()
+        return {
+            'username': user_data["username"],
+            'token': data.get('access_token'),
+            'id': data.get('user', {}).get('id')
+        }
+
+    def upload_file(self, user, filename):
+        """Upload a small encrypted-looking blob; returns the file id or None."""
+        metadata = {
+            'originalFilename': filename,
+            'ivBase64': base64.b64encode(os.urandom(12)).decode(),
+            'algo': 'AES-256-GCM'
+        }
+        files = {'file': (filename, os.urandom(256), 'application/octet-stream')}
+
+        response = self.session.post(
+            f"{BASE_URL}/files/",
+            files=files,
+            data={'metadata': json.dumps(metadata)},
+            headers=self.headers(user)
+        )
+        if response.status_code != 201:
+            print(f"  ✗ Upload failed: {response.status_code}")
+            print(f"  Response: {response.text}")
+            return None
+        return str(response.json().get('id'))
+
+    def owned_file_ids(self, user):
+        """Ids of the files a user owns, as listed by /files/list."""
+        response = self.session.get(
+            f"{BASE_URL}/files/list?include=files&fields=id",
+            headers=self.headers(user)
+        )
+        if response.status_code != 200:
+            return set()
+        return {f['id'] for f in response.json().get('files', [])}
+
+    def shared_permissions(self, user):
+        """file id -> permission for the files shared with a user."""
+        response = self.session.get(
+            f"{BASE_URL}/files/list?include=shared_files&fields=id,permission",
+            headers=self.headers(user)
+        )
+        if response.status_code != 200:
+            return {}
+        return {f['id']: f.get('permission') for f in response.json().get('shared_files', [])}
+
+    def check(self, name, response, expected_status, condition=True):
+        """Print and record one endpoint check."""
+        if response.status_code == expected_status and condition:
+            print(f"  ✓ PASSED - {name}")
+            return (name, 'PASSED')
+        print(f"  ✗ FAILED - {name}")
+        print(f"  Status Code: {response.status_code} (expected {expected_status})")
+        print(f"  Response: {response.text[:500]}")
+        return (name, 'FAILED')
+
+def print_summary(title, all_results):
+    """Print the summary of a live-backend suite; returns True when every test passed."""
+    print("\n" + "=" * 80)
+    print(f"{title} TEST SUMMARY")
+    print("=" * 80)
+
+    passed = sum(1 for _, status in all_results if status == 'PASSED')
+    failed = sum(1 for _, status in all_results if status == 'FAILED')
+    total = len(all_results)
+
+    print(f"Total Tests: {total}")
+    print(f"Passed: {passed}")
+    print(f"Failed: {failed}")
+    if total > 0:
+        print(f"Success Rate: {(passed/total)*100:.1f}%")
+    print()
+
+    print("Detailed Results:")
+    print("-" * 80)
+    for test_name, status in all_results:
+        symbol = "✓" if status == 'PASSED' else "✗"
+        print(f"{symbol} {test_name:45} {status}")
+
+    print("\n" + "=" * 80)
+    print(f"ALL {title} TESTS COMPLETED")
+    print("=" * 80)
+    print()
+
+    return failed == 0 and total > 0
@@ -107,6 +107,71 @@ def run_integrity_tests():
         print(f"✗ Error running integrity tests: {str(e)}")
         return False
 
+def run_feature_endpoint_tests():
+    """Run tests of individual API features."""
+    print_module_header("MODULE 6: FEATURE ENDPOINTS", "Testing trash, bulk sharing, batching, groups and profile photos")
+    
+    print("NOTE: This test requires the backend API to be running.")
+    print("      Make sure Flask backend is running on localhost:5000")
+    print()
+    response = input("Backend is running? (y/n): ").strip().lower()
+    
+    if response == 'y':
+        try:
+            import test_trash
+            passed = test_trash.run_trash_tests()
+            import test_batch
+            passed = test_batch.run_batch_tests() and passed
+            import test_bulk_sharing
+            passed = test_bulk_sharing.run_bulk_sharing_tests() and passed
+            import test_groups
+            passed = test_groups.run_group_tests() and passed
+            import test_profile_photos
+            passed = test_profile_photos.run_profile_photo_tests() and passed
+            return passed
+        except Exception as e:
+            print(f"✗ Error running feature endpoint tests: {str(e)}")
+            return False
+    else:
+        print("⊗ SKIPPED - Backend not running")
+        return None
+
+def run_storage_media_tests():
+    """Run storage and media tests that need no backend."""
+    print_module_header("MODULE 7: STORAGE & MEDIA", "Testing storage and media helpers without a backend")
+    
+    try:
+        import test_storage_reconciler
+        passed = test_storage_reconciler.run_reconciler_tests()
+        import test_checksums
+        passed = test_checksums.run_checksum_tests() and passed
+        import test_photo_variants
+        passed = test_photo_variants.run_photo_variant_tests() and passed
+        return passed
+    except Exception as e:
+        print(f"✗ Error running storage & media tests: {str(e)}")
+        return False
+
+def run_socketio_queue_tests():
+    """Run Socket.IO message queue tests."""
+    print_module_header("MODULE 8: SOCKET.IO MESSAGE QUEUE", "Testing the PostgreSQL LISTEN/NOTIFY relay between workers")
+    
+    print("NOTE: This test requires PostgreSQL to be running.")
+    print("      Set TEST_DATABASE_URL if it is not the default local database")
+    print()
+    response = input("PostgreSQL is running? (y/n): ").strip().lower()
+    
+    if response == 'y':
+        try:
+            import test_socketio_queue
+            return test_socketio_queue.run_socketio_queue_tests()
+        except Exception as e:
+            print(f"✗ Error running Socket.IO message queue tests: {str(e)}")
+            return False
+    else:
+        print("⊗ SKIPPED - PostgreSQL not running")
+        return None
+
 def print_final_summary(results, start_time):
     """Print final test summary."""
     end_time = time.time()
@@ -129,7 +194,10 @@ def print_final_summary(results, start_time):
         ("Module 2: Key Management", results[1]),
         ("Module 3: Sharing & Permissions", results[2]),
         ("Module 4: Security Testing", results[3]),
-        ("Module 5: Data Integrity", results[4])
+        ("Module 5: Data Integrity", results[4]),
+        ("Module 6: Feature Endpoints", results[5]),
+        ("Module 7: Storage & Media", results[6]),
+        ("Module 8: Socket.IO Message Queue", results[7])
     ]
     
     for module_name, result in modules:
@@ -194,7 +262,10 @@ def save_test_report(results, start_time):
                 "Module 2: Key Management",
                 "Module 3: Sharing & Permissions",
                 "Module 4: Security Testing",
-                "Module 5: Data Integrity"
+                "Module 5: Data Integrity",
+                "Module 6: Feature Endpoints",
+                "Module 7: Storage & Media",
+                "Module 8: Socket.IO Message Queue"
             ]
             
             for i, module_name in enumerate(modules):
@@ -240,6 +311,9 @@ def main():
     results.append(run_sharing_permission_tests())
     results.append(run_security_tests())
     results.append(run_integrity_tests())
+    results.append(run_feature_endpoint_tests())
+    results.append(run_storage_media_tests())
+    results.append(run_socketio_queue_tests())
     
     # Print summary
     print_final_summary(results, start_time)
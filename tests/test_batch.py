@@ -0,0 +1,133 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 6: Feature Endpoints - Request Batching
+
+Tests running several GET requests in one round trip through /api/batch,
+and the sub-requests it refuses. Requires the backend API.
+"""
+
+from live_api import BASE_URL, LiveApiTest, print_summary
+
+class TestBatch(LiveApiTest):
+    def __init__(self):
+        super().__init__()
+        self.owner = None
+        self.file_id = None
+
+    def setup(self):
+        """Register a user and upload a file."""
+        print("=" * 80)
+        print("TEST 1: SETUP (USER & FILE)")
+        print("=" * 80)
+        print()
+
+        try:
+            self.owner = self.register_and_login("batch_owner")
+            if self.owner:
+                self.file_id = self.upload_file(self.owner, "batch_test.bin")
+            if self.file_id:
+                print(f"  ✓ User registered, file uploaded: {self.file_id}")
+                return [('Setup', 'PASSED')]
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+        return [('Setup', 'FAILED')]
+
+    def batch(self, subs):
+        """POST a list of sub-requests to /api/batch."""
+        return self.session.post(f"{BASE_URL}/batch", headers=self.headers(self.owner), json={'requests': subs})
+
+    def test_batch(self):
+        """Test that sub-requests run in order with their own statuses."""
+        print("\n" + "=" * 80)
+        print("TEST 2: REQUEST BATCHING")
+        print("=" * 80)
+        print()
+
+        results = []
+        try:
+            print("1. Batching a listing and the trash...")
+            response = self.batch([
+                {'id': 'files', 'path': '/api/files/list?include=file_counts'},
+                {'id': 'trash', 'path': '/api/files/trash'}
+            ])
+            responses = response.json().get('responses', []) if response.ok else []
+            results.append(self.check(
+                'Batch Requests', response, 200,
+                [r.get('id') for r in responses] == ['files', 'trash']
+                and all(r.get('status') == 200 for r in responses)
+            ))
+
+            print("\n2. A failing sub-request does not fail the batch...")
+            response = self.batch([
+                {'id': 'missing', 'path': '/api/groups/999999999'},
+                {'id': 'files', 'path': '/api/files/list?include=files&fields=id'}
+            ])
+            responses = response.json().get('responses', []) if response.ok else []
+            results.append(self.check(
+                'Sub-Request Errors Reported Per Entry', response, 200,
+                len(responses) == 2 and responses[0].get('status') == 404
+                and responses[1].get('status') == 200
+            ))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Batch Requests', 'FAILED'))
+
+        return results
+
+    def test_rejected(self):
+        """Test the sub-requests a batch refuses as a whole."""
+        print("\n" + "=" * 80)
+        print("TEST 3: REJECTED BATCHES")
+        print("=" * 80)
+        print()
+
+        cases = [
+            ('Batch (non-GET rejected)',
+             [{'method': 'DELETE', 'path': f'/api/files/{self.file_id}'}]),
+            ('Batch (file download rejected)',
+             [{'path': f'/api/files/{self.file_id}'}]),
+            ('Batch (profile photo rejected)',
+             [{'path': f"/api/users/profile/photo/{self.owner['id']}"}]),
+            ('Batch (nested batch rejected)',
+             [{'path': '/api/batch'}]),
+            ('Batch (empty)', []),
+            ('Batch (too many requests)',
+             [{'path': '/api/files/trash'}] * 21),
+        ]
+
+        results = []
+        try:
+            for index, (name, subs) in enumerate(cases, 1):
+                print(f"{index}. {name}...")
+                results.append(self.check(name, self.batch(subs), 400))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Rejected Batches', 'FAILED'))
+
+        return results
+
+def run_batch_tests():
+    """Run all request batching tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 25 + "CRYPTOVAULT REQUEST BATCHING" + " " * 25 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    print("⚠️  NOTE: Backend must be running on http://localhost:5000")
+    print()
+
+    tester = TestBatch()
+
+    all_results = []
+    all_results.extend(tester.setup())
+
+    if tester.file_id:
+        all_results.extend(tester.test_batch())
+        all_results.extend(tester.test_rejected())
+
+    return print_summary("REQUEST BATCHING", all_results)
+
+if __name__ == "__main__":
+    run_batch_tests()
@@ -0,0 +1,296 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 6: Feature Endpoints - Bulk Sharing
+
+Tests sharing several files with several users in one request, changing
+the permission of many shares and revoking them. Requires the backend API.
+"""
+
+from live_api import BASE_URL, LiveApiTest, print_summary
+
+class TestBulkSharing(LiveApiTest):
+    def __init__(self):
+        super().__init__()
+        self.owner = None
+        self.recipient = None
+        self.member = None
+        self.file_ids = []
+
+    def setup(self):
+        """Register three users and upload two files for the owner."""
+        print("=" * 80)
+        print("TEST 1: SETUP (USERS & FILES)")
+        print("=" * 80)
+        print()
+
+        results = []
+        try:
+            print("1. Registering owner and two recipients...")
+            self.owner = self.register_and_login("share_owner")
+            self.recipient = self.register_and_login("share_recipient")
+            self.member = self.register_and_login("share_member")
+
+            if self.owner and self.recipient and self.member:
+                print("  ✓ Users registered and logged in")
+                results.append(('Users Setup', 'PASSED'))
+            else:
+                results.append(('Users Setup', 'FAILED'))
+                return results
+
+            print("\n2. Uploading test files...")
+            for index in range(2):
+                file_id = self.upload_file(self.owner, f"bulk_share_{index}.bin")
+                if file_id:
+                    self.file_ids.append(file_id)
+
+            if len(self.file_ids) == 2:
+                print(f"  ✓ Uploaded {len(self.file_ids)} files")
+                results.append(('File Upload', 'PASSED'))
+            else:
+                results.append(('File Upload', 'FAILED'))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Setup', 'FAILED'))
+
+        return results
+
+    def test_bulk_share(self):
+        """Test sharing several files with several users at once."""
+        print("\n" + "=" * 80)
+        print("TEST 2: BULK SHARE")
+        print("=" * 80)
+        print()
+
+        results = []
+        url = f"{BASE_URL}/files/bulk-share"
+        headers = self.headers(self.owner)
+        try:
+            print("1. Sharing both files with two users (read)...")
+            response = self.session.post(url, headers=headers, json={
+                'file_ids': self.file_ids,
+                'usernames': [self.recipient['username'], self.member['username']],
+                'permission': 'read'
+            })
+            results.append(self.check(
+                'Bulk Share (read)', response, 200,
+                response.ok and response.json().get('shares_created') == 4
+            ))
+
+            print("\n2. Recipient sees both files...")
+            permissions = self.shared_permissions(self.recipient)
+            if all(permissions.get(file_id) == 'read' for file_id in self.file_ids):
+                print("  ✓ PASSED - Shared files listed with read")
+                results.append(('Recipient Sees Shares', 'PASSED'))
+            else:
+                print(f"  ✗ FAILED - Permissions seen: {permissions}")
+                results.append(('Recipient Sees Shares', 'FAILED'))
+
+            print("\n3. Re-sharing with full_access updates the existing shares...")
+            response = self.session.post(url, headers=headers, json={
+                'file_ids': self.file_ids,
+                'usernames': [self.member['username']],
+                'permission': 'full_access'
+            })
+            body = response.json() if response.ok else {}
+            results.append(self.check(
+                'Bulk Share (full_access)', response, 200,
+                body.get('shares_updated') == 2 and body.get('shares_created') == 0
+            ))
+
+            print("\n4. Unknown users and the owner are reported, the rest shared...")
+            response = self.session.post(url, headers=headers, json={
+                'file_ids': self.file_ids,
+                'usernames': [self.recipient['username'], self.owner['username'], 'no_such_user_bulk'],
+                'permission': 'read'
+            })
+            body = response.json() if response.ok else {}
+            failed = {entry.get('username') for entry in body.get('failed', [])}
+            results.append(self.check(
+                'Bulk Share (partial failure)', response, 200,
+                body.get('shares_updated') == 2
+                and failed == {self.owner['username'], 'no_such_user_bulk'}
+            ))
+
+            print("\n5. Files the caller does not own are not shared...")
+            response = self.session.post(url, headers=self.headers(self.recipient), json={
+                'file_ids': self.file_ids,
+                'usernames': [self.member['username']],
+                'permission': 'read'
+            })
+            body = response.json() if response.ok else {}
+            failed = {entry.get('file_id') for entry in body.get('failed', [])}
+            results.append(self.check(
+                'Bulk Share (not owner)', response, 200,
+                body.get('shares_created') == 0 and body.get('shares_updated') == 0
+                and failed == set(self.file_ids)
+            ))
+
+            print("\n6. Unknown permission is rejected...")
+            response = self.session.post(url, headers=headers, json={
+                'file_ids': self.file_ids,
+                'usernames': [self.recipient['username']],
+                'permission': 'admin'
+            })
+            results.append(self.check('Bulk Share (invalid permission)', response, 400))
+
+            print("\n7. Missing users are rejected...")
+            response = self.session.post(url, headers=headers, json={'file_ids': self.file_ids})
+            results.append(self.check('Bulk Share (no users)', response, 400))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Bulk Share', 'FAILED'))
+
+        return results
+
+    def test_bulk_permission(self):
+        """Test changing the permission of many shares at once."""
+        print("\n" + "=" * 80)
+        print("TEST 3: BULK PERMISSION CHANGE")
+        print("=" * 80)
+        print()
+
+        results = []
+        url = f"{BASE_URL}/files/bulk-permission"
+        headers = self.headers(self.owner)
+        try:
+            print("1. Granting full_access to the recipient on both files...")
+            response = self.session.post(url, headers=headers, json={
+                'usernames': [self.recipient['username']],
+                'permission': 'full_access'
+            })
+            results.append(self.check(
+                'Bulk Permission (full_access)', response, 200,
+                response.ok and response.json().get('updated_count') == 2
+            ))
+
+            print("\n2. Recipient sees the new permission...")
+            permissions = self.shared_permissions(self.recipient)
+            if all(permissions.get(file_id) == 'full_access' for file_id in self.file_ids):
+                print("  ✓ PASSED - Shared files listed with full_access")
+                results.append(('Recipient Sees Permission', 'PASSED'))
+            else:
+                print(f"  ✗ FAILED - Permissions seen: {permissions}")
+                results.append(('Recipient Sees Permission', 'FAILED'))
+
+            print("\n3. Shares that already have the permission are skipped...")
+            response = self.session.post(url, headers=headers, json={
+                'usernames': [self.recipient['username']],
+                'permission': 'full_access'
+            })
+            results.append(self.check(
+                'Bulk Permission (unchanged)', response, 200,
+                response.ok and response.json().get('updated_count') == 0
+            ))
+
+            print("\n4. Narrowing by file and grantee...")
+            response = self.session.post(url, headers=headers, json={
+                'file_ids': [self.file_ids[0]],
+                'grantee_user_ids': [self.member['id']],
+                'permission': 'read'
+            })
+            body = response.json() if response.ok else {}
+            results.append(self.check(
+                'Bulk Permission (file and grantee)', response, 200,
+                body.get('file_ids') == [self.file_ids[0]] and body.get('grantee_user_ids') == [self.member['id']]
+            ))
+
+            print("\n5. Unknown permission is rejected...")
+            response = self.session.post(url, headers=headers, json={
+                'usernames': [self.recipient['username']],
+                'permission': 'owner'
+            })
+            results.append(self.check('Bulk Permission (invalid permission)', response, 400))
+
+            print("\n6. Missing selection is rejected...")
+            response = self.session.post(url, headers=headers, json={'permission': 'read'})
+            results.append(self.check('Bulk Permission (no selection)', response, 400))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Bulk Permission', 'FAILED'))
+
+        return results
+
+    def test_bulk_unshare(self):
+        """Test revoking many shares at once."""
+        print("\n" + "=" * 80)
+        print("TEST 4: BULK UNSHARE")
+        print("=" * 80)
+        print()
+
+        results = []
+        url = f"{BASE_URL}/files/bulk-unshare"
+        headers = self.headers(self.owner)
+        try:
+            print("1. Other users cannot revoke the owner's shares...")
+            response = self.session.post(url, headers=self.headers(self.recipient), json={
+                'file_ids': self.file_ids
+            })
+            results.append(self.check(
+                'Bulk Unshare (not owner)', response, 200,
+                response.ok and response.json().get('revoked_count') == 0
+            ))
+
+            print("\n2. Revoking everything shared with the recipient...")
+            response = self.session.post(url, headers=headers, json={
+                'grantee_user_ids': [self.recipient['id']]
+            })
+            results.append(self.check(
+                'Bulk Unshare', response, 200,
+                response.ok and response.json().get('revoked_count') == 2
+            ))
+
+            print("\n3. Recipient no longer sees the files...")
+            permissions = self.shared_permissions(self.recipient)
+            if not any(file_id in permissions for file_id in self.file_ids):
+                print("  ✓ PASSED - Access revoked")
+                results.append(('Access Revoked', 'PASSED'))
+            else:
+                print(f"  ✗ FAILED - Still shared: {permissions}")
+                results.append(('Access Revoked', 'FAILED'))
+
+            print("\n4. Revoking every share of one file...")
+            response = self.session.post(url, headers=headers, json={'file_ids': [self.file_ids[0]]})
+            body = response.json() if response.ok else {}
+            results.append(self.check(
+                'Bulk Unshare (by file)', response, 200,
+                body.get('revoked_count') == 1 and body.get('grantee_user_ids') == [self.member['id']]
+                and self.file_ids[1] in self.shared_permissions(self.member)
+            ))
+
+            print("\n5. Malformed selections are rejected...")
+            response = self.session.post(url, headers=headers, json={'file_ids': 'not-a-list'})
+            results.append(self.check('Bulk Unshare (invalid selection)', response, 400))
+            response = self.session.post(url, headers=headers, json={'grantee_user_ids': ['not-an-id']})
+            results.append(self.check('Bulk Unshare (invalid grantee ids)', response, 400))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Bulk Unshare', 'FAILED'))
+
+        return results
+
+def run_bulk_sharing_tests():
+    """Run all bulk share, permission change and unshare tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 27 + "CRYPTOVAULT BULK SHARING" + " " * 27 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    print("⚠️  NOTE: Backend must be running on http://localhost:5000")
+    print()
+
+    tester = TestBulkSharing()
+
+    all_results = []
+    all_results.extend(tester.setup())
+
+    if len(tester.file_ids) == 2:
+        all_results.extend(tester.test_bulk_share())
+        all_results.extend(tester.test_bulk_permission())
+        all_results.extend(tester.test_bulk_unshare())
+
+    return print_summary("BULK SHARING", all_results)
+
+if __name__ == "__main__":
+    run_bulk_sharing_tests()
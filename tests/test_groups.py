@@ -0,0 +1,179 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 6: Feature Endpoints - Group Sharing
+
+Tests creating groups, managing their members and sharing files with a
+group instead of with each member. Requires the backend API.
+"""
+
+import time
+
+from live_api import BASE_URL, LiveApiTest, print_summary
+
+class TestGroups(LiveApiTest):
+    def __init__(self):
+        super().__init__()
+        self.owner = None
+        self.recipient = None
+        self.member = None
+        self.file_id = None
+        self.group_id = None
+
+    def setup(self):
+        """Register three users and upload a file for the owner."""
+        print("=" * 80)
+        print("TEST 1: SETUP (USERS & FILE)")
+        print("=" * 80)
+        print()
+
+        try:
+            self.owner = self.register_and_login("group_owner")
+            self.recipient = self.register_and_login("group_recipient")
+            self.member = self.register_and_login("group_member")
+            if self.owner and self.recipient and self.member:
+                self.file_id = self.upload_file(self.owner, "group_test.bin")
+            if self.file_id:
+                print(f"  ✓ Users registered, file uploaded: {self.file_id}")
+                return [('Setup', 'PASSED')]
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+        return [('Setup', 'FAILED')]
+
+    def test_members(self):
+        """Test creating a group and adding members to it."""
+        print("\n" + "=" * 80)
+        print("TEST 2: GROUPS & MEMBERS")
+        print("=" * 80)
+        print()
+
+        results = []
+        headers = self.headers(self.owner)
+        try:
+            print("1. Creating a group with a first member...")
+            response = self.session.post(f"{BASE_URL}/groups", headers=headers, json={
+                'name': f"Test group {int(time.time())}",
+                'usernames': [self.member['username']]
+            })
+            if response.status_code == 201:
+                self.group_id = response.json()['group']['id']
+            results.append(self.check(
+                'Create Group', response, 201,
+                response.status_code == 201 and response.json().get('added') == [self.member['username']]
+            ))
+            if not self.group_id:
+                return results
+
+            print("\n2. Adding the recipient to the group...")
+            response = self.session.post(
+                f"{BASE_URL}/groups/{self.group_id}/members",
+                headers=headers,
+                json={'usernames': [self.recipient['username']]}
+            )
+            results.append(self.check(
+                'Add Group Members', response, 200,
+                response.ok and response.json().get('added') == [self.recipient['username']]
+            ))
+
+            print("\n3. Other users cannot see the group...")
+            response = self.session.get(
+                f"{BASE_URL}/groups/{self.group_id}",
+                headers=self.headers(self.recipient)
+            )
+            results.append(self.check('Group Not Visible To Others', response, 404))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Groups & Members', 'FAILED'))
+
+        return results
+
+    def test_group_sharing(self):
+        """Test that sharing with a group gives exactly its members access."""
+        print("\n" + "=" * 80)
+        print("TEST 3: GROUP SHARING")
+        print("=" * 80)
+        print()
+
+        results = []
+        headers = self.headers(self.owner)
+        group_url = f"{BASE_URL}/groups/{self.group_id}"
+        try:
+            print("1. Sharing a file with the group (full_access)...")
+            response = self.session.post(f"{group_url}/share", headers=headers, json={
+                'file_ids': [self.file_id], 'permission': 'full_access'
+            })
+            results.append(self.check(
+                'Share With Group', response, 200,
+                response.ok and response.json().get('shares_created') == 1
+            ))
+
+            print("\n2. Group members see the file...")
+            if all(self.shared_permissions(user).get(self.file_id) == 'full_access'
+                   for user in (self.recipient, self.member)):
+                print("  ✓ PASSED - Group members can access the shared file")
+                results.append(('Group Member Access', 'PASSED'))
+            else:
+                print("  ✗ FAILED - Shared file not listed for every group member")
+                results.append(('Group Member Access', 'FAILED'))
+
+            print("\n3. Unknown permission is rejected...")
+            response = self.session.post(f"{group_url}/share", headers=headers, json={
+                'file_ids': [self.file_id], 'permission': 'superuser'
+            })
+            results.append(self.check('Share With Group (invalid permission)', response, 400))
+
+            print("\n4. A removed member loses access...")
+            response = self.session.delete(f"{group_url}/members/{self.member['id']}", headers=headers)
+            results.append(self.check(
+                'Remove Group Member', response, 200,
+                self.file_id not in self.shared_permissions(self.member)
+                and self.file_id in self.shared_permissions(self.recipient)
+            ))
+
+            print("\n5. Revoking the group share in bulk...")
+            response = self.session.post(f"{BASE_URL}/files/bulk-unshare", headers=headers, json={
+                'group_ids': [self.group_id]
+            })
+            results.append(self.check(
+                'Bulk Unshare (group)', response, 200,
+                response.ok and response.json().get('group_ids') == [self.group_id]
+                and self.file_id not in self.shared_permissions(self.recipient)
+            ))
+
+            print("\n6. Deleting the group...")
+            response = self.session.delete(group_url, headers=headers)
+            results.append(self.check(
+                'Delete Group', response, 200,
+                self.session.get(group_url, headers=headers).status_code == 404
+            ))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Group Sharing', 'FAILED'))
+
+        return results
+
+def run_group_tests():
+    """Run all group sharing tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 26 + "CRYPTOVAULT GROUP SHARING" + " " * 27 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    print("⚠️  NOTE: Backend must be running on http://localhost:5000")
+    print()
+
+    tester = TestGroups()
+
+    all_results = []
+    all_results.extend(tester.setup())
+
+    if tester.file_id:
+        all_results.extend(tester.test_members())
+        if tester.group_id:
+            all_results.extend(tester.test_group_sharing())
+
+    return print_summary("GROUP SHARING", all_results)
+
+if __name__ == "__main__":
+    run_group_tests()
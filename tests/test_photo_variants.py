@@ -0,0 +1,177 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 7: Storage & Media - Profile Photo Variants
+
+Tests rendering of uploaded profile photos into every avatar size and
+format, variant storage, and the choice of variant for a requested size.
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Backend modules are imported directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core' / 'backend'))
+
+from PIL import Image
+
+from utils.images import (
+    PHOTO_FORMATS, PHOTO_SIZES, content_version, output_formats, pick_size,
+    process_photo, remove_variants, render_variants, save_variants, variant_filename
+)
+
+def encode_image(mode, size, fmt='PNG'):
+    """Encode a synthetic image of the given mode and dimensions."""
+    colors = {'RGB': (200, 40, 40), 'RGBA': (40, 200, 40, 128), 'L': 128, 'P': 3}
+    image = Image.new(mode, size, colors[mode])
+    output = io.BytesIO()
+    image.save(output, format=fmt)
+    return output.getvalue()
+
+def check(name, condition, detail=''):
+    """Print and record one check."""
+    if condition:
+        print(f"  ✓ PASSED - {name}")
+        return (name, 'PASSED')
+    print(f"  ✗ FAILED - {name}")
+    if detail:
+        print(f"  {detail}")
+    return (name, 'FAILED')
+
+def test_pick_size():
+    """Test the variant chosen for a requested display size."""
+    print("=" * 80)
+    print("TEST 1: SIZE SELECTION")
+    print("=" * 80)
+    print()
+
+    cases = {0: 32, 1: 32, 32: 32, 33: 64, 64: 64, 100: 128, 129: 400, 400: 400, 5000: 400}
+    picked = {requested: pick_size(requested) for requested in cases}
+    return [check('Smallest Variant At Least As Large', picked == cases,
+                  f"Expected {cases}, got {picked}")]
+
+def test_render_variants():
+    """Test that every size and format is rendered with the right dimensions."""
+    print("\n" + "=" * 80)
+    print("TEST 2: VARIANT RENDERING")
+    print("=" * 80)
+    print()
+
+    results = []
+    try:
+        print("1. Landscape JPEG (1000x600)...")
+        variants = render_variants(encode_image('RGB', (1000, 600), 'JPEG'))
+        expected_keys = {(size, fmt) for size in PHOTO_SIZES for fmt in output_formats()}
+        results.append(check('Every Size And Format', set(variants) == expected_keys,
+                             f"Rendered {sorted(variants)}"))
+
+        wrong = []
+        for (size, fmt), data in variants.items():
+            image = Image.open(io.BytesIO(data))
+            # Aspect ratio kept, longest side fits the bounding box
+            expected = (size, round(size * 0.6))
+            if image.format != PHOTO_FORMATS[fmt][0] or abs(image.size[1] - expected[1]) > 1 or image.size[0] != size:
+                wrong.append(((size, fmt), image.format, image.size))
+        results.append(check('Dimensions And Formats', not wrong, f"Wrong variants: {wrong}"))
+
+        print("\n2. Small image is not upscaled (50x50)...")
+        variants = render_variants(encode_image('RGB', (50, 50)))
+        sizes = {size: Image.open(io.BytesIO(variants[(size, 'jpeg')])).size for size in PHOTO_SIZES}
+        expected = {size: (min(size, 50), min(size, 50)) for size in PHOTO_SIZES}
+        results.append(check('No Upscaling', sizes == expected, f"Sizes {sizes}"))
+
+        print("\n3. Transparent and palette images...")
+        for mode in ('RGBA', 'P', 'L'):
+            variants = render_variants(encode_image(mode, (120, 80)))
+            modes = {Image.open(io.BytesIO(data)).mode for data in variants.values()}
+            results.append(check(f'{mode} Converted To RGB', modes == {'RGB'}, f"Modes {modes}"))
+
+        print("\n4. Rendering in the process pool...")
+        image_data = encode_image('RGB', (640, 480), 'JPEG')
+        results.append(check('Pool Matches In-Process Rendering',
+                             process_photo(image_data) == render_variants(image_data)))
+
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        results.append(('Variant Rendering', 'FAILED'))
+
+    return results
+
+def test_variant_storage():
+    """Test content versions and saving and removing variants."""
+    print("\n" + "=" * 80)
+    print("TEST 3: VARIANT STORAGE")
+    print("=" * 80)
+    print()
+
+    results = []
+    try:
+        image_data = encode_image('RGB', (300, 300))
+        first = render_variants(image_data)
+        second = render_variants(encode_image('RGBA', (300, 300)))
+        results.append(check('Version Stable For Same Content',
+                             content_version(first) == content_version(render_variants(image_data))))
+        results.append(check('Version Changes With Content', content_version(first) != content_version(second)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            legacy = os.path.join(directory, 'user_7.jpg')
+            with open(legacy, 'wb') as f:
+                f.write(b'legacy')
+
+            save_variants(directory, 7, first)
+            stored = sorted(os.listdir(directory))
+            expected = sorted(variant_filename(7, size, fmt) for size, fmt in first)
+            results.append(check('Variants Saved, Legacy Photo Replaced', stored == expected, f"Stored {stored}"))
+
+            remove_variants(directory, 7)
+            results.append(check('Variants Removed', os.listdir(directory) == [],
+                                 f"Left {os.listdir(directory)}"))
+
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        results.append(('Variant Storage', 'FAILED'))
+
+    return results
+
+def run_photo_variant_tests():
+    """Run all profile photo variant tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 22 + "CRYPTOVAULT PROFILE PHOTO VARIANTS" + " " * 22 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    all_results = []
+    all_results.extend(test_pick_size())
+    all_results.extend(test_render_variants())
+    all_results.extend(test_variant_storage())
+
+    # Summary
+    print("\n" + "=" * 80)
+    print("PROFILE PHOTO VARIANT TEST SUMMARY")
+    print("=" * 80)
+
+    passed = sum(1 for _, status in all_results if status == 'PASSED')
+    total = len(all_results)
+
+    print(f"Total Tests: {total}")
+    print(f"Passed: {passed}")
+    print(f"Failed: {total - passed}")
+    print()
+
+    for test_name, status in all_results:
+        symbol = "✓" if status == 'PASSED' else "✗"
+        print(f"{symbol} {test_name:45} {status}")
+
+    print("\n" + "=" * 80)
+    print("ALL PROFILE PHOTO VARIANT TESTS COMPLETED")
+    print("=" * 80)
+    print()
+
+    return passed == total
+
+if __name__ == "__main__":
+    run_photo_variant_tests()
@@ -0,0 +1,233 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 6: Feature Endpoints - Profile Photo Delivery
+
+Tests caching of profile photos: immutable versioned URLs, revalidated
+unversioned URLs, 304 responses, size selection and the in-memory variant
+cache. Requires the backend API (and its database, for the cache checks).
+"""
+
+import io
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from live_api import BASE_URL, LiveApiTest, print_summary
+
+# Backend modules are imported directly for the cache checks
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core' / 'backend'))
+
+# Photo URLs returned by the API start with /api/
+SERVER_URL = BASE_URL[:-len('/api')]
+
+def encode_png(size, color):
+    """Encode a synthetic square photo."""
+    output = io.BytesIO()
+    Image.new('RGB', (size, size), color).save(output, format='PNG')
+    return output.getvalue()
+
+class TestProfilePhotos(LiveApiTest):
+    def __init__(self):
+        super().__init__()
+        self.user = None
+        self.photo_url = None
+
+    def upload_photo(self, color):
+        """Upload a profile photo; returns the response."""
+        files = {'photo': ('avatar.png', encode_png(600, color), 'image/png')}
+        return self.session.post(f"{BASE_URL}/users/profile/photo", files=files, headers=self.headers(self.user))
+
+    def get_photo(self, url, **headers):
+        """Fetch a photo URL as returned by the API."""
+        return self.session.get(f"{SERVER_URL}{url}", headers={'Accept': 'image/jpeg', **headers})
+
+    def test_upload(self):
+        """Test uploading a photo returns a versioned URL."""
+        print("=" * 80)
+        print("TEST 1: UPLOAD PHOTO")
+        print("=" * 80)
+        print()
+
+        try:
+            self.user = self.register_and_login("photo_user")
+            if not self.user:
+                return [('Upload Photo', 'FAILED')]
+
+            response = self.upload_photo((200, 40, 40))
+            if response.ok:
+                self.photo_url = response.json().get('photo_url')
+            prefix = f"/api/users/profile/photo/{self.user['id']}/"
+            return [self.check('Upload Photo', response, 200,
+                               bool(self.photo_url) and self.photo_url.startswith(prefix))]
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            return [('Upload Photo', 'FAILED')]
+
+    def test_cache_headers(self):
+        """Test immutable versioned URLs, revalidated unversioned ones and 304s."""
+        print("\n" + "=" * 80)
+        print("TEST 2: CACHE HEADERS & CONDITIONAL REQUESTS")
+        print("=" * 80)
+        print()
+
+        results = []
+        unversioned = f"/api/users/profile/photo/{self.user['id']}"
+        try:
+            print("1. Versioned URL is cacheable forever...")
+            response = self.get_photo(self.photo_url)
+            results.append(self.check(
+                'Versioned URL Immutable', response, 200,
+                response.headers.get('Cache-Control') == 'public, max-age=31536000, immutable'
+                and bool(response.headers.get('ETag'))
+                and response.headers.get('Content-Type') == 'image/jpeg'
+            ))
+
+            print("\n2. Unversioned URL must be revalidated...")
+            response = self.get_photo(unversioned)
+            etag = response.headers.get('ETag')
+            results.append(self.check(
+                'Unversioned URL No-Cache', response, 200,
+                response.headers.get('Cache-Control') == 'no-cache' and bool(etag)
+                and 'Accept' in response.headers.get('Vary', '')
+            ))
+
+            print("\n3. Matching If-None-Match returns 304...")
+            response = self.get_photo(unversioned, **{'If-None-Match': etag})
+            results.append(self.check('Not Modified', response, 304, response.content == b''))
+
+            print("\n4. Replacing the photo changes the URL...")
+            response = self.upload_photo((40, 40, 200))
+            new_url = response.json().get('photo_url') if response.ok else None
+            results.append(self.check('New Version URL', response, 200, bool(new_url) and new_url != self.photo_url))
+
+            print("\n5. Old ETag no longer matches...")
+            response = self.get_photo(unversioned, **{'If-None-Match': etag})
+            results.append(self.check('Modified After Replace', response, 200))
+
+            print("\n6. Old versioned URL is no longer immutable...")
+            response = self.get_photo(self.photo_url)
+            results.append(self.check('Old Version Revalidated', response, 200,
+                                      response.headers.get('Cache-Control') == 'no-cache'))
+            self.photo_url = new_url
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Cache Headers', 'FAILED'))
+
+        return results
+
+    def test_size_selection(self):
+        """Test that the smallest variant at least as large as requested is served."""
+        print("\n" + "=" * 80)
+        print("TEST 3: SIZE SELECTION")
+        print("=" * 80)
+        print()
+
+        results = []
+        try:
+            for requested, served in ((20, 32), (50, 64), (128, 128), (1000, 400)):
+                response = self.get_photo(f"{self.photo_url}?size={requested}")
+                size = Image.open(io.BytesIO(response.content)).size if response.ok else None
+                results.append(self.check(f'Size {requested} Served At {served}', response, 200,
+                                          size == (served, served)))
+
+            print("\nWebP when accepted...")
+            response = self.get_photo(self.photo_url, Accept='image/webp,image/*')
+            fmt = Image.open(io.BytesIO(response.content)).format if response.ok else None
+            content_type = response.headers.get('Content-Type')
+            results.append(self.check('Format Follows Accept', response, 200,
+                                      (content_type, fmt) in (('image/webp', 'WEBP'), ('image/jpeg', 'JPEG'))))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Size Selection', 'FAILED'))
+
+        return results
+
+    def test_missing_photo(self):
+        """Test that a user without a photo gets 404."""
+        print("\n" + "=" * 80)
+        print("TEST 4: USER WITHOUT PHOTO")
+        print("=" * 80)
+        print()
+
+        try:
+            other = self.register_and_login("photo_none")
+            response = self.get_photo(f"/api/users/profile/photo/{other['id']}")
+            return [self.check('No Photo', response, 404)]
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            return [('No Photo', 'FAILED')]
+
+def test_photo_cache():
+    """Test the byte-bounded LRU of encoded photo variants."""
+    print("\n" + "=" * 80)
+    print("TEST 5: IN-MEMORY PHOTO CACHE")
+    print("=" * 80)
+    print()
+
+    results = []
+
+    def record(name, condition):
+        print(f"  {'✓ PASSED' if condition else '✗ FAILED'} - {name}")
+        results.append((name, 'PASSED' if condition else 'FAILED'))
+
+    try:
+        from utils.photo_cache import PhotoCache
+
+        def entry(nbytes):
+            return {'data': b'x' * nbytes, 'version': 'v1', 'mimetype': 'image/jpeg', 'etag': 'v1'}
+
+        cache = PhotoCache(max_bytes=100)
+        cache.put((7, 32, False), entry(40))
+        cache.put((7, 64, False), entry(40))
+        cache.get((7, 32, False))  # now most recently used
+        cache.put((8, 32, False), entry(40))
+        record('Least Recently Used Evicted',
+               cache.get((7, 64, False)) is None and cache.get((7, 32, False)) is not None
+               and cache.stats()['bytes'] == 80)
+
+        cache.put((9, 400, False), entry(101))
+        record('Entry Larger Than Cache Not Stored',
+               cache.get((9, 400, False)) is None and cache.stats()['bytes'] == 80)
+
+        cache.put((7, 32, False), entry(10))
+        record('Replacing An Entry Adjusts Size', cache.stats() == {'entries': 2, 'bytes': 50, 'max_bytes': 100})
+
+        cache.invalidate_user(7)
+        record('Invalidate Drops One User',
+               cache.get((7, 32, False)) is None and cache.get((8, 32, False)) is not None
+               and cache.stats()['bytes'] == 40)
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        results.append(('Photo Cache', 'FAILED'))
+
+    return results
+
+def run_profile_photo_tests():
+    """Run all profile photo delivery tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 21 + "CRYPTOVAULT PROFILE PHOTO DELIVERY" + " " * 23 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    print("⚠️  NOTE: Backend must be running on http://localhost:5000")
+    print("⚠️  Database must be initialized and accessible")
+    print()
+
+    tester = TestProfilePhotos()
+
+    all_results = []
+    all_results.extend(tester.test_upload())
+
+    if tester.photo_url:
+        all_results.extend(tester.test_cache_headers())
+        all_results.extend(tester.test_size_selection())
+        all_results.extend(tester.test_missing_photo())
+    all_results.extend(test_photo_cache())
+
+    return print_summary("PROFILE PHOTO DELIVERY", all_results)
+
+if __name__ == "__main__":
+    run_profile_photo_tests()
@@ -0,0 +1,184 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 7: Storage & Media - Storage Reconciliation
+
+Tests the storage walk the reconciler merge-joins against the files table:
+byte ordering (as ORDER BY storage_path COLLATE "C"), resuming after a
+checkpoint key, and pairing files with rows. Runs on a temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Backend modules are imported directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'core' / 'backend'))
+
+from utils.storage_walk import iter_storage_files, merge_join, storage_key
+
+# Paths chosen so that sorting by file or directory name alone disagrees with
+# byte order of the full path: '-' and '.' sort before the separator, '0' after
+# it, upper case before lower case and non-ASCII after ASCII
+TREE = [
+    'alice/files/a-b.enc',
+    'alice/files/a.enc',
+    'alice/files/a/x.enc',
+    'alice/files/a0.enc',
+    'alice/files/B.enc',
+    'alice/files/é.enc',
+    'alice/deleted/old.enc',
+    'alice-2/files/c.enc',
+    'alice.bak/files/d.enc',
+    'alice0/files/e.enc',
+    'top.enc',
+]
+
+# Housekeeping folders at the root are never scanned
+HIDDEN = ['.quarantine/alice/files/orphan.enc']
+
+def build_tree(root):
+    """Create TREE and HIDDEN under root; returns the expected keys in byte order"""
+    for relative in TREE + HIDDEN:
+        path = Path(root, *relative.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'ciphertext')
+    keys = [storage_key(Path(root, *relative.split('/'))) for relative in TREE]
+    # COLLATE "C" compares the UTF-8 bytes
+    return sorted(keys, key=lambda key: key.encode('utf-8'))
+
+def test_walk_order():
+    """Test that files are yielded in byte order of their full key."""
+    print("=" * 80)
+    print("TEST 1: WALK ORDER MATCHES COLLATE \"C\"")
+    print("=" * 80)
+    print()
+
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            expected = build_tree(root)
+            walked = [key for key, _ in iter_storage_files(root)]
+
+            if walked == expected:
+                print(f"  ✓ PASSED - {len(walked)} files in byte order, hidden folders skipped")
+                return [('Walk Order', 'PASSED')]
+            print("  ✗ FAILED - Order differs")
+            print(f"  Expected: {[os.path.relpath(k, root) for k in expected]}")
+            print(f"  Walked:   {[os.path.relpath(k, root) for k in walked]}")
+            return [('Walk Order', 'FAILED')]
+
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        return [('Walk Order', 'FAILED')]
+
+def test_resume_after_checkpoint():
+    """Test that a walk resumed after any key yields exactly the keys that follow it."""
+    print("\n" + "=" * 80)
+    print("TEST 2: RESUME FROM CHECKPOINT")
+    print("=" * 80)
+    print()
+
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            expected = build_tree(root)
+            wrong = []
+            for index, last_key in enumerate(expected):
+                resumed = [key for key, _ in iter_storage_files(root, after=last_key)]
+                if resumed != expected[index + 1:]:
+                    wrong.append(os.path.relpath(last_key, root))
+
+            # A checkpoint on a row whose file is gone still resumes in place
+            missing = storage_key(Path(root, 'alice', 'files', 'a', 'gone.enc'))
+            resumed = [key for key, _ in iter_storage_files(root, after=missing)]
+            if resumed != [key for key in expected if key.encode('utf-8') > missing.encode('utf-8')]:
+                wrong.append(os.path.relpath(missing, root))
+
+            if not wrong:
+                print(f"  ✓ PASSED - Resumed correctly after each of {len(expected) + 1} checkpoints")
+                return [('Resume From Checkpoint', 'PASSED')]
+            print(f"  ✗ FAILED - Wrong files after: {wrong}")
+            return [('Resume From Checkpoint', 'FAILED')]
+
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        return [('Resume From Checkpoint', 'FAILED')]
+
+def test_merge_join():
+    """Test pairing walked files with rows sorted the way the database returns them."""
+    print("\n" + "=" * 80)
+    print("TEST 3: MERGE-JOIN FILES WITH ROWS")
+    print("=" * 80)
+    print()
+
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            expected = build_tree(root)
+            orphan = storage_key(Path(root, 'alice', 'files', 'a0.enc'))
+            missing = storage_key(Path(root, 'alice', 'files', 'a', 'gone.enc'))
+
+            # Every file has a row except the orphan; one row has no file
+            row_keys = sorted([key for key in expected if key != orphan] + [missing],
+                              key=lambda key: key.encode('utf-8'))
+            rows = iter([(key, index) for index, key in enumerate(row_keys)])
+
+            matched, orphans, missing_rows = 0, [], []
+            for file, row in merge_join(iter_storage_files(root), rows):
+                if row is None:
+                    orphans.append(file[0])
+                elif file is None:
+                    missing_rows.append(row[0])
+                else:
+                    matched += 1
+
+            if orphans == [orphan] and missing_rows == [missing] and matched == len(expected) - 1:
+                print(f"  ✓ PASSED - {matched} matched, 1 orphaned file, 1 missing file")
+                return [('Merge-Join', 'PASSED')]
+            print("  ✗ FAILED - Live files would be reported as orphans")
+            print(f"  Orphans: {[os.path.relpath(k, root) for k in orphans]}")
+            print(f"  Missing: {[os.path.relpath(k, root) for k in missing_rows]}")
+            return [('Merge-Join', 'FAILED')]
+
+    except Exception as e:
+        print(f"  ✗ Error: {str(e)}")
+        return [('Merge-Join', 'FAILED')]
+
+def run_reconciler_tests():
+    """Run all storage reconciliation tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 21 + "CRYPTOVAULT STORAGE RECONCILIATION" + " " * 23 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    all_results = []
+    all_results.extend(test_walk_order())
+    all_results.extend(test_resume_after_checkpoint())
+    all_results.extend(test_merge_join())
+
+    # Summary
+    print("\n" + "=" * 80)
+    print("STORAGE RECONCILIATION TEST SUMMARY")
+    print("=" * 80)
+
+    passed = sum(1 for _, status in all_results if status == 'PASSED')
+    total = len(all_results)
+
+    print(f"Total Tests: {total}")
+    print(f"Passed: {passed}")
+    print(f"Failed: {total - passed}")
+    print()
+
+    for test_name, status in all_results:
+        symbol = "✓" if status == 'PASSED' else "✗"
+        print(f"{symbol} {test_name:45} {status}")
+
+    print("\n" + "=" * 80)
+    print("ALL STORAGE RECONCILIATION TESTS COMPLETED")
+    print("=" * 80)
+    print()
+
+    return passed == total
+
+if __name__ == "__main__":
+    run_reconciler_tests()
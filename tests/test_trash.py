@@ -0,0 +1,144 @@
+"""
+CryptoVault - Comprehensive Testing Suite
+==========================================
+Module 6: Feature Endpoints - Trash & Restore
+
+Tests that deleted files move to the trash, stay restorable there and come
+back on restore. Requires the backend API.
+"""
+
+from live_api import BASE_URL, LiveApiTest, print_summary
+
+class TestTrash(LiveApiTest):
+    def __init__(self):
+        super().__init__()
+        self.owner = None
+        self.other = None
+        self.file_id = None
+
+    def setup(self):
+        """Register an owner and another user, and upload a file."""
+        print("=" * 80)
+        print("TEST 1: SETUP (USERS & FILE)")
+        print("=" * 80)
+        print()
+
+        try:
+            self.owner = self.register_and_login("trash_owner")
+            self.other = self.register_and_login("trash_other")
+            if self.owner and self.other:
+                self.file_id = self.upload_file(self.owner, "trash_test.bin")
+            if self.file_id:
+                print(f"  ✓ Users registered, file uploaded: {self.file_id}")
+                return [('Setup', 'PASSED')]
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+        return [('Setup', 'FAILED')]
+
+    def trashed_ids(self, user):
+        """Ids listed in a user's trash."""
+        response = self.session.get(f"{BASE_URL}/files/trash", headers=self.headers(user))
+        if response.status_code != 200:
+            return set()
+        return {f['id'] for f in response.json().get('files', [])}
+
+    def test_delete_to_trash(self):
+        """Test that deleting a file moves it from the listing to the trash."""
+        print("\n" + "=" * 80)
+        print("TEST 2: DELETE TO TRASH")
+        print("=" * 80)
+        print()
+
+        results = []
+        try:
+            print("1. Another user cannot delete the file...")
+            response = self.session.delete(f"{BASE_URL}/files/{self.file_id}", headers=self.headers(self.other))
+            results.append(self.check('Delete By Non-Owner Rejected', response, 403))
+
+            print("\n2. Owner deletes the file...")
+            response = self.session.delete(f"{BASE_URL}/files/{self.file_id}", headers=self.headers(self.owner))
+            results.append(self.check('Delete File', response, 200))
+
+            print("\n3. File leaves the listing and appears in the trash...")
+            response = self.session.get(f"{BASE_URL}/files/trash", headers=self.headers(self.owner))
+            trashed = {f['id']: f for f in response.json().get('files', [])} if response.ok else {}
+            entry = trashed.get(self.file_id, {})
+            results.append(self.check(
+                'Listed In Trash', response, 200,
+                bool(entry.get('deleted_at') and entry.get('purge_after'))
+                and self.file_id not in self.owned_file_ids(self.owner)
+            ))
+
+            print("\n4. Deleting it again fails...")
+            response = self.session.delete(f"{BASE_URL}/files/{self.file_id}", headers=self.headers(self.owner))
+            results.append(self.check('Delete Twice', response, 404))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Delete To Trash', 'FAILED'))
+
+        return results
+
+    def test_restore(self):
+        """Test restoring a file from the trash."""
+        print("\n" + "=" * 80)
+        print("TEST 3: RESTORE FROM TRASH")
+        print("=" * 80)
+        print()
+
+        results = []
+        try:
+            print("1. Another user cannot restore the file...")
+            response = self.session.post(f"{BASE_URL}/files/{self.file_id}/restore", headers=self.headers(self.other))
+            results.append(self.check('Restore By Non-Owner Rejected', response, 404))
+
+            print("\n2. Owner restores the file...")
+            response = self.session.post(f"{BASE_URL}/files/{self.file_id}/restore", headers=self.headers(self.owner))
+            results.append(self.check('Restore File', response, 200))
+
+            print("\n3. File is back in the listing and out of the trash...")
+            restored = (self.file_id in self.owned_file_ids(self.owner)
+                        and self.file_id not in self.trashed_ids(self.owner))
+            if restored:
+                print("  ✓ PASSED - File listed again")
+                results.append(('Listed After Restore', 'PASSED'))
+            else:
+                print("  ✗ FAILED - File not back in the listing")
+                results.append(('Listed After Restore', 'FAILED'))
+
+            print("\n4. Restored file can be downloaded...")
+            response = self.session.get(f"{BASE_URL}/files/{self.file_id}", headers=self.headers(self.owner))
+            results.append(self.check('Download After Restore', response, 200, len(response.content) == 256))
+
+            print("\n5. Restoring a file that is not in the trash fails...")
+            response = self.session.post(f"{BASE_URL}/files/{self.file_id}/restore", headers=self.headers(self.owner))
+            results.append(self.check('Restore Twice', response, 404))
+        except Exception as e:
+            print(f"  ✗ Error: {str(e)}")
+            results.append(('Restore From Trash', 'FAILED'))
+
+        return results
+
+def run_trash_tests():
+    """Run all trash and restore tests."""
+    print("\n")
+    print("╔" + "═" * 78 + "╗")
+    print("║" + " " * 25 + "CRYPTOVAULT TRASH & RESTORE" + " " * 26 + "║")
+    print("╚" + "═" * 78 + "╝")
+    print()
+
+    print("⚠️  NOTE: Backend must be running on http://localhost:5000")
+    print()
+
+    tester = TestTrash()
+
+    all_results = []
+    all_results.extend(tester.setup())
+
+    if tester.file_id:
+        all_results.extend(tester.test_delete_to_trash())
+        all_results.extend(tester.test_restore())
+
+    return print_summary("TRASH & RESTORE", all_results)
+
+if __name__ == "__main__":
+    run_trash_tests()